@@ -22,10 +22,54 @@ from flaskext.markdown import Markdown
 from markdown.extensions.toc import TocExtension
 
 # Custom Dgraph Extension
-from flaskinventory.flaskdgraph import DGraph
+from flaskinventory.flaskdgraph import DGraph, UniqueNameIndex, AutocompleteIndex
 
 dgraph = DGraph()
 
+unique_names = UniqueNameIndex()
+
+autocomplete = AutocompleteIndex()
+
+# Background Enrichment of new entries
+from flaskinventory.add.enrichment import EnrichmentQueue
+
+enrichment_queue = EnrichmentQueue()
+
+# Pooled HTTP Sessions for external lookups
+from flaskinventory.add.httpclient import HTTPClient
+
+http_client = HTTPClient()
+
+# Persistent Cache for external lookups
+from flaskinventory.add.cache import LookupCache
+
+lookup_cache = LookupCache()
+
+# Rate limited Geocoding
+from flaskinventory.add.geocoding import GeocodingService
+
+geocoder = GeocodingService()
+
+# Countries, Multinationals and Subunits in memory
+from flaskinventory.add.gazetteer import Gazetteer
+
+gazetteer = Gazetteer()
+
+# Precomputed choices of the new source form
+from flaskinventory.add.fieldoptions import FieldOptions
+
+field_options = FieldOptions()
+
+# Persistent Telegram Client
+from flaskinventory.add.telegram_client import TelegramService
+
+telegram_client = TelegramService()
+
+# Social Media API Clients
+from flaskinventory.add.social import SocialClients
+
+social_clients = SocialClients()
+
 
 class AnonymousUser(AnonymousUserMixin):
     user_role = 0
@@ -90,6 +134,16 @@ def create_app(config_class=Config, config_json=None):
     app.register_blueprint(errors)
 
     dgraph.init_app(app)
+    unique_names.init_app(app)
+    autocomplete.init_app(app)
+    enrichment_queue.init_app(app)
+    http_client.init_app(app)
+    lookup_cache.init_app(app)
+    geocoder.init_app(app)
+    gazetteer.init_app(app)
+    field_options.init_app(app)
+    telegram_client.init_app(app)
+    social_clients.init_app(app)
     login_manager.init_app(app)
     mail.init_app(app)
 
@@ -0,0 +1,349 @@
+"""
+    Bulk import of entries from CSV or JSONL files.
+
+    Rows are validated in parallel by a pool of worker processes
+    with the regular `Sanitizer`. New related nodes (e.g., organizations)
+    that occur in several rows are merged into a single node. Afterwards
+    everything is written with chunked upserts and a per-row report is returned.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import pickle
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from flask import current_app
+from slugify import slugify
+
+from flaskinventory import dgraph, autocomplete, enrichment_queue, field_options, gazetteer, unique_names
+from flaskinventory.flaskdgraph.dgraph_types import UID, NewID, NQuadWriter
+
+
+def read_rows(stream, fmt: str = 'csv') -> list:
+    """
+        Read rows from a text stream.
+        `fmt` is either 'csv' (first line is the header) or 'jsonl' (one object per line).
+        Empty values are removed.
+    """
+    if fmt == 'jsonl':
+        rows = [json.loads(line) for line in stream if line.strip() != '']
+    elif fmt == 'csv':
+        rows = list(csv.DictReader(stream))
+    else:
+        raise ValueError(f'Unknown format: {fmt}')
+
+    return [{k.strip(): v for k, v in row.items() if k and v not in [None, '', []]}
+            for row in rows]
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _iter_newids(value):
+    if isinstance(value, NewID):
+        yield value
+    elif isinstance(value, dict):
+        for val in value.values():
+            yield from _iter_newids(val)
+    elif isinstance(value, (list, set, tuple)):
+        for val in value:
+            yield from _iter_newids(val)
+
+
+def _resolve(value, created: dict):
+    # replace blank nodes that were already written by their uid
+    if isinstance(value, NewID) and value.newid[2:] in created:
+        return UID(created[value.newid[2:]], facets=value.facets)
+    elif isinstance(value, dict):
+        return {k: _resolve(v, created) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_resolve(v, created) for v in value]
+    elif isinstance(value, set):
+        return set(_resolve(v, created) for v in value)
+    return value
+
+
+def validate_row(index: int, row: dict, dgraph_type: str, defer_enrichment: bool = False) -> dict:
+    """ Run the Sanitizer for a single row, requires a request context with a logged in user """
+    from flaskinventory.main.sanitizer import Sanitizer
+    try:
+        sanitizer = Sanitizer(row, dgraph_type=dgraph_type,
+                              defer_enrichment=defer_enrichment)
+    except Exception as e:
+        return {'row': index, 'error': f'{type(e).__name__}: {e}'}
+
+    return {'row': index,
+            'entry': sanitizer.entry,
+            'related': sanitizer.related_entries,
+            'jobs': sanitizer.enrichment_jobs,
+            'owner': sanitizer.reservation_owner}
+
+
+""" Worker Processes """
+
+_worker = {}
+
+
+def _init_worker(config: dict, user_uid: str, ip: str):
+    from flaskinventory import create_app
+    from flaskinventory.users.dgraph import User
+
+    app = create_app(config_class=type('BulkImportConfig', (), config))
+    # enrichment jobs are enqueued by the parent process
+    enrichment_queue.stop()
+    with app.app_context():
+        user = User(uid=user_uid)
+
+    _worker.update(app=app, user=user, ip=ip)
+
+
+def _validate_row(index: int, row: dict, dgraph_type: str, defer_enrichment: bool) -> dict:
+    from flask_login import login_user
+
+    with _worker['app'].test_request_context(environ_base={'REMOTE_ADDR': _worker['ip']}):
+        login_user(_worker['user'])
+        return validate_row(index, row, dgraph_type, defer_enrichment=defer_enrichment)
+
+
+def _picklable_config(config) -> dict:
+    picklable = {}
+    for key, val in config.items():
+        if not key.isupper():
+            continue
+        try:
+            pickle.dumps(val)
+        except Exception:
+            continue
+        picklable[key] = val
+    return picklable
+
+
+class BulkImport:
+    """
+        Validate and write many entries of the same dgraph type.
+        Has to be used within a request context with a logged in user
+        (the same user is used in all worker processes).
+
+        `run()` returns a report:
+            rows: number of rows
+            imported: number of rows written to dgraph
+            merged: number of new related nodes that were merged into an existing node
+            uids: `{row index: uid}` of all imported entries
+            errors: list of `{'row': index, 'error': message}`
+    """
+
+    def __init__(self, rows: list, dgraph_type: str,
+                 user=None, ip: str = '127.0.0.1',
+                 workers: int = None, chunk_size: int = None,
+                 defer_enrichment: bool = None, dry_run: bool = False):
+        if not isinstance(dgraph_type, str):
+            dgraph_type = dgraph_type.__name__
+        self.rows = rows
+        self.dgraph_type = dgraph_type
+        self.user = user
+        self.ip = ip
+        self.workers = workers or current_app.config.get(
+            'BULK_IMPORT_WORKERS', os.cpu_count())
+        self.chunk_size = chunk_size or current_app.config.get(
+            'BULK_IMPORT_CHUNK_SIZE', 100)
+        if defer_enrichment is None:
+            defer_enrichment = current_app.config.get('ENRICHMENT_DEFERRED', False)
+        self.defer_enrichment = defer_enrichment
+        self.dry_run = dry_run
+
+        self.results = []
+        # canonical new related nodes {(dgraph types, slug of name): node}
+        self.nodes = {}
+        # blank nodes that were written {blank node without `_:`: uid}
+        self.created = {}
+        self.failed_nodes = set()
+        # owner of the unique names of the whole write set
+        self.reservation_owner = secrets.token_hex(8)
+        self.report = {'rows': len(rows), 'imported': 0,
+                       'merged': 0, 'uids': {}, 'errors': []}
+
+    def run(self) -> dict:
+        self.validate()
+        self.merge()
+        try:
+            if not self.dry_run:
+                self.write()
+        finally:
+            # written unique names are in the index now
+            unique_names.release(self.reservation_owner)
+        self.report['errors'].sort(key=lambda e: e['row'])
+        return self.report
+
+    def _error(self, row: int, error: str):
+        self.report['errors'].append({'row': row, 'error': error})
+
+    """ Validation """
+
+    def validate(self):
+        if self.workers and self.workers > 1:
+            from flask_login import current_user
+            user = self.user or current_user
+            # processes are spawned, because the dgraph client is not fork safe
+            executor = ProcessPoolExecutor(max_workers=self.workers,
+                                           mp_context=multiprocessing.get_context('spawn'),
+                                           initializer=_init_worker,
+                                           initargs=(_picklable_config(current_app.config), user.uid, self.ip))
+            with executor:
+                results = list(executor.map(_validate_row,
+                                            range(len(self.rows)),
+                                            self.rows,
+                                            repeat(self.dgraph_type),
+                                            repeat(self.defer_enrichment),
+                                            chunksize=max(1, min(32, len(self.rows) // (self.workers * 4)))))
+        else:
+            results = [validate_row(i, row, self.dgraph_type, defer_enrichment=self.defer_enrichment)
+                       for i, row in enumerate(self.rows)]
+
+        for result in results:
+            if 'error' in result:
+                self._error(result['row'], result['error'])
+            else:
+                self.results.append(result)
+
+    """ Merging """
+
+    def _relabel(self, result: dict):
+        # blank nodes are only unique within one Sanitizer run
+        prefix = f"_:row{result['row']}_"
+        seen = set()
+        for newid in _iter_newids([result['entry'], result['related'], [job['uid'] for job in result['jobs']]]):
+            if id(newid) in seen:
+                continue
+            seen.add(id(newid))
+            newid.newid = prefix + newid.newid[2:]
+
+    @staticmethod
+    def _node_key(node: dict) -> tuple:
+        dgraph_type = node.get('dgraph.type', [])
+        if isinstance(dgraph_type, str):
+            dgraph_type = [dgraph_type]
+        name = node.get('name', getattr(node['uid'], 'original_value', ''))
+        return (tuple(sorted(set(dgraph_type))), slugify(str(name), separator="_"))
+
+    def merge(self):
+        for result in self.results:
+            self._relabel(result)
+            entry = result['entry']
+            entry_uid = str(entry['uid'])
+
+            related_entries = []
+            for related in result['related']:
+                if not isinstance(related['uid'], NewID):
+                    related_entries.append(related)
+                    continue
+
+                # split the new node from the edges that point to the entry of this row
+                links = {k: v for k, v in related.items()
+                         if k != 'uid' and entry_uid in [str(n) for n in _iter_newids(v)]}
+                node = {k: v for k, v in related.items() if k not in links}
+
+                key = self._node_key(node)
+                if key in self.nodes:
+                    # all references of this row now point to the canonical node
+                    related['uid'].newid = self.nodes[key]['uid'].newid
+                    self.report['merged'] += 1
+                else:
+                    self.nodes[key] = node
+
+                if len(links) > 0:
+                    related_entries.append({'uid': related['uid'], **links})
+
+            result['related'] = related_entries
+
+        self._reserve_unique_names()
+
+    def _reserve_unique_names(self):
+        """
+            Rows were validated in separate processes, so their unique names
+            (of the entries and of new related nodes) can collide with each other
+            or with names that were taken meanwhile. All unique names of the
+            write set are reserved again by this import, colliding ones get a suffix.
+        """
+        # the reservations of the rows belong to this import
+        for result in self.results:
+            if result.get('owner'):
+                unique_names.release(result['owner'])
+        seen = set()
+        for node in [result['entry'] for result in self.results] + list(self.nodes.values()):
+            if not node.get('unique_name'):
+                continue
+            unique_name = node['unique_name']
+            candidate = unique_name
+            while candidate in seen or \
+                    unique_names.reserve([candidate], owner=self.reservation_owner) is None:
+                candidate = f'{unique_name}_{secrets.token_urlsafe(4)}'
+            seen.add(candidate)
+            node['unique_name'] = candidate
+
+    """ Writing """
+
+    def _upsert(self, nodes: list):
+        writer = NQuadWriter()
+        for node in nodes:
+            writer.write_dict(node)
+        set_nquads = writer.getvalue()
+        result = dgraph.upsert(None, set_nquads=set_nquads)
+        if result:
+            self.created.update(dict(result.uids))
+            for node in nodes:
+                uid = self.created.get(str(node['uid'])[2:])
+                if node.get('unique_name') and uid:
+                    unique_names.add(node['unique_name'], uid)
+            gazetteer.notify(set_nquads=set_nquads)
+            field_options.notify(set_nquads=set_nquads)
+            autocomplete.update(dict(result.uids).values())
+        return result
+
+    def write(self):
+        # first create the new related nodes, so that rows in all chunks can refer to them
+        for chunk in _chunks(list(self.nodes.values()), self.chunk_size):
+            if not self._upsert([_resolve(node, self.created) for node in chunk]):
+                self.failed_nodes.update(str(node['uid']) for node in chunk)
+
+        for chunk in _chunks(self.results, self.chunk_size):
+            rows = []
+            nodes = []
+            for result in chunk:
+                newids = set(str(n) for n in _iter_newids(
+                    [result['entry'], result['related']]))
+                if len(newids & self.failed_nodes) > 0:
+                    self._error(result['row'], 'Related entry could not be created')
+                    continue
+                rows.append(result)
+                nodes.append(_resolve(result['entry'], self.created))
+                nodes += [_resolve(related, self.created)
+                          for related in result['related']]
+
+            if len(rows) == 0:
+                continue
+
+            if not self._upsert(nodes):
+                for result in rows:
+                    self._error(result['row'], 'DGraph Error - Could not perform mutation')
+                continue
+
+            for result in rows:
+                self.report['uids'][result['row']] = self.created[str(
+                    result['entry']['uid'])[2:]]
+            self.report['imported'] += len(rows)
+
+        self.enqueue_jobs()
+
+    def enqueue_jobs(self):
+        jobs = {}
+        for result in self.results:
+            for job in result['jobs']:
+                jobs[(str(job['uid']), job['kind'])] = job
+        if len(jobs) > 0:
+            enrichment_queue.enqueue_jobs(list(jobs.values()), self.created)
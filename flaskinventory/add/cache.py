@@ -0,0 +1,322 @@
+"""
+    Persistent cache for external metadata lookups (geocoding, Wikidata, DOI, ...).
+
+    Results are stored in SQLite, so the cache survives restarts and is
+    shared by all worker processes. Each source has its own TTL,
+    negative results (e.g., "no such DOI") are cached with a shorter TTL.
+    Expired entries are kept until they are purged, so callers can
+    fall back to stale results when the source is not available.
+"""
+
+import functools
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Callable, Union
+
+from flask import current_app, has_app_context
+
+
+DAY = 24 * 60 * 60
+
+
+class LookupCache:
+
+    default_ttl = {'geocode': 30 * DAY,
+                   'reverse_geocode': 30 * DAY,
+                   'lookup_wikidata_id': 7 * DAY,
+                   'fetch_wikidata': 7 * DAY,
+                   'doi': 30 * DAY,
+                   'arxiv': 30 * DAY,
+                   'cran': DAY,
+                   'siterankdata': 7 * DAY}
+
+    _create_statements = [
+        """CREATE TABLE IF NOT EXISTS lookups (
+                source TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                negative INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                expires REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, key))""",
+        "CREATE INDEX IF NOT EXISTS lookups_expires ON lookups (expires)",
+        """CREATE TABLE IF NOT EXISTS rate_limits (
+                name TEXT PRIMARY KEY,
+                next_slot REAL NOT NULL)"""
+    ]
+
+    # hits are counted in memory and written in batches, so reads stay reads
+    hits_flush_size = 100
+    hits_flush_interval = 60
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        self._initialized = set()
+        self._hits = {}  # {(path, source, key): count}
+        self._hits_lock = threading.Lock()
+        self._hits_flushed = time.monotonic()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOOKUP_CACHE', True)
+        if not app.config.get('LOOKUP_CACHE_PATH'):
+            app.config['LOOKUP_CACHE_PATH'] = os.path.join(
+                app.instance_path, 'lookup_cache.sqlite')
+        # {source: seconds}, missing sources use the default TTL
+        ttl = dict(self.default_ttl)
+        ttl.update(app.config.get('LOOKUP_CACHE_TTL') or {})
+        app.config['LOOKUP_CACHE_TTL'] = ttl
+        app.config.setdefault('LOOKUP_CACHE_NEGATIVE_TTL', 60 * 60)
+
+    @property
+    def enabled(self) -> bool:
+        return has_app_context() and bool(current_app.config.get('LOOKUP_CACHE'))
+
+    """
+        Database
+    """
+
+    def _connect(self) -> sqlite3.Connection:
+        path = current_app.config['LOOKUP_CACHE_PATH']
+        if path not in self._initialized:
+            self._create_tables(path)
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_tables(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in self._create_statements:
+                conn.execute(statement)
+        finally:
+            conn.close()
+        self._initialized.add(path)
+
+    @staticmethod
+    def make_key(*args, **kwargs) -> str:
+        return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    """
+        Reading & Writing
+    """
+
+    def get(self, source: str, key: str, stale: bool = False) -> Union[dict, None]:
+        """
+            Cached entry (with the unpickled `value`) or None.
+            Expired entries are only returned if `stale` is set.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM lookups WHERE source = ? AND key = ?',
+                               (source, key)).fetchone()
+            if row is None:
+                return None
+            if not stale and row['expires'] < time.time():
+                return None
+        finally:
+            conn.close()
+        self._count_hit(source, key)
+        try:
+            value = pickle.loads(row['value'])
+        except (pickle.UnpicklingError, AttributeError, ImportError, EOFError) as e:
+            # e.g., written by an older version of the code: treated as a miss
+            self.logger.debug(f'Could not unpickle {source} lookup {key}: {e}')
+            return None
+        return {**dict(row), 'value': value}
+
+    def _count_hit(self, source: str, key: str):
+        path = current_app.config['LOOKUP_CACHE_PATH']
+        with self._hits_lock:
+            self._hits[(path, source, key)] = self._hits.get((path, source, key), 0) + 1
+            due = (sum(self._hits.values()) >= self.hits_flush_size
+                   or time.monotonic() - self._hits_flushed >= self.hits_flush_interval)
+        if due:
+            self.flush_hits()
+
+    def flush_hits(self):
+        """ write the hits counted in memory with one transaction per database """
+        with self._hits_lock:
+            hits, self._hits = self._hits, {}
+            self._hits_flushed = time.monotonic()
+        by_path = {}
+        for (path, source, key), count in hits.items():
+            by_path.setdefault(path, []).append((count, source, key))
+        for path, rows in by_path.items():
+            try:
+                conn = sqlite3.connect(path, timeout=10)
+                try:
+                    with conn:
+                        conn.executemany('UPDATE lookups SET hits = hits + ? WHERE source = ? AND key = ?',
+                                         rows)
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                # hits are statistics only, losing a batch is acceptable
+                self.logger.warning(f'Could not write lookup cache hits: {e}')
+
+    def set(self, source: str, key: str, value, negative: bool = False):
+        now = time.time()
+        if negative:
+            ttl = current_app.config['LOOKUP_CACHE_NEGATIVE_TTL']
+        else:
+            ttl = current_app.config['LOOKUP_CACHE_TTL'].get(source, DAY)
+        conn = self._connect()
+        try:
+            conn.execute('''INSERT OR REPLACE INTO lookups (source, key, value, negative, created, expires)
+                            VALUES (?, ?, ?, ?, ?, ?)''',
+                         (source, key, pickle.dumps(value), int(negative), now, now + ttl))
+        finally:
+            conn.close()
+
+    def cached(self, source: str, key: Callable = None, negative: Callable = None):
+        """
+            Decorator for lookup functions.
+            `key` builds the cache key from the arguments (default: all arguments),
+            `negative` decides whether a result is negative (default: falsy results).
+            Exceptions are not cached. The undecorated function is available as `uncached`,
+            the source and key function as `source` and `key`.
+        """
+        key = key or self.make_key
+        negative = negative or (lambda result: not result)
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                cache_key = key(*args, **kwargs)
+                try:
+                    entry = self.get(source, cache_key)
+                except sqlite3.Error as e:
+                    self.logger.warning(f'Lookup cache not available: {e}')
+                    return func(*args, **kwargs)
+                if entry is not None:
+                    return entry['value']
+
+                result = func(*args, **kwargs)
+                try:
+                    self.set(source, cache_key, result, negative=negative(result))
+                except (sqlite3.Error, pickle.PicklingError, TypeError) as e:
+                    self.logger.warning(f'Could not cache {source} lookup: {e}')
+                return result
+
+            wrapper.uncached = func
+            wrapper.source = source
+            wrapper.key = key
+            return wrapper
+
+        return decorator
+
+    """
+        Rate Limits
+    """
+
+    def reserve_slot(self, name: str, interval: float) -> float:
+        """
+            Reserve the next free request slot of an API, shared by all processes.
+            Slots are `interval` seconds apart. Returns the time of the reserved slot.
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT next_slot FROM rate_limits WHERE name = ?',
+                               (name,)).fetchone()
+            slot = max(time.time(), row['next_slot'] if row else 0)
+            conn.execute('INSERT OR REPLACE INTO rate_limits (name, next_slot) VALUES (?, ?)',
+                         (name, slot + interval))
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return slot
+
+    def pause(self, name: str, until: float):
+        """ no slots for this API before `until` (e.g., after being throttled) """
+        conn = self._connect()
+        try:
+            conn.execute('''INSERT INTO rate_limits (name, next_slot) VALUES (?, ?)
+                            ON CONFLICT (name) DO UPDATE SET next_slot = MAX(next_slot, excluded.next_slot)''',
+                         (name, until))
+        finally:
+            conn.close()
+
+    """
+        Administration
+    """
+
+    def stats(self) -> list:
+        """ number of entries per source """
+        self.flush_hits()
+        conn = self._connect()
+        try:
+            rows = conn.execute('''SELECT source, COUNT(*) AS entries,
+                                          SUM(negative) AS negative,
+                                          SUM(expires < ?) AS expired,
+                                          SUM(hits) AS hits
+                                   FROM lookups GROUP BY source ORDER BY source''',
+                                (time.time(),)).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def entries(self, source: str = None, search: str = None, limit: int = 100) -> list:
+        """ list entries (without values), newest first """
+        query = 'SELECT source, key, negative, created, expires, hits FROM lookups WHERE 1 = 1'
+        params = []
+        if source:
+            query += ' AND source = ?'
+            params.append(source)
+        if search:
+            query += ' AND key LIKE ?'
+            params.append(f'%{search}%')
+        query += ' ORDER BY created DESC LIMIT ?'
+        params.append(limit)
+        self.flush_hits()
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def purge(self, source: str = None, key: str = None,
+              expired: bool = False, negative: bool = False) -> int:
+        """
+            Delete entries and return the number of deleted entries.
+            Without arguments all entries are deleted.
+        """
+        query = 'DELETE FROM lookups WHERE 1 = 1'
+        params = []
+        if source:
+            query += ' AND source = ?'
+            params.append(source)
+        if key:
+            query += ' AND key = ?'
+            params.append(key)
+        if expired:
+            query += ' AND expires < ?'
+            params.append(time.time())
+        if negative:
+            query += ' AND negative = 1'
+        # pending hits of deleted entries must not be added to new ones
+        self.flush_hits()
+        conn = self._connect()
+        try:
+            deleted = conn.execute(query, params).rowcount
+        finally:
+            conn.close()
+        return deleted
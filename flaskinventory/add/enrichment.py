@@ -0,0 +1,499 @@
+"""
+    Helpers for running external lookups (enrichments) concurrently.
+    Lookups run in a thread pool with their own app context,
+    the caller only waits until the overall deadline is reached.
+
+    Also contains the EnrichmentQueue for running lookups after
+    the entry was committed (see below).
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Tuple, Union
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+
+def _with_app_context(app, func: Callable, *args, **kwargs):
+    with app.app_context():
+        return func(*args, **kwargs)
+
+
+def run_concurrently(lookups: dict, timeout: float = None) -> Tuple[dict, dict, list]:
+    """
+        Run independent lookups in parallel and wait at most `timeout` seconds.
+
+        :param lookups:
+            dict of `{'name': (func, arg1, arg2, ...)}`
+        :param timeout:
+            overall deadline in seconds, default: `ENRICHMENT_TIMEOUT` from app config
+
+        Returns three values:
+        1) dict of results `{'name': result}` for all lookups that finished in time
+        2) dict of errors `{'name': exception}` for all lookups that raised an exception
+        3) list of names of lookups that did not finish before the deadline
+    """
+
+    app = current_app._get_current_object()
+    if timeout is None:
+        timeout = app.config.get('ENRICHMENT_TIMEOUT')
+
+    results = {}
+    errors = {}
+
+    if len(lookups) == 0:
+        return results, errors, []
+
+    executor = ThreadPoolExecutor(max_workers=len(lookups),
+                                  thread_name_prefix='enrichment')
+    futures = {executor.submit(_with_app_context, app, func, *args): name
+               for name, (func, *args) in lookups.items()}
+
+    done, not_done = wait(futures, timeout=timeout)
+
+    # do not block the worker thread for lookups that exceeded the deadline
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+
+    timed_out = [futures[future] for future in not_done]
+    if len(timed_out) > 0:
+        app.logger.warning(
+            f'Enrichment timed out after {timeout} seconds: {", ".join(timed_out)}')
+
+    return results, errors, timed_out
+
+
+"""
+    Deferred Enrichment
+
+    New entries are committed right away with the data the user provided.
+    All external lookups are recorded as jobs in a local SQLite database
+    and processed by background worker threads that patch the entries
+    via upserts. The progress is tracked per entry in `entry_enrichment_status`.
+"""
+
+
+class EnrichmentError(Exception):
+    pass
+
+
+def enrich_website(uid: str, payload: dict) -> dict:
+    from flaskinventory.add.external import parse_meta, siterankdata, find_sitemaps, find_feeds, SiteAnalysis
+    from flaskinventory.flaskdgraph.dgraph_types import Scalar
+
+    site = payload['name']
+    analysis = SiteAnalysis(payload.get('url', site))
+    results, errors, timed_out = run_concurrently({
+        'meta': (parse_meta, analysis),
+        'siterankdata': (siterankdata, site),
+        'sitemaps': (find_sitemaps, analysis),
+        'feeds': (find_feeds, analysis)
+    })
+
+    if 'meta' in errors or 'meta' in timed_out:
+        raise EnrichmentError(
+            f'Could not resolve website: {site}. {errors.get("meta", "Timed out")}')
+
+    names, urls = results['meta']
+    if urls == False:
+        raise EnrichmentError(f'Could not resolve website: {site}')
+
+    patch = {}
+    other_names = [n.strip() for n in names + urls if n.strip() != '']
+    if len(other_names) > 0:
+        patch['other_names'] = list(set(other_names))
+
+    if results.get('siterankdata'):
+        patch['audience_size'] = Scalar(datetime.date.today(), facets={
+            'count': results['siterankdata'],
+            'unit': "daily visitors",
+            'data_from': f"https://siterankdata.com/{site.replace('www.', '')}"})
+
+    feeds = [Scalar(sitemap, facets={'kind': 'sitemap'})
+             for sitemap in results.get('sitemaps', [])]
+    feeds += [Scalar(feed, facets={'kind': 'rss'})
+              for feed in results.get('feeds', [])]
+    if len(feeds) > 0:
+        patch['channel_feeds'] = feeds
+
+    return patch
+
+
+def enrich_profile(uid: str, payload: dict) -> dict:
+    from flaskinventory.add.external import instagram, twitter, vkontakte, telegram
+    from flaskinventory.flaskdgraph.dgraph_types import Scalar
+
+    lookups = {'instagram': instagram,
+               'twitter': twitter,
+               'vkontakte': vkontakte,
+               'telegram': telegram}
+
+    profile = lookups[payload['channel']](payload['name'])
+    if not profile:
+        raise EnrichmentError(
+            f"{payload['channel'].title()} profile not found: {payload['name']}")
+
+    existing = get_existing_predicates(uid)
+
+    patch = {'verified_account': profile.get('verified', False)}
+    if profile.get('fullname'):
+        patch['other_names'] = [profile['fullname']]
+    if profile.get('followers'):
+        patch['audience_size'] = Scalar(str(datetime.date.today()),
+                                        facets={'count': int(profile['followers']),
+                                                'unit': 'followers'})
+    if profile.get('joined') and 'founded' not in existing:
+        joined = profile['joined']
+        patch['founded'] = joined.isoformat() if hasattr(
+            joined, 'isoformat') else joined
+    if profile.get('description') and 'description' not in existing:
+        patch['description'] = profile['description']
+    if profile.get('telegram_id'):
+        patch['channel_url'] = profile['telegram_id']
+
+    return patch
+
+
+def enrich_wikidata(uid: str, payload: dict) -> dict:
+    from flaskinventory.add.external import get_wikidata
+    from flaskinventory.flaskdgraph import Schema
+
+    wikidata = get_wikidata(payload['name'])
+    if not wikidata:
+        return {}
+
+    predicates = Schema.get_predicates(payload['dgraph_type'])
+    existing = get_existing_predicates(uid)
+
+    patch = {}
+    for key, val in wikidata.items():
+        if val is None or key not in predicates.keys():
+            continue
+        # only fill in what the user did not provide
+        if key == 'other_names' or key not in existing:
+            patch[key] = val
+
+    return patch
+
+
+def enrich_autocode(uid: str, payload: dict) -> dict:
+    """ Run the `autocode` method of the predicate, e.g., geocoding an address """
+    from flaskinventory.flaskdgraph import Schema
+
+    field = Schema.get_predicates(payload['dgraph_type'])[payload['predicate']]
+    validated = field.autocode(payload['value'])
+    if validated is None:
+        return {}
+    if isinstance(validated, dict):
+        return validated
+    return {payload['predicate']: validated}
+
+
+def enrich_organization(uid: str, payload: dict) -> dict:
+    """ Resolve a new organization that was added via a related source """
+    from flaskinventory.flaskdgraph import Schema
+    from flaskinventory.flaskdgraph.dgraph_types import UID
+
+    field = Schema.get_reverse_predicates(
+        payload['dgraph_type'])[payload['predicate']]
+    org = field._resolve_org({'uid': UID(uid), 'name': payload['name']})
+    # dgraph.type is kept: nodes written before it was set on new organizations lack the type
+    for key in ['uid', 'name']:
+        org.pop(key, None)
+    return org
+
+
+JOB_HANDLERS = {'website': enrich_website,
+                'profile': enrich_profile,
+                'wikidata': enrich_wikidata,
+                'autocode': enrich_autocode,
+                'organization': enrich_organization}
+
+
+def get_existing_predicates(uid: str) -> set:
+    """ Names of all predicates that are already set for the entry """
+    from flaskinventory import dgraph
+    query_string = f'{{ q(func: uid({uid})) {{ expand(_all_) {{ uid }} }} }}'
+    data = dgraph.query(query_string)
+    if len(data['q']) == 0:
+        return set()
+    return set(data['q'][0].keys())
+
+
+def apply_patch(uid: str, patch: dict, status: str = None) -> bool:
+    from flaskinventory import dgraph, autocomplete
+    from flaskinventory.flaskdgraph.dgraph_types import UID, NQuadWriter
+
+    patch = dict(patch)
+    if status:
+        patch['entry_enrichment_status'] = status
+    if len(patch) == 0:
+        return True
+    patch['uid'] = UID(uid)
+
+    writer = NQuadWriter()
+    writer.write_dict(patch)
+    result = bool(dgraph.upsert(None, set_nquads=writer.getvalue()))
+    if result:
+        autocomplete.update([uid])
+    return result
+
+
+class EnrichmentQueue:
+    """
+        Persistent job queue for deferred enrichment.
+        Jobs are stored in SQLite and claimed atomically, so several
+        worker threads (and processes) can share the same database.
+        Failed jobs are retried with an exponential backoff.
+    """
+
+    _create_statements = [
+        """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                uid TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                run_after REAL NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL)""",
+        "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, run_after)",
+        "CREATE INDEX IF NOT EXISTS jobs_uid ON jobs (uid)"
+    ]
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        self.app = None
+        self._threads = []
+        self._pid = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ENRICHMENT_DEFERRED', False)
+        if not app.config.get('ENRICHMENT_QUEUE_PATH'):
+            app.config['ENRICHMENT_QUEUE_PATH'] = os.path.join(
+                app.instance_path, 'enrichment.sqlite')
+        app.config.setdefault('ENRICHMENT_WORKERS', 2)
+        app.config.setdefault('ENRICHMENT_RETRIES', 3)
+        # seconds before a failed job is retried (doubles with each attempt)
+        app.config.setdefault('ENRICHMENT_RETRY_DELAY', 30)
+        # seconds after which a running job is considered abandoned
+        app.config.setdefault('ENRICHMENT_JOB_LEASE', 600)
+        app.config.setdefault('ENRICHMENT_POLL_INTERVAL', 5)
+        self.app = app
+
+        if app.config['ENRICHMENT_DEFERRED']:
+            self.start()
+
+    """
+        Database
+    """
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.app.config['ENRICHMENT_QUEUE_PATH']
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_tables(self):
+        path = self.app.config['ENRICHMENT_QUEUE_PATH']
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in self._create_statements:
+                conn.execute(statement)
+        finally:
+            conn.close()
+
+    def enqueue(self, uid: str, kind: str, payload: dict) -> int:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f'Unknown enrichment job: {kind}')
+        self._ensure_workers()
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""INSERT INTO jobs (uid, kind, payload, run_after, created, updated)
+                                     VALUES (?, ?, ?, ?, ?, ?)""",
+                                  (str(uid), kind, json.dumps(payload), now, now, now))
+            job_id = cursor.lastrowid
+        finally:
+            conn.close()
+        self._wakeup.set()
+        return job_id
+
+    def enqueue_jobs(self, jobs: list, newuids: dict = None) -> list:
+        """
+            Enqueue the jobs collected by a Sanitizer after the mutation
+            was committed. `newuids` maps the blank nodes of the mutation
+            to the uids assigned by dgraph (`dict(result.uids)`).
+            Does not raise: entries whose jobs could not be enqueued
+            are marked as failed instead of staying 'pending'
+        """
+        newuids = newuids or {}
+        job_ids = []
+        failed = set()
+        for job in jobs:
+            uid = str(job['uid'])
+            if uid.startswith('_:'):
+                uid = newuids.get(uid.replace('_:', ''))
+                if uid is None:
+                    continue
+            try:
+                job_ids.append(self.enqueue(uid, job['kind'], job['payload']))
+            except Exception as e:
+                self.logger.error(f'Could not enqueue enrichment job {job["kind"]} for <{uid}>: {e}')
+                failed.add(uid)
+        for uid in failed:
+            try:
+                apply_patch(uid, {}, status='failed')
+            except Exception as e:
+                self.logger.error(f'Could not update enrichment status of <{uid}>: {e}')
+        return job_ids
+
+    def claim(self) -> Union[sqlite3.Row, None]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            job = conn.execute("""SELECT * FROM jobs
+                                  WHERE status IN ('queued', 'running') AND run_after <= ?
+                                  ORDER BY id LIMIT 1""", (now,)).fetchone()
+            if job is not None:
+                conn.execute("""UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                                run_after = ?, updated = ? WHERE id = ?""",
+                             (now + self.app.config['ENRICHMENT_JOB_LEASE'], now, job['id']))
+            conn.execute('COMMIT')
+        except:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return job
+
+    def complete(self, job_id: int):
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE jobs SET status = 'done', updated = ? WHERE id = ?",
+                         (time.time(), job_id))
+        finally:
+            conn.close()
+
+    def fail(self, job_id: int, attempts: int, error: str) -> bool:
+        """ Record the error, returns True if the job will be retried """
+        now = time.time()
+        retry = attempts < self.app.config['ENRICHMENT_RETRIES']
+        delay = self.app.config['ENRICHMENT_RETRY_DELAY'] * 2 ** (attempts - 1)
+        conn = self._connect()
+        try:
+            conn.execute("""UPDATE jobs SET status = ?, last_error = ?, run_after = ?, updated = ?
+                            WHERE id = ?""",
+                         ('queued' if retry else 'failed', error, now + delay, now, job_id))
+        finally:
+            conn.close()
+        return retry
+
+    def jobs(self, uid: str) -> list:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT * FROM jobs WHERE uid = ? ORDER BY id",
+                                (str(uid),)).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def entry_status(self, uid: str) -> Union[str, None]:
+        """ Summarize all jobs of an entry: pending, done or failed """
+        statuses = [job['status'] for job in self.jobs(uid)]
+        if len(statuses) == 0:
+            return None
+        if 'queued' in statuses or 'running' in statuses:
+            return 'pending'
+        if 'failed' in statuses:
+            return 'failed'
+        return 'done'
+
+    """
+        Workers
+    """
+
+    def run(self, job: sqlite3.Row):
+        handler = JOB_HANDLERS[job['kind']]
+        try:
+            patch = handler(job['uid'], json.loads(job['payload']))
+            if not apply_patch(job['uid'], patch):
+                raise EnrichmentError('DGraph Error - Could not perform mutation')
+        except Exception as e:
+            self.logger.warning(
+                f'Enrichment job {job["id"]} ({job["kind"]}) for <{job["uid"]}> failed: {e}')
+            if self.fail(job['id'], job['attempts'] + 1, str(e)):
+                return
+        else:
+            self.complete(job['id'])
+
+        status = self.entry_status(job['uid'])
+        if status != 'pending':
+            apply_patch(job['uid'], {}, status=status)
+
+    def _work(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    job = self.claim()
+                except sqlite3.Error as e:
+                    self.logger.error(f'Could not claim enrichment job: {e}')
+                    job = None
+                if job is None:
+                    self._wakeup.wait(
+                        self.app.config['ENRICHMENT_POLL_INTERVAL'])
+                    self._wakeup.clear()
+                    continue
+                self.run(job)
+
+    def _ensure_workers(self):
+        # threads do not survive a fork, so restart them in the new process
+        if self._pid == os.getpid():
+            return
+        if self.app.config['ENRICHMENT_DEFERRED']:
+            self.start()
+        else:
+            # only store the jobs, they are run by processes with deferred enrichment
+            self._create_tables()
+            self._pid = os.getpid()
+
+    def start(self):
+        self._create_tables()
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._threads = []
+        for i in range(self.app.config['ENRICHMENT_WORKERS']):
+            thread = threading.Thread(target=self._work,
+                                      name=f'enrichment-worker-{i}',
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
@@ -5,36 +5,48 @@ from urllib.robotparser import RobotFileParser
 import urllib.parse
 import re
 import json
-import asyncio
+import threading
+import codecs
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Union, Tuple
 
-# external utils 
+# external utils
+# parsers (bs4, feedparser) and platform clients are imported on first use,
+# this module is imported by every worker (via dgraph_types)
 import requests
 from requests.models import PreparedRequest
 import requests.exceptions
 from dateutil import parser as dateparser
-import feedparser
-from bs4 import BeautifulSoup as bs4
-import instaloader
-import tweepy
-from telethon import TelegramClient
 
 # flask
 from flask import current_app
 from dateutil.parser import isoparse
 
-from flaskinventory import dgraph
+from flaskinventory import http_client, lookup_cache, geocoder, gazetteer, telegram_client, social_clients
 from flaskinventory.errors import InventoryValidationError
 
-def geocode(address: str) -> dict:
+class NominatimThrottled(requests.exceptions.HTTPError):
+    """ Nominatim refuses requests because of its usage policy """
+
+
+def _nominatim(endpoint: str, payload: dict) -> requests.Response:
+    api = current_app.config.get('NOMINATIM_API', 'https://nominatim.openstreetmap.org')
+    r = http_client.get(api.rstrip('/') + endpoint, params=payload)
+    if r.status_code in [429, 503]:
+        raise NominatimThrottled(f'Nominatim throttled: {r.status_code}', response=r)
+    return r
+
+
+@lookup_cache.cached('geocode', key=lambda address: str(address).strip().lower())
+def nominatim_search(address: str) -> dict:
     payload = {'q': address,
                'format': 'jsonv2',
                'addressdetails': 1,
                'limit': 1,
                'namedetails': 1,
                'extratags': 1}
-    api = "https://nominatim.openstreetmap.org/search"
-    r = requests.get(api, params=payload)
+    r = _nominatim('/search', payload)
     if r.status_code != 200:
         return False
     elif len(r.json()) == 0:
@@ -43,10 +55,10 @@ def geocode(address: str) -> dict:
         return r.json()[0]
 
 
-def reverse_geocode(lat, lon) -> dict:
-    api = "https://nominatim.openstreetmap.org/reverse"
+@lookup_cache.cached('reverse_geocode', key=lambda lat, lon: f'{lat},{lon}')
+def nominatim_reverse(lat, lon) -> dict:
     payload = {'lat': lat, 'lon': lon, 'format': 'json'}
-    r = requests.get(api, params=payload)
+    r = _nominatim('/reverse', payload)
     if r.status_code != 200:
         return False
     elif 'display_name' not in r.json().keys():
@@ -54,6 +66,16 @@ def reverse_geocode(lat, lon) -> dict:
     else:
         return r.json()
 
+
+def geocode(address: str) -> dict:
+    """ rate limited via the geocoding service """
+    return geocoder.geocode(address)
+
+
+def reverse_geocode(lat, lon) -> dict:
+    """ rate limited via the geocoding service """
+    return geocoder.reverse_geocode(lat, lon)
+
 # Sitemaps & RSS/XML/Atom Feeds
 
 
@@ -71,19 +93,23 @@ def build_url(site: str):
     except Exception as e:
         return False
 
-def perform_request(site: str) -> requests.Response:
 
-    headers = {'user-agent':
-               "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.45 Safari/537.36"}
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.45 Safari/537.36"
+
+
+def perform_request(site: str, **kwargs) -> requests.Response:
+    """ keyword arguments are passed to `http_client.get` (e.g., `stop`) """
+
+    headers = {'user-agent': USER_AGENT}
 
     try:
-        r = requests.get(site, headers=headers)
+        r = http_client.get(site, headers=headers, **kwargs)
     except (requests.exceptions.SSLError, requests.exceptions.ConnectionError):
         try:
-            r = requests.get(site, verify=False, headers=headers)
+            r = http_client.get(site, verify=False, headers=headers, **kwargs)
         except (requests.exceptions.SSLError, requests.exceptions.ConnectionError):
             try:
-                r = requests.get(site.replace('https', 'http'), verify=False, headers=headers)
+                r = http_client.get(site.replace('https', 'http'), verify=False, headers=headers, **kwargs)
             except Exception as e:
                 current_app.logger.error(f'Error when requesting {site}: {e}')
                 raise InventoryValidationError(
@@ -94,6 +120,10 @@ def perform_request(site: str) -> requests.Response:
                         Error message: {e}
                         '''
                     )
+    except requests.exceptions.RequestException as e:
+        # site exists, but is too slow or too large
+        current_app.logger.warning(f'Error when requesting {site}: {e}')
+        return False
     return r or False
 
 def test_url(site):
@@ -111,57 +141,240 @@ def test_url(site):
     return False
 
 
-def find_sitemaps(site: str) -> list:
-    site = build_url(site)
-    if not site:
-        return []
+class HeadExtractor(HTMLParser):
+    """
+        Incremental parser for the `<head>` of a website.
+        Collects the OpenGraph title / url, JSON-LD (schema.org) blocks
+        and feeds (`<link rel="alternate">`) in one pass
+        and is done once `</head>` (or `<body>`) is reached.
+
+        Use `feed_bytes` as `stop` callback of `http_client.get`.
+    """
+
+    def __init__(self, encoding: str = 'utf-8'):
+        super().__init__(convert_charrefs=True)
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._script = None
+        self.done = False
+        self.og_title = None
+        self.og_url = None
+        self.schemas = []
+        self.alternates = []
+
+    def feed_bytes(self, chunk: bytes) -> bool:
+        """ parse the next chunk, returns True when the head is complete """
+        if not self.done:
+            self.feed(self._decoder.decode(chunk))
+        return self.done
+
+    def handle_starttag(self, tag: str, attrs: list):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        if tag == 'meta':
+            if attrs.get('property') == 'og:title' and self.og_title is None:
+                self.og_title = attrs.get('content')
+            elif attrs.get('property') == 'og:url' and self.og_url is None:
+                self.og_url = attrs.get('content')
+        elif tag == 'link':
+            rel = (attrs.get('rel') or '').lower().split()
+            link_type = attrs.get('type') or ''
+            if 'alternate' in rel and ('rss' in link_type or 'xml' in link_type) and attrs.get('href'):
+                self.alternates.append(attrs['href'])
+        elif tag == 'script' and 'json' in (attrs.get('type') or ''):
+            self._script = []
+        elif tag == 'body':
+            self.done = True
+
+    def handle_data(self, data: str):
+        if self._script is not None:
+            self._script.append(data)
+
+    def handle_endtag(self, tag: str):
+        if tag == 'script' and self._script is not None:
+            self.schemas.append(''.join(self._script))
+            self._script = None
+        elif tag == 'head':
+            self.done = True
+
+    def meta(self) -> Tuple[list, list]:
+        """ names and urls from OpenGraph and schema.org """
+        names = []
+        urls = []
+        schema_name, schema_url = schemaorg_webpage(self.schemas)
+
+        if self.og_title:
+            names.append(self.og_title)
+
+        if schema_name:
+            names.append(schema_name)
+
+        if self.og_url:
+            urls.append(self.og_url)
+
+        if schema_url:
+            urls.append(schema_url)
+
+        return list(set(names)), list(set(urls))
+
+
+class SiteAnalysis:
+    """
+        Snapshot of a website for all lookups of one submission.
+        The homepage and robots.txt are fetched at most once
+        (when they are needed first). Usually only the `<head>` of the
+        homepage is downloaded and parsed (streaming, at most `META_MAX_SIZE` bytes);
+        the whole page is only needed if the head does not link any feeds.
+        Can be shared by threads, e.g., with `run_concurrently`:
+        every resource has its own lock, so that callers of one resource
+        never wait for the download of another (e.g., the head for robots.txt).
+    """
+
+    def __init__(self, site: str):
+        self.url = build_url(site)
+        if self.url and self.url.endswith('/'):
+            self.url = self.url[:-1]
+        self._locks = {resource: threading.Lock()
+                       for resource in ('head', 'response', 'soup', 'robots')}
+        self._head_response = None
+        self._head = None
+        self._response = None
+        self._error = None
+        self._soup = None
+        self._robots = None
+
+    def _fetch_head(self):
+        head = HeadExtractor()
+        r = perform_request(self.url, stop=head.feed_bytes, truncate=True,
+                            max_size=current_app.config.get('META_MAX_SIZE', 1024 * 1024))
+        if r and r.encoding and codecs.lookup(r.encoding).name != 'utf-8' \
+                and 'charset' in r.headers.get('Content-Type', '').lower():
+            # declared encoding is not utf-8: parse the same bytes again
+            head = HeadExtractor(encoding=r.encoding)
+            head.feed_bytes(r.content)
+        self._head_response = r
+        self._head = head
+
+    @property
+    def head_response(self) -> Union[requests.Response, bool]:
+        """ beginning of the homepage (at least the head), False if it could not be fetched """
+        with self._locks['head']:
+            if self._head_response is None and self._error is None:
+                try:
+                    if self.url:
+                        self._fetch_head()
+                    else:
+                        self._head_response = False
+                except Exception as e:
+                    self._error = e
+            if self._error is not None:
+                raise self._error
+            return self._head_response
+
+    @property
+    def head(self) -> Union[HeadExtractor, None]:
+        if self.head_response:
+            return self._head
+        return None
 
-    if site.endswith('/'):
-        site = site[:-1]
+    @property
+    def response(self) -> Union[requests.Response, bool]:
+        """ complete homepage, False if it could not be fetched """
+        with self._locks['response']:
+            if self._response is None:
+                r = self.head_response
+                if r and not getattr(r, 'truncated', False):
+                    # the whole page was already read with the head
+                    self._response = r
+                elif r:
+                    self._response = perform_request(self.url)
+                else:
+                    self._response = False
+            return self._response
+
+    @property
+    def soup(self) -> Union['BeautifulSoup', None]:
+        from bs4 import BeautifulSoup as bs4
+        with self._locks['soup']:
+            if self._soup is None and self.response:
+                self._soup = bs4(self.response.content, 'lxml')
+            return self._soup
+
+    @property
+    def robots(self) -> Union[RobotFileParser, bool]:
+        """ parsed robots.txt, False if there is none """
+        with self._locks['robots']:
+            if self._robots is None:
+                self._robots = False
+                try:
+                    r = http_client.get(self.url + '/robots.txt',
+                                        headers={'user-agent': USER_AGENT})
+                    if r.status_code == 200:
+                        self._robots = RobotFileParser(self.url + '/robots.txt')
+                        self._robots.parse(r.text.splitlines())
+                except Exception as e:
+                    current_app.logger.warning(f'Could not get robots.txt from {self.url}: {e}')
+            return self._robots
+
+    def meta(self) -> Tuple[list, list]:
+        """ names and urls from OpenGraph and schema.org, `(False, False)` if the site is not reachable """
+        if not self.url or not self.head_response:
+            return False, False
+
+        return self.head.meta()
+
+    def sitemaps(self) -> list:
+        if not self.url or not self.head_response:
+            return []
 
-    r = perform_request(site)
-    if not r:
+        if self.head_response.status_code != 200:
+            raise requests.RequestException(
+                f'Could not reach {self.url}. Status: {self.head_response.status_code}')
+
+        if self.robots and self.robots.sitemaps:
+            return list(self.robots.sitemaps)
         return []
 
-    if r.status_code != 200:
-        raise requests.RequestException(
-            f'Could not reach {site}. Status: {r.status_code}')
-    try:
-        rp = RobotFileParser()
-        rp.set_url(site + '/robots.txt')
-        rp.read()
-        if len(rp.sitemaps) > 0:
-            return rp.sitemaps
-        else:
+    def feed_candidates(self, links: bool = False) -> list:
+        """ feeds announced in the head, with `links` also all links of the page that look like feeds """
+        if not self.url:
             return []
-    except Exception as e:
-        current_app.logger.warning(f'Could not get sitemap from {site}: {e}')
-        return []
+        if not self.head_response:
+            # naive approach
+            return [self.url + '/rss']
+        if not links:
+            return feed_candidates(self.url, self.head.alternates)
+        if not self.response:
+            return []
+        return feed_candidates(self.url, *feed_links(self.soup))
 
+    def feeds(self, max_feeds: int = None) -> list:
+        """ probe the feeds of the head first, the whole page is only searched if they are not enough """
+        max_feeds = max_feeds or current_app.config.get('FEEDS_MAX', 3)
+        candidates = self.feed_candidates()
+        feeds = probe_feeds(candidates, max_feeds=max_feeds)
+        if len(feeds) < max_feeds and self.head_response:
+            more = [url for url in self.feed_candidates(links=True) if url not in candidates]
+            feeds += probe_feeds(more, max_feeds=max_feeds - len(feeds))
+        return feeds
 
-def find_feeds(site: str) -> list:
-    site = build_url(site)
-    if not site:
-        return []
 
-    if site.endswith('/'):
-        site = site[:-1]
+def find_sitemaps(site: Union[str, 'SiteAnalysis']) -> list:
+    if not isinstance(site, SiteAnalysis):
+        site = SiteAnalysis(site)
+    return site.sitemaps()
 
-    # first: naive approach
-    try:
-        r = perform_request(site + '/rss')
-        if 'xml' in r.headers['Content-Type'] or 'rss' in r.headers['Content-Type']:
-            return [site + '/rss']
-    except Exception:
-        pass
 
-    r = perform_request(site)
-    if not r:
-        return []
+# RSS / Atom documents start with one of these tags
+FEED_SIGNATURES = (b'<rss', b'<feed', b'<rdf:rdf')
+
+FEED_ACCEPT = 'application/rss+xml, application/atom+xml, application/xml;q=0.9, text/xml;q=0.9, */*;q=0.1'
+
 
-    result = []
-    possible_feeds = []
-    html = bs4(r.content, 'lxml')
+def feed_links(html: 'BeautifulSoup') -> Tuple[list, list]:
+    """ hrefs of `<link rel="alternate">` feeds and of links that look like feeds """
+    alternates = []
+    links = []
     feed_urls = html.find_all("link", rel="alternate")
     if len(feed_urls) > 0:
         for f in feed_urls:
@@ -170,68 +383,108 @@ def find_feeds(site: str) -> list:
                 if "rss" in t or "xml" in t:
                     href = f.get("href")
                     if href:
-                        possible_feeds.append(href)
-    parsed_url = urllib.parse.urlparse(site)
-    base = parsed_url.scheme + "://" + parsed_url.hostname
+                        alternates.append(href)
     atags = html.find_all("a")
     for a in atags:
         href = a.get("href")
         if href:
             if "xml" in href or "rss" in href or "feed" in href:
-                possible_feeds.append(href)
-    for url in list(set(possible_feeds)):
-        parsed_feed_url = urllib.parse.urlparse(url)
-        if parsed_feed_url.scheme == '':
-            scheme = 'https'
-        else:
-            scheme = parsed_feed_url.scheme
-        if parsed_feed_url.netloc == '':
-            netloc = parsed_url.hostname
-        else:
-            netloc = parsed_feed_url.netloc
-        feed_url = scheme + '://' + netloc + parsed_feed_url.path
-        f = feedparser.parse(feed_url)
-        if len(f.entries) > 0:
-            if feed_url not in result:
-                result.append(feed_url)
-    return result
+                links.append(href)
+    return alternates, links
 
 
-def parse_meta(url: str) -> Tuple[list, list]:
+def feed_candidates(site: str, alternates: list, links: list = None) -> list:
+    """ possible feed urls of a website, the most likely ones first """
+    candidates = [site + '/rss']
+    for url in alternates + (links or []):
+        # relative links keep the scheme and port of the site
+        parsed_feed_url = urllib.parse.urlparse(urllib.parse.urljoin(site + '/', url))
+        if parsed_feed_url.scheme not in ['http', 'https']:
+            continue
+        feed_url = parsed_feed_url.scheme + '://' + parsed_feed_url.netloc + parsed_feed_url.path
+        if feed_url not in candidates:
+            candidates.append(feed_url)
+    return candidates
+
+
+def probe_feed(url: str) -> bool:
+    """
+        Check whether the url is a feed with entries.
+        Only the beginning of the document is requested and sniffed,
+        the full document is only downloaded if the beginning has no entries.
+    """
+    import feedparser
+
+    size = current_app.config.get('FEEDS_PROBE_SIZE', 16384)
+    headers = {'user-agent': USER_AGENT,
+               'accept': FEED_ACCEPT,
+               'range': f'bytes=0-{size - 1}'}
+    r = http_client.get(url, headers=headers, max_size=size, truncate=True)
+    if r.status_code not in [200, 206]:
+        return False
 
-    urls = []
-    names = []
+    content_type = r.headers.get('Content-Type', '').lower()
+    head = r.content[:2048].lower()
+    if not any(signature in head for signature in FEED_SIGNATURES):
+        return False
+    if 'html' in content_type and b'<html' in head:
+        return False
 
-    site = build_url(url)
-    if not site:
-        return False, False
+    if len(feedparser.parse(r.content).entries) > 0:
+        return True
 
-    r = perform_request(site)
+    if r.truncated or r.status_code == 206:
+        r = http_client.get(url, headers={'user-agent': USER_AGENT, 'accept': FEED_ACCEPT})
+        return r.status_code == 200 and len(feedparser.parse(r.content).entries) > 0
 
-    if not r:
-        return False, False
+    return False
 
-    if not r.ok:
-        return False, False
 
-    soup = bs4(r.content, 'lxml')
+def probe_feeds(candidates: list, max_feeds: int = None) -> list:
+    """
+        Probe the candidates concurrently (at most `FEEDS_PROBE_WORKERS` at once)
+        and stop as soon as `max_feeds` valid feeds were found.
+        Returns the valid feeds in the order of the candidates.
+    """
+    from flaskinventory.add.enrichment import _with_app_context
 
-    ogtitle, ogurl = opengraph(soup)
-    schema_name, schema_url = schemaorg(soup)
+    if len(candidates) == 0:
+        return []
+
+    app = current_app._get_current_object()
+    max_feeds = max_feeds or app.config.get('FEEDS_MAX', 3)
+    workers = min(app.config.get('FEEDS_PROBE_WORKERS', 8), len(candidates))
+
+    found = {}
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='feeds')
+    futures = {executor.submit(_with_app_context, app, probe_feed, url): i
+               for i, url in enumerate(candidates)}
+    try:
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                if future.result():
+                    found[i] = candidates[i]
+            except Exception as e:
+                app.logger.debug(f'Could not probe feed {candidates[i]}: {e}')
+            if len(found) >= max_feeds:
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    if ogtitle:
-        names.append(ogtitle)
+    return [found[i] for i in sorted(found)]
 
-    if schema_name:
-        names.append(schema_name)
 
-    if ogurl:
-        urls.append(ogurl)
+def find_feeds(site: Union[str, 'SiteAnalysis'], max_feeds: int = None) -> list:
+    if not isinstance(site, SiteAnalysis):
+        site = SiteAnalysis(site)
+    return site.feeds(max_feeds=max_feeds)
 
-    if schema_url:
-        urls.append(schema_url)
 
-    return list(set(names)), list(set(urls))
+def parse_meta(url: Union[str, 'SiteAnalysis']) -> Tuple[list, list]:
+    if not isinstance(url, SiteAnalysis):
+        url = SiteAnalysis(url)
+    return url.meta()
 
 
 def opengraph(soup: str) -> Tuple[str, str]:
@@ -250,6 +503,11 @@ def opengraph(soup: str) -> Tuple[str, str]:
 
 def schemaorg(soup: str) -> Tuple[str, str]:
     schemas = soup.find_all('script', type=re.compile(r'json'))
+    return schemaorg_webpage([item.string for item in schemas])
+
+
+def schemaorg_webpage(schemas: list) -> Tuple[str, str]:
+    """ name and url of the schema.org WebPage in a list of JSON-LD strings """
     if len(schemas) == 0:
         return False, False
 
@@ -258,7 +516,7 @@ def schemaorg(soup: str) -> Tuple[str, str]:
 
     for item in schemas:
         try:
-            parsed = json.loads(item.string.replace('&q;', '"'))
+            parsed = json.loads(item.replace('&q;', '"'))
             if parsed.get('@type'):
                 if parsed.get('@type').lower() == "webpage":
                     url = parsed.get('url')
@@ -270,7 +528,10 @@ def schemaorg(soup: str) -> Tuple[str, str]:
     return name, url
 
 
+@lookup_cache.cached('siterankdata')
 def siterankdata(site: str) -> Union[int, bool]:
+    from bs4 import BeautifulSoup as bs4
+
     if not isinstance(site, str):
         site = str(site)
     site = site.replace('http://', '').replace('https://',
@@ -279,7 +540,7 @@ def siterankdata(site: str) -> Union[int, bool]:
         site = site[:-1]
 
     current_app.logger.debug(f'requesting: {"https://siterankdata.com/" + site}')
-    r = requests.get("https://siterankdata.com/" + site, timeout=30)
+    r = http_client.get("https://siterankdata.com/" + site, timeout=30)
 
     if r.status_code != 200:
         current_app.logger.debug(f'Getting siterankdata failed! Status code: {r.status_code}')
@@ -299,73 +560,59 @@ def siterankdata(site: str) -> Union[int, bool]:
 
 
 def login_instagram():
-
-    L = instaloader.Instaloader()
-
-    if current_app.config.get("INSTAGRAM_USERNAME"):
-        try:
-            L.load_session_from_file(current_app.config.get("INSTAGRAM_USERNAME"))
-        except:
-            current_app.logger.debug('Not logged in to instagram, trying to log in aggain...')
-            L.login(current_app.config["INSTAGRAM_USERNAME"], 
-                current_app.config["INSTAGRAM_PASSWORD"])
-            try:
-                L.test_login()
-                L.save_session_to_file()
-            except Exception as e:
-                current_app.logger.error(f'Could not log in to Instagram. {e}')
-    
-    return L
-
+    """ logged in Instaloader, shared by all calls in this process """
+    return social_clients.instagram()
 
 
 def instagram(username):
+    import instaloader
 
     L = login_instagram()
 
-    try:
-        profile = instaloader.Profile.from_username(
-            L.context, username.lower())
-    except:
-        return False
+    # the shared Instaloader is not thread safe, profile data is loaded lazily
+    with social_clients.limit('instagram').acquire():
+        try:
+            profile = instaloader.Profile.from_username(
+                L.context, username.lower())
+        except:
+            return False
 
-    try:
-        followers = profile.followers
-    except KeyError:
-        followers = None
+        try:
+            followers = profile.followers
+        except KeyError:
+            followers = None
 
-    try:
-        fullname = profile.full_name
-    except KeyError:
-        fullname = None
+        try:
+            fullname = profile.full_name
+        except KeyError:
+            fullname = None
 
-    try:
-        verified = profile.is_verified
-    except:
-        verified = False
+        try:
+            verified = profile.is_verified
+        except:
+            verified = False
 
     return {'followers': followers, 'fullname': fullname, 'verified': verified}
 
 
 def generate_twitter_api():
-    twitter_auth = tweepy.OAuthHandler(current_app.config["TWITTER_CONSUMER_KEY"],
-                                       current_app.config["TWITTER_CONSUMER_SECRET"])
-    twitter_auth.set_access_token(current_app.config["TWITTER_ACCESS_TOKEN"],
-                                  current_app.config["TWITTER_ACCESS_SECRET"])
-
-    return tweepy.API(twitter_auth)
+    """ tweepy API, shared by all calls in this process """
+    return social_clients.twitter()
 
 
 def twitter(username):
     api = generate_twitter_api()
 
-    user = api.get_user(screen_name=username)
+    with social_clients.limit('twitter').acquire():
+        user = api.get_user(screen_name=username)
 
     return {'followers': user.followers_count, 'fullname': user.screen_name, 'joined': user.created_at, 'verified': user.verified}
 
 
 def facebook(username):
-    r = requests.get('https://www.facebook.com/' + username)
+    from bs4 import BeautifulSoup as bs4
+
+    r = http_client.get('https://www.facebook.com/' + username)
 
     if r.status_code != 200:
         return False
@@ -394,6 +641,7 @@ def facebook(username):
         return None
 
 
+@lookup_cache.cached('lookup_wikidata_id', key=lambda query: str(query).strip().lower())
 def lookup_wikidata_id(query):
 
     api = 'https://www.wikidata.org/w/api.php'
@@ -401,32 +649,42 @@ def lookup_wikidata_id(query):
     params = {'action': 'wbsearchentities',
               'search': query, 'format': 'json', 'language': 'en'}
 
-    result = {}
-
-    try:
-        r = requests.get(api, params=params)
-        get_id = r.json()
-        wikidataid = get_id['search'][0]['id']
-        return wikidataid
-    except:
+    # request errors are raised, so that they are not cached as "not found"
+    r = http_client.get(api, params=params)
+    r.raise_for_status()
+    search = r.json()['search']
+    if len(search) == 0:
         return False
+    return search[0]['id']
 
 
-def fetch_wikidata(wikidataid, query=None):
-    from flaskinventory.flaskdgraph.dgraph_types import UID, GeoScalar
+# ids per wbgetentities request (limit of the Wikidata API)
+WIKIDATA_BATCH_SIZE = 50
+
+
+def _wikidata_entities(wikidataids: list, props: str = None) -> dict:
+    """ entities for several ids, one wbgetentities request per `WIKIDATA_BATCH_SIZE` ids """
     api = 'https://www.wikidata.org/w/api.php'
-    result = {'wikidataID': int(wikidataid.replace('Q', ''))}
-    try:
+    entities = {}
+    for i in range(0, len(wikidataids), WIKIDATA_BATCH_SIZE):
         params = {'action': 'wbgetentities', 'languages': 'en',
-                  'ids': wikidataid, 'format': 'json'}
-        r = requests.get(api, params=params)
-        wikidata = r.json()
-    except:
-        return result
+                  'ids': '|'.join(wikidataids[i:i + WIKIDATA_BATCH_SIZE]), 'format': 'json'}
+        if props:
+            params['props'] = props
+        r = http_client.get(api, params=params)
+        entities.update(r.json()['entities'])
+    return entities
+
+
+def _parse_wikidata(wikidataid: str, entity: dict, query=None) -> Tuple[dict, str, str]:
+    """ returns the result, the wikidata id of the country (P17) and of the headquarters (P159) """
+    result = {'wikidataID': int(wikidataid.replace('Q', ''))}
+    country = None
+    headquarters = None
 
     result['other_names'] = []
     try:
-        aliases = wikidata['entities'][wikidataid]['aliases']['en']
+        aliases = entity['aliases']['en']
         for alias in aliases:
             result['other_names'].append(alias['value'])
     except Exception as e:
@@ -436,7 +694,7 @@ def fetch_wikidata(wikidataid, query=None):
     # P17: country, P571: inception, P1128: employees, P159: headquarters
 
     try:
-        inception = wikidata['entities'][wikidataid]['claims']['P571'][0]['mainsnak']['datavalue']['value']['time'].replace(
+        inception = entity['claims']['P571'][0]['mainsnak']['datavalue']['value']['time'].replace(
             '+', '')
         if re.match(r'\d{4}-00-00', inception):
             year = re.match(r'\d{4}-00-00', inception)[0].replace('-00-00', '')
@@ -448,42 +706,118 @@ def fetch_wikidata(wikidataid, query=None):
             f"Could not get inception date: {e}. Query: {query}. Wikidata ID: {wikidataid}")
 
     try:
-        country = wikidata['entities'][wikidataid]['claims']['P17'][0]['mainsnak']['datavalue']['value']['id'].replace(
-            'Q', '')
-        query_string = f'''{{q(func: eq(wikidataID, {country})) {{ name uid }} }}'''
-        country_uid = dgraph.query(query_string)
-
-        country_uid = country_uid['q'][0]['uid']
-        result['country'] = UID(country_uid)
+        country = entity['claims']['P17'][0]['mainsnak']['datavalue']['value']['id']
     except Exception as e:
         current_app.logger.debug(
             f"Could not get country: {e}. Query: {query}. Wikidata ID: {wikidataid}")
 
     try:
-        result['employees'] = wikidata['entities'][wikidataid]['claims']['P1128'][
+        result['employees'] = entity['claims']['P1128'][
             0]['mainsnak']['datavalue']['value']['amount'].replace('+', '')
     except Exception as e:
         current_app.logger.debug(
             f"Could not get employee count: {e}. Query: {query}. Wikidata ID: {wikidataid}")
 
     try:
-        headquarters = wikidata['entities'][wikidataid]['claims']['P159'][0]['mainsnak']['datavalue']['value']['id']
-        params = {'action': 'wbgetentities', 'languages': 'en',
-                  'ids': headquarters, 'format': 'json', 'props': 'labels'}
-        r = requests.get(api, params=params)
-        wikidata = r.json()
-        address = wikidata['entities'][headquarters]['labels']['en']['value']
-        geo_result = geocode(address)
-        address_geo = GeoScalar('Point', [
-            float(geo_result.get('lon')), float(geo_result.get('lat'))])
-
-        result['address_string'] = address
-        result['address_geo'] = address_geo
+        headquarters = entity['claims']['P159'][0]['mainsnak']['datavalue']['value']['id']
     except Exception as e:
         current_app.logger.debug(
             f"Could not get address: {e}. Query: {query}. Wikidata ID: {wikidataid}")
 
-    return result
+    return result, country, headquarters
+
+
+def _fetch_wikidata(wikidataids: list, queries: dict = None) -> dict:
+    """
+        Fetch several entities with one request and resolve their countries (gazetteer)
+        and headquarters (one request for all labels, geocoded together).
+        Returns `{wikidataid: result}`; a result with only the wikidata id means the request failed
+    """
+    from flaskinventory.flaskdgraph.dgraph_types import UID, GeoScalar
+    queries = queries or {}
+
+    try:
+        entities = _wikidata_entities(wikidataids)
+    except Exception as e:
+        current_app.logger.debug(f"Could not fetch wikidata: {e}. Wikidata IDs: {wikidataids}")
+        return {wikidataid: {'wikidataID': int(wikidataid.replace('Q', ''))} for wikidataid in wikidataids}
+
+    results = {}
+    countries = {}
+    headquarters = {}
+    for wikidataid in wikidataids:
+        if wikidataid not in entities:
+            results[wikidataid] = {'wikidataID': int(wikidataid.replace('Q', ''))}
+            continue
+        results[wikidataid], country, hq = _parse_wikidata(
+            wikidataid, entities[wikidataid], query=queries.get(wikidataid))
+        if country:
+            countries[wikidataid] = country
+        if hq:
+            headquarters[wikidataid] = hq
+
+    if len(countries) > 0:
+        try:
+            country_uids = gazetteer.wikidata_uids(list(set(countries.values())))
+            for wikidataid, country in countries.items():
+                if country in country_uids:
+                    results[wikidataid]['country'] = UID(country_uids[country])
+        except Exception as e:
+            current_app.logger.debug(
+                f"Could not get countries: {e}. Wikidata IDs: {list(countries.keys())}")
+
+    if len(headquarters) > 0:
+        try:
+            labels = _wikidata_entities(list(set(headquarters.values())), props='labels')
+            addresses = {wikidataid: labels[hq]['labels']['en']['value']
+                         for wikidataid, hq in headquarters.items()
+                         if 'en' in labels.get(hq, {}).get('labels', {})}
+            geo_results = geocoder.geocode_many(list(addresses.values()))
+            for (wikidataid, address), geo_result in zip(addresses.items(), geo_results):
+                if not geo_result:
+                    continue
+                results[wikidataid]['address_string'] = address
+                results[wikidataid]['address_geo'] = GeoScalar('Point', [
+                    float(geo_result.get('lon')), float(geo_result.get('lat'))])
+        except Exception as e:
+            current_app.logger.debug(
+                f"Could not get addresses: {e}. Wikidata IDs: {list(headquarters.keys())}")
+
+    return results
+
+
+# a result with only the wikidata id means the request failed
+@lookup_cache.cached('fetch_wikidata', key=lambda wikidataid, query=None: wikidataid,
+                     negative=lambda result: len(result) <= 1)
+def fetch_wikidata(wikidataid, query=None):
+    return _fetch_wikidata([wikidataid], queries={wikidataid: query})[wikidataid]
+
+
+def fetch_wikidata_many(wikidataids: list, queries: dict = None) -> dict:
+    """
+        Like `fetch_wikidata` for several ids with one wbgetentities request
+        (per `WIKIDATA_BATCH_SIZE` ids). Uses and fills the same cache.
+        Returns `{wikidataid: result}`
+    """
+    results = {}
+    missing = []
+    for wikidataid in dict.fromkeys(wikidataids):
+        entry = lookup_cache.get(fetch_wikidata.source, fetch_wikidata.key(wikidataid)) \
+            if lookup_cache.enabled else None
+        if entry is not None:
+            results[wikidataid] = entry['value']
+        else:
+            missing.append(wikidataid)
+
+    if len(missing) > 0:
+        fetched = _fetch_wikidata(missing, queries=queries)
+        for wikidataid, result in fetched.items():
+            if lookup_cache.enabled:
+                lookup_cache.set(fetch_wikidata.source, fetch_wikidata.key(wikidataid),
+                                 result, negative=len(result) <= 1)
+        results.update(fetched)
+
+    return results
 
 
 def get_wikidata(query):
@@ -496,6 +830,37 @@ def get_wikidata(query):
     return fetch_wikidata(wikidataid, query=query)
 
 
+def get_wikidata_many(queries: list) -> dict:
+    """
+        Like `get_wikidata` for several queries: the searches run concurrently
+        (at most `IDENTIFIER_LOOKUP_WORKERS` at once), the entities are fetched together.
+        Returns `{query: result}`, False if there is no result
+    """
+    from flaskinventory.add.enrichment import _with_app_context
+
+    if len(queries) == 0:
+        return {}
+
+    def lookup(query):
+        try:
+            return lookup_wikidata_id(query)
+        except Exception as e:
+            current_app.logger.warning(f'Could not search Wikidata for {query}: {e}')
+            return False
+
+    app = current_app._get_current_object()
+    workers = min(app.config.get('IDENTIFIER_LOOKUP_WORKERS', 8), len(queries))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wikidata') as executor:
+        wikidataids = dict(zip(queries, executor.map(
+            lambda query: _with_app_context(app, lookup, query), queries)))
+
+    found = {wikidataid: query for query, wikidataid in wikidataids.items() if wikidataid}
+    entities = fetch_wikidata_many(list(found.keys()), queries=found)
+
+    return {query: entities[wikidataid] if wikidataid else False
+            for query, wikidataid in wikidataids.items()}
+
+
 def vkontakte(screen_name):
     params = {
         "group_id": screen_name,
@@ -503,11 +868,9 @@ def vkontakte(screen_name):
         "v": "5.131",
         "fields": "id,name,screen_name,is_closed,type,description,site,verified,members_count"
     }
-    api = "https://api.vk.com/method/"
-    r = requests.get(api + "groups.getById", params=params)
-    if r.status_code != 200:
+    res = social_clients.vkontakte("groups.getById", params)
+    if not res:
         return False
-    res = r.json()
 
     if "response" not in res.keys():
         return False
@@ -526,22 +889,7 @@ def vkontakte(screen_name):
 
 def telegram(username):
 
-    async def get_profile(username):
-        bot = await TelegramClient('bot', current_app.config['TELEGRAM_APP_ID'], current_app.config['TELEGRAM_APP_HASH']).start(
-            bot_token=current_app.config['TELEGRAM_BOT_TOKEN'])
-        try:
-            profile = await bot.get_entity(username)
-        except ValueError as e:
-            profile = False
-            try: 
-                profile = await bot.get_entity(username + '_bot')
-            except ValueError as e:
-                profile = False
-
-        await bot.disconnect()
-        return profile
-
-    profile = asyncio.new_event_loop().run_until_complete(get_profile(username))
+    profile = telegram_client.get_entity(username)
     if not hasattr(profile, 'to_dict') or profile == False:
         return False
     profile = profile.to_dict()
@@ -552,31 +900,34 @@ def telegram(username):
     followers = None
 
     if profile['_'] == 'Channel':
-        api = "https://api.telegram.org/bot"
-        params = {'chat_id': '@' + username}
-        r = requests.get(
-            api + current_app.config['TELEGRAM_BOT_TOKEN'] + '/getChatMemberCount', params=params)
         try:
-            followers = r.json().get('result')
-        except:
+            followers = telegram_client.get_member_count(username)
+        except Exception as e:
+            current_app.logger.debug(f'Could not get member count of {username}: {e}')
             followers = None
         fullname = profile.get('title')
 
     return {'followers': followers, 'fullname': fullname, 'joined': joined, 'verified': verified, 'telegram_id': telegram_id}
 
 
-
-def doi(doi: str) -> Union[dict, bool]:
-    # clean input string
+def clean_doi(doi: str) -> str:
+    doi = doi.strip()
     doi = doi.replace("https://doi.org/", "")
     doi = doi.replace("http://doi.org/", "")
     doi = doi.replace("doi.org/", "")
+    return doi
+
+
+@lookup_cache.cached('doi', key=lambda doi: clean_doi(doi))
+def doi(doi: str) -> Union[dict, bool]:
+    # clean input string
+    doi = clean_doi(doi)
 
     from flaskinventory.flaskdgraph.dgraph_types import Scalar
 
-    api = 'https://api.crossref.org/works/'
+    api = current_app.config.get('CROSSREF_API', 'https://api.crossref.org/works/')
 
-    r = requests.get(api + doi)
+    r = http_client.get(api + doi)
 
     if r.status_code != 200:
         return False
@@ -618,50 +969,48 @@ def doi(doi: str) -> Union[dict, bool]:
     return result
 
 
-def arxiv(arxiv: str) -> Union[dict, bool]:
-    from flaskinventory.flaskdgraph.dgraph_types import Scalar
-
-    # clean input string
+def clean_arxiv(arxiv: str) -> str:
+    arxiv = arxiv.strip()
     arxiv = arxiv.replace('https://arxiv.org/abs/', '')
     arxiv = arxiv.replace('http://arxiv.org/abs/', '')
     arxiv = arxiv.replace('arxiv.org/abs/', '')
     arxiv = arxiv.replace('abs/', '')
+    return arxiv
 
-    api = "http://export.arxiv.org/api/query"
 
-    r = requests.get(api, params={'id_list': arxiv})
+def _arxiv_query(arxiv_ids: list) -> 'BeautifulSoup':
+    """ query the arXiv API for several ids at once, returns the parsed Atom feed or False """
+    from bs4 import BeautifulSoup as bs4
+
+    api = current_app.config.get('ARXIV_API', 'http://export.arxiv.org/api/query')
+
+    r = http_client.get(api, params={'id_list': ','.join(arxiv_ids),
+                                     'max_results': len(arxiv_ids)})
 
     if r.status_code != 200:
         return False
 
-    soup = bs4(r.content, 'lxml')
+    return bs4(r.content, 'lxml')
 
-    try:
-        total_results = soup.find('opensearch:totalresults').text
-    except:
-        try:
-            total_results = soup.find('opensearch:totalResults').text
-        except:
-            return False
-    
-    if int(total_results) < 1:
-        return False
+
+def _parse_arxiv_entry(entry, arxiv: str) -> Union[dict, bool]:
+    from flaskinventory.flaskdgraph.dgraph_types import Scalar
 
     result = {'arxiv': arxiv}
 
     try:
-        result['arxiv'] = soup.entry.id.get_text()
+        result['arxiv'] = entry.id.get_text()
     except:
         return False
 
     try:
-        result['title'] = soup.entry.title.get_text().replace('\n', ' ')
+        result['title'] = entry.title.get_text().replace('\n', ' ')
     except:
         return False
 
     authors = []
     try:
-        for i, author_tag in enumerate(soup.entry.find_all('author')):
+        for i, author_tag in enumerate(entry.find_all('author')):
             author = author_tag.find('name').text
             author = author.split(" ")[-1] + ', ' + " ".join(author.split(" ")[0:-1])
             authors.append(Scalar(author, facets={'sequence': i}))
@@ -671,25 +1020,106 @@ def arxiv(arxiv: str) -> Union[dict, bool]:
     result['authors'] = authors
 
     try:
-        result['published_date'] = dateparser.parse(soup.entry.published.text)
+        result['published_date'] = dateparser.parse(entry.published.text)
     except Exception as e:
         current_app.logger.warning(f'Could not parse publication date in ArXiv: {arxiv}')
 
     try:
-        result['description'] = soup.entry.summary.get_text(strip=True).replace('\n', ' ')
+        result['description'] = entry.summary.get_text(strip=True).replace('\n', ' ')
     except Exception as e:
         current_app.logger.warning(f'Could not parse abstract in ArXiv: {arxiv}')
 
     return result
 
 
+@lookup_cache.cached('arxiv', key=lambda arxiv: clean_arxiv(arxiv))
+def arxiv(arxiv: str) -> Union[dict, bool]:
+
+    # clean input string
+    arxiv = clean_arxiv(arxiv)
+
+    soup = _arxiv_query([arxiv])
+
+    if not soup:
+        return False
+
+    try:
+        total_results = soup.find('opensearch:totalresults').text
+    except:
+        try:
+            total_results = soup.find('opensearch:totalResults').text
+        except:
+            return False
+    
+    if int(total_results) < 1:
+        return False
+
+    return _parse_arxiv_entry(soup.entry, arxiv)
+
+
+ARXIV_VERSION = re.compile(r'v\d+$')
+
+# ids per request to the arXiv API
+ARXIV_BATCH_SIZE = 50
+
+
+def arxiv_many(arxiv_ids: list) -> dict:
+    """
+        Look up several arXiv ids with one API call per `ARXIV_BATCH_SIZE` ids
+        (instead of one call per id). Uses and fills the same cache as `arxiv`.
+        Returns `{arxiv_id: result}`, keyed by the given ids; result is False if not found.
+    """
+    results = {}
+    missing = {}
+    for arxiv_id in arxiv_ids:
+        cleaned = clean_arxiv(arxiv_id)
+        entry = lookup_cache.get(arxiv.source, arxiv.key(cleaned)) if lookup_cache.enabled else None
+        if entry is not None:
+            results[arxiv_id] = entry['value']
+        else:
+            missing.setdefault(cleaned, []).append(arxiv_id)
+
+    cleaned_ids = list(missing.keys())
+    for i in range(0, len(cleaned_ids), ARXIV_BATCH_SIZE):
+        batch = cleaned_ids[i:i + ARXIV_BATCH_SIZE]
+        soup = _arxiv_query(batch)
+        entries = {}
+        if soup:
+            for entry in soup.find_all('entry'):
+                try:
+                    entry_id = entry.id.get_text().strip()
+                except AttributeError:
+                    continue
+                if '/api/errors' in entry_id:
+                    # one malformed id fails the whole request
+                    entries = None
+                    break
+                entry_id = entry_id.split('/abs/')[-1]
+                entries[entry_id] = entry
+                entries.setdefault(ARXIV_VERSION.sub('', entry_id), entry)
+
+        for cleaned in batch:
+            if entries is None:
+                result = arxiv(cleaned)
+            else:
+                entry = entries.get(cleaned) or entries.get(ARXIV_VERSION.sub('', cleaned))
+                result = _parse_arxiv_entry(entry, cleaned) if entry else False
+                if lookup_cache.enabled and (soup or result):
+                    lookup_cache.set(arxiv.source, arxiv.key(cleaned), result, negative=not result)
+            for arxiv_id in missing[cleaned]:
+                results[arxiv_id] = result
+
+    return results
+
+
 GITHUB_REGEX = re.compile(r"https?://github\.com/(.*)")
 
+@lookup_cache.cached('cran')
 def cran(pkg) -> Union[dict, bool]:
 
-    api = 'https://crandb.r-pkg.org/'
+    api = current_app.config.get('CRAN_API', 'https://crandb.r-pkg.org/')
 
-    r = requests.get(api + pkg)
+    r = http_client.get(api + pkg)
 
     if r.status_code != 200:
         return False
@@ -749,4 +1179,46 @@ def cran(pkg) -> Union[dict, bool]:
     if len(authors) > 0:
         result['authors'] = ";".join(authors)
 
-    return result
\ No newline at end of file
+    return result
+
+
+def lookup_identifiers(identifiers: dict) -> dict:
+    """
+        Resolve many identifiers at once, e.g., `{'doi': [...], 'arxiv': [...], 'cran': [...]}`.
+        arXiv ids are looked up in batches, DOIs and CRAN packages concurrently
+        (at most `IDENTIFIER_LOOKUP_WORKERS` at once).
+        Returns `{field: {identifier: result}}`; result is False if the identifier was not found
+        or the lookup failed.
+    """
+    from flaskinventory.add.enrichment import _with_app_context
+
+    app = current_app._get_current_object()
+    lookups = {'doi': doi, 'cran': cran}
+    results = {field: {} for field in identifiers}
+
+    jobs = [(field, identifier) for field, values in identifiers.items()
+            if field in lookups for identifier in values]
+
+    if len(identifiers.get('arxiv') or []) > 0:
+        try:
+            results['arxiv'] = arxiv_many(identifiers['arxiv'])
+        except Exception as e:
+            app.logger.warning(f'Could not look up arXiv ids: {e}')
+            results['arxiv'] = {identifier: False for identifier in identifiers['arxiv']}
+
+    if len(jobs) == 0:
+        return results
+
+    workers = min(app.config.get('IDENTIFIER_LOOKUP_WORKERS', 8), len(jobs))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='identifiers') as executor:
+        futures = {executor.submit(_with_app_context, app, lookups[field], identifier): (field, identifier)
+                   for field, identifier in jobs}
+        for future in as_completed(futures):
+            field, identifier = futures[future]
+            try:
+                results[field][identifier] = future.result()
+            except Exception as e:
+                app.logger.warning(f'Could not look up {field} {identifier}: {e}')
+                results[field][identifier] = False
+
+    return results
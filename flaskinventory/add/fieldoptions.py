@@ -0,0 +1,97 @@
+"""
+    Precomputed payload of `endpoint.fieldoptions` (choices of the new source form).
+
+    The payload is serialized and compressed once and served with an `ETag`,
+    so browsers only download it again when it changed (otherwise: 304).
+    It is rebuilt after entries of one of the types in the payload
+    were written by this process (see `notify`) and every `FIELDOPTIONS_TTL` seconds.
+"""
+
+import gzip
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from flask import current_app, request
+
+
+class FieldOptions:
+
+    dgraph_types = ('Channel', 'Country', 'Dataset', 'Archive', 'Subunit', 'Multinational')
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # (body, gzipped body, etag)
+        self._payload = None
+        self._loaded = None
+        self._stale = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FIELDOPTIONS_TTL', 300)
+
+    """
+        Building
+    """
+
+    def build(self, data: dict):
+        body = current_app.json.dumps(data).encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        self._payload = (body, gzip.compress(body, compresslevel=9), etag)
+        self._loaded = time.time()
+        self._stale = False
+        self.logger.debug(f'Built field options: {len(body)} bytes, ETag {etag}')
+
+    def load(self):
+        from flaskinventory.add.dgraph import generate_fieldoptions
+        self.build(generate_fieldoptions())
+
+    def invalidate(self):
+        """ rebuild with the next request """
+        self._stale = True
+
+    def notify(self, dgraph_type: str = None, set_nquads: str = None):
+        """ call after a mutation: invalidates the payload if it wrote entries of its types """
+        if dgraph_type in self.dgraph_types:
+            self.invalidate()
+        elif set_nquads and re.search(r'<dgraph\.type> "(' + '|'.join(self.dgraph_types) + ')"', set_nquads):
+            self.invalidate()
+
+    @property
+    def payload(self) -> tuple:
+        """ (body, gzipped body, etag), rebuilds it if required (the last payload is used if that fails) """
+        with self._lock:
+            if self._payload is None or self._stale or \
+                    time.time() - self._loaded > current_app.config['FIELDOPTIONS_TTL']:
+                try:
+                    self.load()
+                except Exception as e:
+                    if self._payload is None:
+                        raise
+                    self.logger.warning(f'Could not rebuild field options: {e}')
+            return self._payload
+
+    """
+        Serving
+    """
+
+    def response(self):
+        body, gzipped, etag = self.payload
+        if request.accept_encodings['gzip']:
+            response = current_app.response_class(gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+            # the compressed representation needs its own (strong) ETag
+            etag = f'{etag}-gzip'
+        else:
+            response = current_app.response_class(body, mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        response.set_etag(etag)
+        # browsers always revalidate, unchanged payloads are answered with 304
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
@@ -0,0 +1,236 @@
+"""
+    In-memory gazetteer of all geographic entries (Countries, Multinationals and Subunits).
+
+    Maps country codes, Wikidata IDs, names and other names to uids, so that
+    geographic lookups do not need DGraph (or Nominatim, for subunits that
+    are already in the inventory). The index is built from the live nodes
+    and complemented with the names and codes in `data/countries.json`
+    and `data/countries_nonopted.json`.
+
+    It is reloaded every `GAZETTEER_TTL` seconds and after geographic entries
+    were written by this process (see `notify`), by one request at a time.
+    If DGraph is not reachable, the last loaded index is used (and loading is
+    retried after `retry_interval` seconds); before the first load all lookups fall back to DGraph.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Union
+
+from flask import current_app
+from slugify import slugify
+
+DATA_FILES = [Path(__file__).resolve().parents[2] / 'data' / 'countries.json',
+              Path(__file__).resolve().parents[2] / 'data' / 'countries_nonopted.json']
+
+
+class Gazetteer:
+
+    dgraph_types = ('Country', 'Multinational', 'Subunit')
+
+    fields = 'uid name other_names unique_name country_code wikidataID opted_scope'
+
+    # seconds before loading is retried after a failure
+    retry_interval = 60
+
+    def __init__(self, app=None, data_files: list = None):
+        self.logger = logging.getLogger(__name__)
+        self.data_files = data_files or DATA_FILES
+        # {unique_name: entry} from the data files, loaded once
+        self._static = None
+        # {uid: entry}
+        self._entries = {}
+        # {country_code: uid} of countries
+        self._codes = {}
+        # {wikidataID: uid}
+        self._wikidata = {}
+        # {dgraph_type: {slug: set of uids}}
+        self._names = {}
+        self._lock = threading.Lock()
+        # held by the request that (re)loads the gazetteer
+        self._loading = threading.Lock()
+        self._loaded = None
+        self._stale = False
+        # no (re)load before (after a failure)
+        self._retry = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GAZETTEER', True)
+        app.config.setdefault('GAZETTEER_TTL', 300)
+
+    @staticmethod
+    def slug(name: str) -> str:
+        return slugify(str(name), separator='_')
+
+    """
+        Loading
+    """
+
+    def load_static(self) -> dict:
+        if self._static is not None:
+            return self._static
+        static = {}
+        for path in self.data_files:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.debug(f'Could not read {path}: {e}')
+                continue
+            if isinstance(data, dict):
+                data = data.get('set', [])
+            for entry in data:
+                if entry.get('unique_name'):
+                    static[entry['unique_name']] = entry
+        self._static = static
+        return static
+
+    def load(self):
+        from flaskinventory import dgraph
+        query_string = f'''{{
+            c(func: type(Country)) {{ {self.fields} }}
+            m(func: type(Multinational)) {{ {self.fields} }}
+            s(func: type(Subunit)) {{ {self.fields} country {{ uid }} }}
+        }}'''
+        data = dgraph.query(query_string)
+        self.build(Country=data['c'], Multinational=data['m'], Subunit=data['s'])
+
+    def build(self, **nodes):
+        """ (re)build the index from live nodes: `build(Country=[...], Multinational=[...], Subunit=[...])` """
+        static = self.load_static()
+        static_codes = {entry['country_code']: entry for entry in static.values() if entry.get('country_code')}
+        entries, codes, wikidata = {}, {}, {}
+        names = {dgraph_type: {} for dgraph_type in self.dgraph_types}
+
+        for dgraph_type in self.dgraph_types:
+            for node in nodes.get(dgraph_type, []):
+                entry = dict(node, dgraph_type=dgraph_type)
+                if isinstance(entry.get('country'), list):
+                    entry['country'] = entry['country'][0] if len(entry['country']) > 0 else None
+                if isinstance(entry.get('country'), dict):
+                    entry['country'] = entry['country'].get('uid')
+                aliases = [entry.get('name')] + (entry.get('other_names') or [])
+                if dgraph_type == 'Subunit':
+                    if entry.get('unique_name'):
+                        # unique names end with the country code, e.g., "bavaria_de"
+                        aliases.append(re.sub(r'_[a-z]{2}$', '', entry['unique_name']))
+                else:
+                    known = static.get(entry.get('unique_name')) or static_codes.get(entry.get('country_code'))
+                    if known:
+                        aliases += [known.get('name')] + (known.get('other_names') or [])
+                        for key in ('country_code', 'wikidataID'):
+                            entry.setdefault(key, known.get(key))
+                    aliases.append(entry.get('unique_name'))
+                    if entry.get('country_code'):
+                        aliases.append(entry['country_code'])
+                        if dgraph_type == 'Country':
+                            codes[entry['country_code'].lower()] = entry['uid']
+                if entry.get('wikidataID'):
+                    wikidata.setdefault(int(entry['wikidataID']), entry['uid'])
+                for alias in aliases:
+                    if alias:
+                        names[dgraph_type].setdefault(self.slug(alias), set()).add(entry['uid'])
+                entries[entry['uid']] = entry
+
+        with self._lock:
+            self._entries, self._codes, self._wikidata, self._names = entries, codes, wikidata, names
+            self._loaded = time.time()
+        self.logger.debug(f'Loaded {len(entries)} geographic entries')
+
+    def invalidate(self):
+        """ reload with the next lookup """
+        self._stale = True
+
+    def notify(self, dgraph_type: str = None, set_nquads: str = None):
+        """ call after a mutation: invalidates the gazetteer if it wrote geographic entries """
+        if dgraph_type in self.dgraph_types:
+            self.invalidate()
+        elif set_nquads and re.search(r'<dgraph\.type> "(' + '|'.join(self.dgraph_types) + ')"', set_nquads):
+            self.invalidate()
+
+    def _reload(self):
+        # other requests continue with the current index (or DGraph) in the meantime
+        if time.time() < self._retry or not self._loading.acquire(blocking=False):
+            return
+        try:
+            # entries written while loading invalidate the gazetteer again
+            self._stale = False
+            self.load()
+        except Exception as e:
+            self.logger.warning(f'Gazetteer not available: {e}')
+            self._stale = True
+            self._retry = time.time() + self.retry_interval
+        finally:
+            self._loading.release()
+
+    @property
+    def active(self) -> bool:
+        """ True if the gazetteer is enabled and loaded, tries to (re)load it """
+        if not current_app.config.get('GAZETTEER'):
+            return False
+        if self._loaded is None or self._stale or \
+                time.time() - self._loaded > current_app.config['GAZETTEER_TTL']:
+            self._reload()
+        return self._loaded is not None
+
+    """
+        Lookups
+    """
+
+    def get(self, uid: str) -> Union[dict, None]:
+        if not self.active:
+            return None
+        return self._entries.get(uid)
+
+    def country_uid(self, country_code: str) -> Union[str, None]:
+        """ uid of the country with the ISO code, falls back to DGraph """
+        if not self.active:
+            from flaskinventory import dgraph
+            dql_string = '''
+            query get_country($country_code: string) {
+                q(func: eq(country_code, $country_code)) @filter(type("Country")) { uid }
+                }'''
+            dql_result = dgraph.query(dql_string, variables={'$country_code': country_code})
+            if len(dql_result['q']) == 0:
+                return None
+            return dql_result['q'][0]['uid']
+        return self._codes.get(country_code.lower())
+
+    def wikidata_uids(self, wikidataids: list) -> dict:
+        """
+            uids of geographic entries with the Wikidata IDs (`183` or `'Q183'`), falls back to DGraph.
+            Returns `{wikidataid: uid}` for the ids that were found
+        """
+        ids = {wikidataid: int(str(wikidataid).upper().replace('Q', '')) for wikidataid in wikidataids}
+        if not self.active:
+            from flaskinventory import dgraph
+            if len(ids) == 0:
+                return {}
+            query_string = f'''{{q(func: eq(wikidataID, [{', '.join(str(i) for i in set(ids.values()))}]))
+                                @filter(type(Country) OR type(Multinational) OR type(Subunit)) {{ uid wikidataID }} }}'''
+            found = {node['wikidataID']: node['uid'] for node in dgraph.query(query_string)['q']}
+        else:
+            found = self._wikidata
+        return {wikidataid: found[i] for wikidataid, i in ids.items() if i in found}
+
+    def match(self, name: str, dgraph_type: str = 'Subunit') -> set:
+        """ uids of the entries with this name, other name, unique name (or country code) """
+        if not self.active:
+            raise RuntimeError('Gazetteer not available')
+        return set(self._names[dgraph_type].get(self.slug(name), set()))
+
+    def entries(self, dgraph_type: str, opted: bool = None) -> list:
+        """ all entries of the type ordered by name, optionally filtered by `opted_scope` """
+        if not self.active:
+            raise RuntimeError('Gazetteer not available')
+        entries = [entry for entry in self._entries.values() if entry['dgraph_type'] == dgraph_type]
+        if opted is not None:
+            entries = [entry for entry in entries if bool(entry.get('opted_scope')) == opted]
+        return sorted(entries, key=lambda entry: entry.get('name') or '')
@@ -0,0 +1,210 @@
+"""
+    Rate limited geocoding service in front of Nominatim.
+
+    Lookups that are not cached are queued and sent by a single dispatcher
+    thread per process. The request rate is shared by all processes
+    (via the lookup cache database), identical lookups that are already
+    queued are merged, and when Nominatim throttles us (or is not reachable)
+    stale cached results are returned instead.
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError, wait
+from typing import Union
+
+import requests.exceptions
+from flask import current_app, has_app_context
+
+
+class GeocodingService:
+
+    # name of the shared rate limit
+    api_name = 'nominatim'
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # {(source, key): Future}
+        self._inflight = {}
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._next_slot = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GEOCODING_SERVICE', True)
+        # requests per second (Nominatim allows one)
+        app.config.setdefault('GEOCODING_RATE', 1.0)
+        # max. seconds a caller waits for a result, shorter than the deadline of
+        # `run_concurrently`, so that timed out lookups can fall back to stale results
+        app.config.setdefault('GEOCODING_TIMEOUT', 0.75 * app.config.get('ENRICHMENT_TIMEOUT', 20))
+        # seconds without requests after being throttled (unless Nominatim sends Retry-After)
+        app.config.setdefault('GEOCODING_THROTTLE_DELAY', 60)
+
+    @property
+    def enabled(self) -> bool:
+        return has_app_context() and bool(current_app.config.get('GEOCODING_SERVICE'))
+
+    @staticmethod
+    def _functions() -> dict:
+        from flaskinventory.add.external import nominatim_search, nominatim_reverse
+        return {'geocode': nominatim_search,
+                'reverse_geocode': nominatim_reverse}
+
+    """
+        Lookups
+    """
+
+    def geocode(self, address: str) -> Union[dict, bool]:
+        return self.lookup('geocode', address)
+
+    def reverse_geocode(self, lat, lon) -> Union[dict, bool]:
+        return self.lookup('reverse_geocode', lat, lon)
+
+    def geocode_many(self, addresses: list) -> list:
+        """ geocode several addresses, waits once for all of them """
+        return self.lookup_many('geocode', [(address,) for address in addresses])
+
+    def lookup(self, source: str, *args) -> Union[dict, bool]:
+        return self.lookup_many(source, [args])[0]
+
+    def lookup_many(self, source: str, args_list: list) -> list:
+        """ results are in the same order as `args_list`, False if there is no result """
+        func = self._functions()[source]
+        if not self.enabled:
+            return [self._call(func, args) for args in args_list]
+
+        keys = [func.key(*args) for args in args_list]
+        futures = [self.submit(source, key, args) for key, args in zip(keys, args_list)]
+        wait(futures, timeout=current_app.config['GEOCODING_TIMEOUT'])
+
+        results = []
+        for key, future in zip(keys, futures):
+            try:
+                results.append(future.result(timeout=0))
+            except TimeoutError:
+                self.logger.warning(f'Geocoding timed out: {key}')
+                results.append(self._stale(source, key))
+        return results
+
+    def submit(self, source: str, key: str, args: tuple) -> Future:
+        """ returns a Future, merges identical lookups that are still pending """
+        from flaskinventory import lookup_cache
+        try:
+            entry = lookup_cache.get(source, key) if lookup_cache.enabled else None
+        except sqlite3.Error:
+            entry = None
+        if entry is not None:
+            future = Future()
+            future.set_result(entry['value'])
+            return future
+
+        self._ensure_dispatcher()
+        with self._lock:
+            if (source, key) in self._inflight:
+                return self._inflight[(source, key)]
+            future = Future()
+            self._inflight[(source, key)] = future
+        self._queue.put((current_app._get_current_object(), source, key, args, future))
+        return future
+
+    def _call(self, func, args: tuple) -> Union[dict, bool]:
+        try:
+            return func(*args)
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f'Geocoding failed: {e}')
+            return self._stale(func.source, func.key(*args))
+
+    def _stale(self, source: str, key: str) -> Union[dict, bool]:
+        from flaskinventory import lookup_cache
+        if not lookup_cache.enabled:
+            return False
+        try:
+            entry = lookup_cache.get(source, key, stale=True)
+        except sqlite3.Error:
+            return False
+        if entry is None:
+            return False
+        self.logger.debug(f'Using stale geocoding result: {key}')
+        return entry['value']
+
+    """
+        Dispatcher
+    """
+
+    def _ensure_dispatcher(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # queue and pending lookups belong to the parent process
+                self._queue = queue.Queue()
+                self._inflight = {}
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._dispatch,
+                                                name='geocoding-dispatcher',
+                                                daemon=True)
+                self._thread.start()
+
+    def _dispatch(self):
+        while True:
+            app, source, key, args, future = self._queue.get()
+            try:
+                with app.app_context():
+                    result = self._run(source, key, args)
+            except Exception as e:
+                self.logger.error(f'Geocoding failed: {e}')
+                result = False
+            with self._lock:
+                self._inflight.pop((source, key), None)
+            future.set_result(result)
+
+    def _wait_for_slot(self):
+        from flaskinventory import lookup_cache
+        interval = 1 / current_app.config['GEOCODING_RATE']
+        try:
+            slot = lookup_cache.reserve_slot(self.api_name, interval)
+        except sqlite3.Error as e:
+            # without the shared database, at least limit this process
+            self.logger.warning(f'Shared rate limit not available: {e}')
+            slot = max(time.time(), self._next_slot)
+            self._next_slot = slot + interval
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _run(self, source: str, key: str, args: tuple) -> Union[dict, bool]:
+        from flaskinventory import lookup_cache
+        from flaskinventory.add.external import NominatimThrottled
+        func = self._functions()[source]
+        # another process might have done the lookup in the meantime
+        try:
+            entry = lookup_cache.get(source, key) if lookup_cache.enabled else None
+        except sqlite3.Error:
+            entry = None
+        if entry is not None:
+            return entry['value']
+
+        self._wait_for_slot()
+        try:
+            return func(*args)
+        except NominatimThrottled as e:
+            retry_after = e.response.headers.get('Retry-After', '') if e.response is not None else ''
+            delay = int(retry_after) if retry_after.isdigit() else current_app.config['GEOCODING_THROTTLE_DELAY']
+            self.logger.warning(f'Nominatim throttled, pausing for {delay} seconds')
+            try:
+                lookup_cache.pause(self.api_name, time.time() + delay)
+            except sqlite3.Error:
+                self._next_slot = time.time() + delay
+            return self._stale(source, key)
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f'Geocoding failed: {e}')
+            return self._stale(source, key)
@@ -0,0 +1,205 @@
+"""
+    Shared HTTP client for all external lookups.
+
+    All threads of a process share one connection pool per host (keep-alive),
+    so repeated calls to the same API (e.g., Wikidata) reuse their connections.
+    Every request gets default connect / read timeouts, the number of concurrent
+    requests per host is capped and response bodies are limited in size.
+
+    With `HTTP_STANDIN` all requests are sent to a stand-in server instead
+    (see tests/standin.py), e.g., for offline tests and benchmarks.
+"""
+
+import logging
+import os
+import threading
+import urllib.parse
+from typing import Callable
+
+import requests
+import requests.exceptions
+from requests.adapters import HTTPAdapter
+
+from flask import current_app, has_app_context
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """ The response body exceeds `HTTP_MAX_RESPONSE_SIZE` """
+
+
+class HostBusy(requests.exceptions.RequestException):
+    """ No free slot for the host within `HTTP_HOST_WAIT` seconds """
+
+
+class StandInAdapter(HTTPAdapter):
+    """
+        Sends every request to a stand-in server: `https://host/path?query`
+        becomes `{standin}/host/path?query`
+    """
+
+    def __init__(self, standin: str, **kwargs):
+        self.standin = standin.rstrip('/')
+        super().__init__(**kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        url = urllib.parse.urlsplit(request.url)
+        if not request.url.startswith(self.standin):
+            request.url = f'{self.standin}/{url.netloc}{url.path or "/"}' + (f'?{url.query}' if url.query else '')
+        return super().send(request, **kwargs)
+
+
+class HTTPClient:
+
+    defaults = {'HTTP_CONNECT_TIMEOUT': 5,
+                'HTTP_READ_TIMEOUT': 20,
+                'HTTP_MAX_PER_HOST': 4,
+                'HTTP_POOL_HOSTS': 32,
+                'HTTP_HOST_WAIT': 30,
+                'HTTP_MAX_RESPONSE_SIZE': 10 * 1024 * 1024,
+                'HTTP_STANDIN': None}
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._adapter = None
+        # {host: BoundedSemaphore}
+        self._hosts = {}
+        self._pid = None
+        self._standin = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, val in self.defaults.items():
+            app.config.setdefault(key, val)
+
+    def setting(self, key: str):
+        if has_app_context():
+            return current_app.config.get(key, self.defaults[key])
+        return self.defaults[key]
+
+    """
+        Sessions & Pools
+    """
+
+    def _ensure_process(self):
+        # connection pools must not be shared with forked processes
+        if self._pid != os.getpid() or self._standin != self.setting('HTTP_STANDIN'):
+            with self._lock:
+                if self._pid != os.getpid() or self._standin != self.setting('HTTP_STANDIN'):
+                    self._reset()
+
+    def _reset(self):
+        self._standin = self.setting('HTTP_STANDIN')
+        self._adapter = self.adapter(pool_connections=self.setting('HTTP_POOL_HOSTS'),
+                                     pool_maxsize=self.setting('HTTP_MAX_PER_HOST'),
+                                     max_retries=0)
+        self._hosts = {}
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def adapter(self, **kwargs) -> HTTPAdapter:
+        """ transport adapter, also for clients with their own session (e.g., tweepy) """
+        if self.setting('HTTP_STANDIN'):
+            return StandInAdapter(self.setting('HTTP_STANDIN'), **kwargs)
+        return HTTPAdapter(**kwargs)
+
+    @property
+    def session(self) -> requests.Session:
+        """
+            Session of the current thread.
+            Cookies are per thread, the connection pools are shared by all threads.
+        """
+        self._ensure_process()
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        self._ensure_process()
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(
+                    self.setting('HTTP_MAX_PER_HOST'))
+            return self._hosts[host]
+
+    def close(self):
+        with self._lock:
+            if self._adapter is not None:
+                self._adapter.close()
+            self._pid = None
+
+    """
+        Requests
+    """
+
+    def request(self, method: str, url: str, timeout=None, max_size: int = None,
+                truncate: bool = False, stop: Callable[[bytes], bool] = None,
+                **kwargs) -> requests.Response:
+        """
+            Like `requests.request`, but with pooled connections and default timeouts.
+            `timeout` is either a number (read timeout) or a tuple (connect, read).
+            Raises `ResponseTooLarge` if the body exceeds `max_size` bytes
+            (with `truncate` only the first `max_size` bytes are read instead)
+            and `HostBusy` if the host has too many requests in flight.
+            `stop` is called with every chunk of the body, reading stops when it returns True.
+            `response.truncated` tells whether the body was not read completely.
+        """
+        session = self.session
+        if timeout is None:
+            timeout = self.setting('HTTP_READ_TIMEOUT')
+        if not isinstance(timeout, tuple):
+            timeout = (self.setting('HTTP_CONNECT_TIMEOUT'), timeout)
+        max_size = max_size or self.setting('HTTP_MAX_RESPONSE_SIZE')
+
+        slot = self._host_slot(url)
+        if not slot.acquire(timeout=self.setting('HTTP_HOST_WAIT')):
+            raise HostBusy(f'Too many concurrent requests to {url}')
+        try:
+            r = session.request(method, url, timeout=timeout, stream=True, **kwargs)
+            try:
+                self._read(r, max_size, truncate=truncate, stop=stop)
+            finally:
+                r.close()
+        finally:
+            slot.release()
+        return r
+
+    def _read(self, r: requests.Response, max_size: int, truncate: bool = False,
+              stop: Callable[[bytes], bool] = None):
+        """ read the body and give the connection back to the pool """
+        content_length = r.headers.get('Content-Length', '')
+        if not truncate and content_length.isdigit() and int(content_length) > max_size:
+            raise ResponseTooLarge(f'Response of {r.url} is too large: {content_length} bytes', response=r)
+        body = bytearray()
+        r.truncated = False
+        for chunk in r.iter_content(self.chunk_size):
+            body += chunk
+            if len(body) > max_size:
+                if not truncate:
+                    raise ResponseTooLarge(f'Response of {r.url} exceeds {max_size} bytes', response=r)
+                body = body[:max_size]
+                r.truncated = True
+                break
+            if stop is not None and stop(chunk):
+                # the last chunk may also have been the end of the body
+                r.truncated = not (content_length.isdigit() and r.raw.tell() >= int(content_length))
+                break
+        r._content = bytes(body)
+        r._content_consumed = True
+
+    def get(self, url: str, params=None, **kwargs) -> requests.Response:
+        return self.request('GET', url, params=params, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
@@ -2,7 +2,7 @@
 from flask import (current_app, Blueprint, render_template, url_for,
                    flash, redirect, request, abort, jsonify)
 from flask_login import current_user, login_required
-from flaskinventory import dgraph
+from flaskinventory import dgraph, autocomplete, enrichment_queue, field_options, gazetteer
 from flaskinventory.flaskdgraph.schema import Schema
 from flaskinventory.add.forms import NewEntry, AutoFill
 from flaskinventory.add.dgraph import check_draft, get_draft, get_existing
@@ -135,7 +135,8 @@ def new(dgraph_type=None, draft=None, populate_form: dict = None):
                 data[k] = v
         if draft:
             try:
-                sanitizer = Sanitizer.edit(data, dgraph_type=dgraph_type)
+                sanitizer = Sanitizer.edit(data, dgraph_type=dgraph_type,
+                                           defer_enrichment=current_app.config.get('ENRICHMENT_DEFERRED'))
             except Exception as e:
                 if current_app.debug:
                     e_trace = traceback.format_exception(
@@ -145,7 +146,8 @@ def new(dgraph_type=None, draft=None, populate_form: dict = None):
                 return redirect(url_for('add.new', dgraph_type=dgraph_type, draft=form.data))
         else:
             try:
-                sanitizer = Sanitizer(data, dgraph_type=dgraph_type)
+                sanitizer = Sanitizer(data, dgraph_type=dgraph_type,
+                                      defer_enrichment=current_app.config.get('ENRICHMENT_DEFERRED'))
             except Exception as e:
                 if current_app.debug:
                     e_trace = traceback.format_exception(
@@ -160,20 +162,34 @@ def new(dgraph_type=None, draft=None, populate_form: dict = None):
                     sanitizer.upsert_query, del_nquads=sanitizer.delete_nquads, set_nquads=sanitizer.set_nquads)
             else:
                 result = dgraph.upsert(None, set_nquads=sanitizer.set_nquads)
-            flash(f'{dgraph_type} has been added!', 'success')
-            if sanitizer.is_upsert:
-                uid = str(sanitizer.entry_uid)
-            else:
-                newuids = dict(result.uids)
-                uid = newuids[str(sanitizer.entry_uid).replace('_:', '')]
-            return redirect(url_for('view.view_uid', uid=uid))
+            if not result:
+                raise Exception('DGraph Error - Could not perform mutation')
         except Exception as e:
+            sanitizer.release_unique_names()
             if current_app.debug:
                 e_trace = traceback.format_exception(None, e, e.__traceback__)
                 current_app.logger.debug(e_trace)
             flash(f'{dgraph_type} could not be added: {e}', 'danger')
             return redirect(url_for('add.new', dgraph_type=dgraph_type))
 
+        # the entry is committed: the following steps must not report a failure
+        newuids = dict(result.uids)
+        if sanitizer.is_upsert:
+            uid = str(sanitizer.entry_uid)
+        else:
+            uid = newuids[str(sanitizer.entry_uid).replace('_:', '')]
+        flash(f'{dgraph_type} has been added!', 'success')
+        try:
+            gazetteer.notify(dgraph_type, sanitizer.set_nquads)
+            field_options.notify(dgraph_type, sanitizer.set_nquads)
+            sanitizer.commit_unique_names(newuids)
+            autocomplete.update([uid])
+        except Exception as e:
+            current_app.logger.error(f'Could not update indexes after adding <{uid}>: {e}')
+        if len(sanitizer.enrichment_jobs) > 0:
+            enrichment_queue.enqueue_jobs(sanitizer.enrichment_jobs, newuids)
+        return redirect(url_for('view.view_uid', uid=uid))
+
     fields = list(form.data.keys())
     fields.remove('submit')
     fields.remove('csrf_token')
@@ -0,0 +1,269 @@
+"""
+    Per-process registry of API clients for social media platforms
+    (Instagram, Twitter, VK).
+
+    Clients are created (and logged in) once per process and app and reused.
+    The rate limits reported by the platforms are tracked per platform;
+    when a limit is almost used up, calls wait in line until it resets
+    (at most `SOCIAL_MAX_WAIT` seconds) instead of failing.
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Union
+
+from flask import current_app
+
+
+class PlatformLimit:
+    """
+        Rate limit state of one platform, shared by all threads of the process.
+        `concurrency` caps parallel calls, `min_interval` spaces calls out
+        (for platforms that only publish a request rate).
+    """
+
+    def __init__(self, name: str, concurrency: int = 1, min_interval: float = 0,
+                 max_wait: float = 60, margin: int = 1):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.min_interval = min_interval
+        self.max_wait = max_wait
+        self.margin = margin
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self.waiting = 0
+        self.throttled = 0
+        self._next = 0
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._condition = threading.Condition()
+
+    def update(self, remaining: int = None, reset: float = None, limit: int = None):
+        """ update with the values the platform reported (e.g., in response headers) """
+        with self._condition:
+            if limit is not None:
+                self.limit = limit
+            if remaining is not None:
+                self.remaining = remaining
+            if reset is not None:
+                self.reset = reset
+            self._condition.notify_all()
+
+    def pause(self, seconds: float):
+        """ the platform refused a request, no calls for the next `seconds` """
+        with self._condition:
+            self.throttled += 1
+            self.remaining = 0
+            self.reset = max(self.reset or 0, time.time() + seconds)
+
+    def _wait_turn(self):
+        deadline = time.time() + self.max_wait
+        with self._condition:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.time()
+                    if self.remaining is not None and self.remaining <= self.margin \
+                            and self.reset is not None and now < self.reset:
+                        until = self.reset
+                    elif now < self._next:
+                        until = self._next
+                    else:
+                        break
+                    if now >= deadline:
+                        self.logger.warning(f'{self.name}: rate limit not reset after {self.max_wait} seconds, trying anyway')
+                        break
+                    self._condition.wait(min(until, deadline) - now)
+                self._next = max(time.time(), self._next) + self.min_interval
+                if self.remaining is not None:
+                    self.remaining -= 1
+            finally:
+                self.waiting -= 1
+
+    @contextlib.contextmanager
+    def acquire(self):
+        self._wait_turn()
+        self._slots.acquire()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def status(self) -> dict:
+        return {'limit': self.limit,
+                'remaining': self.remaining,
+                'reset': self.reset,
+                'waiting': self.waiting,
+                'throttled': self.throttled}
+
+
+class SocialClients:
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._pid = None
+        # {app: {'clients': {platform: client}, 'limits': {platform: PlatformLimit}}}
+        # clients and limits are created from the config of the app
+        self._apps = weakref.WeakKeyDictionary()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # parallel calls per platform (instaloader is not thread safe)
+        concurrency = {'instagram': 1, 'twitter': 4, 'vkontakte': 3}
+        concurrency.update(app.config.get('SOCIAL_CONCURRENCY') or {})
+        app.config['SOCIAL_CONCURRENCY'] = concurrency
+        app.config.setdefault('SOCIAL_MAX_WAIT', 60)
+        # requests per second allowed by the VK API
+        app.config.setdefault('VK_RATE', 3)
+
+    def _check_process(self):
+        # sessions of a parent process must not be shared with forked processes
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._apps = weakref.WeakKeyDictionary()
+                    self._pid = os.getpid()
+
+    def _state(self) -> dict:
+        """ clients and limits of the current app """
+        self._check_process()
+        app = current_app._get_current_object()
+        with self._lock:
+            if app not in self._apps:
+                self._apps[app] = {'clients': {}, 'limits': {}}
+            return self._apps[app]
+
+    """
+        Rate Limits
+    """
+
+    def limit(self, platform: str) -> PlatformLimit:
+        limits = self._state()['limits']
+        with self._lock:
+            if platform not in limits:
+                min_interval = 0
+                if platform == 'vkontakte':
+                    min_interval = 1 / current_app.config['VK_RATE']
+                limits[platform] = PlatformLimit(
+                    platform,
+                    concurrency=current_app.config['SOCIAL_CONCURRENCY'].get(platform, 1),
+                    min_interval=min_interval,
+                    max_wait=current_app.config['SOCIAL_MAX_WAIT'])
+            return limits[platform]
+
+    def status(self) -> dict:
+        """ rate limit state of all platforms that were used by this process (and app) """
+        limits = self._state()['limits']
+        with self._lock:
+            return {platform: limit.status() for platform, limit in limits.items()}
+
+    """
+        Clients
+    """
+
+    def _get_client(self, platform: str, factory):
+        clients = self._state()['clients']
+        with self._lock:
+            if platform not in clients:
+                clients[platform] = factory()
+            return clients[platform]
+
+    def reset(self, platform: str):
+        """ drop a client (of all apps), e.g., when its session expired """
+        with self._lock:
+            for state in self._apps.values():
+                state['clients'].pop(platform, None)
+
+    def instagram(self):
+        return self._get_client('instagram', self._create_instagram)
+
+    def twitter(self):
+        return self._get_client('twitter', self._create_twitter)
+
+    def _create_instagram(self):
+        import instaloader
+
+        limit = self.limit('instagram')
+
+        class RateController(instaloader.RateController):
+
+            def handle_429(self, query_type: str):
+                limit.pause(self.query_waittime(query_type, time.monotonic(), True))
+                super().handle_429(query_type)
+
+        L = instaloader.Instaloader(quiet=True, rate_controller=RateController)
+
+        if current_app.config.get("INSTAGRAM_USERNAME"):
+            try:
+                L.load_session_from_file(current_app.config.get("INSTAGRAM_USERNAME"))
+            except:
+                current_app.logger.debug('Not logged in to instagram, trying to log in aggain...')
+                try:
+                    L.login(current_app.config["INSTAGRAM_USERNAME"],
+                            current_app.config["INSTAGRAM_PASSWORD"])
+                    L.test_login()
+                    L.save_session_to_file()
+                except Exception as e:
+                    current_app.logger.error(f'Could not log in to Instagram. {e}')
+
+        return L
+
+    def _create_twitter(self):
+        import tweepy
+
+        twitter_auth = tweepy.OAuthHandler(current_app.config["TWITTER_CONSUMER_KEY"],
+                                           current_app.config["TWITTER_CONSUMER_SECRET"])
+        twitter_auth.set_access_token(current_app.config["TWITTER_ACCESS_TOKEN"],
+                                      current_app.config["TWITTER_ACCESS_SECRET"])
+
+        api = tweepy.API(twitter_auth)
+        limit = self.limit('twitter')
+
+        def report_rate_limit(r, *args, **kwargs):
+            headers = r.headers
+            try:
+                limit.update(remaining=int(headers['x-rate-limit-remaining']),
+                             reset=float(headers['x-rate-limit-reset']),
+                             limit=int(headers['x-rate-limit-limit']))
+            except (KeyError, ValueError):
+                pass
+
+        api.session.hooks['response'].append(report_rate_limit)
+
+        if current_app.config.get('HTTP_STANDIN'):
+            from flaskinventory import http_client
+            api.session.mount('https://', http_client.adapter())
+        return api
+
+    """
+        VK
+    """
+
+    def vkontakte(self, method: str, params: dict) -> Union[dict, bool]:
+        """ call a method of the VK API, waits and retries once if VK reports too many requests """
+        from flaskinventory import http_client
+        api = "https://api.vk.com/method/"
+        limit = self.limit('vkontakte')
+        for attempt in range(2):
+            with limit.acquire():
+                r = http_client.get(api + method, params=params)
+            if r.status_code != 200:
+                return False
+            res = r.json()
+            error_code = res.get('error', {}).get('error_code')
+            # 6: too many requests per second
+            if error_code == 6 and attempt == 0:
+                limit.pause(1)
+                continue
+            # 29: rate limit of the method reached (daily)
+            if error_code == 29:
+                self.logger.warning(f'VK rate limit reached for {method}')
+                limit.pause(current_app.config['SOCIAL_MAX_WAIT'])
+            return res
+        return res
@@ -0,0 +1,160 @@
+"""
+    Long-lived Telegram client.
+
+    The client runs on its own event loop in a background thread and stays
+    logged in, so lookups do not pay the MTProto connect and auth handshake
+    each time. Lookups can be called from any thread, the number of
+    concurrent requests is limited by `TELEGRAM_CONCURRENCY`.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Union
+
+from flask import current_app
+
+
+class TelegramService:
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._client = None
+        self._settings = {}
+        # created on the event loop
+        self._connect_lock = None
+        self._semaphore = None
+        atexit.register(self.stop)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TELEGRAM_SESSION', 'bot')
+        app.config.setdefault('TELEGRAM_CONCURRENCY', 4)
+        app.config.setdefault('TELEGRAM_TIMEOUT', 30)
+
+    """
+        Event Loop
+    """
+
+    def _ensure_loop(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            # the client of a parent process cannot be used after a fork
+            self._client = None
+            self._settings = {'api_id': current_app.config['TELEGRAM_APP_ID'],
+                              'api_hash': current_app.config['TELEGRAM_APP_HASH'],
+                              'bot_token': current_app.config['TELEGRAM_BOT_TOKEN'],
+                              'session': current_app.config['TELEGRAM_SESSION']}
+            self._loop = asyncio.new_event_loop()
+            self._connect_lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(current_app.config['TELEGRAM_CONCURRENCY'])
+            self._thread = threading.Thread(target=self._run_loop,
+                                            name='telegram-client',
+                                            daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _submit(self, coro):
+        """ run a coroutine on the event loop and wait for the result """
+        self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout=current_app.config['TELEGRAM_TIMEOUT'])
+        except concurrent.futures.TimeoutError:
+            # otherwise the call keeps running and holds the semaphore
+            future.cancel()
+            raise
+
+    def stop(self):
+        """ disconnect the client and stop the event loop """
+        if self._loop is None or self._pid != os.getpid() or not self._loop.is_running():
+            return
+        try:
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(
+                    self._client.disconnect(), self._loop).result(timeout=5)
+        except Exception as e:
+            self.logger.warning(f'Could not disconnect Telegram client: {e}')
+        self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    """
+        Client
+    """
+
+    async def _get_client(self):
+        from telethon import TelegramClient
+        async with self._connect_lock:
+            if self._client is None:
+                client = TelegramClient(self._settings['session'],
+                                        self._settings['api_id'],
+                                        self._settings['api_hash'],
+                                        auto_reconnect=True)
+                try:
+                    await client.start(bot_token=self._settings['bot_token'])
+                except Exception:
+                    await client.disconnect()
+                    raise
+                self._client = client
+                self.logger.debug('Telegram client connected')
+            elif not self._client.is_connected():
+                await self._client.connect()
+                self.logger.debug('Telegram client reconnected')
+            return self._client
+
+    async def _call(self, func, *args):
+        """ call `func(client, *args)`, reconnects once if the connection was lost """
+        async with self._semaphore:
+            client = await self._get_client()
+            try:
+                return await func(client, *args)
+            except (ConnectionError, OSError) as e:
+                self.logger.warning(f'Telegram connection lost, reconnecting: {e}')
+                await client.disconnect()
+                client = await self._get_client()
+                return await func(client, *args)
+
+    @staticmethod
+    async def _get_entity(client, username: str):
+        try:
+            return await client.get_entity(username)
+        except ValueError:
+            try:
+                return await client.get_entity(username + '_bot')
+            except ValueError:
+                return False
+
+    @staticmethod
+    async def _get_member_count(client, username: str) -> Union[int, None]:
+        from telethon.tl.functions.channels import GetFullChannelRequest
+        channel = await client.get_entity(username)
+        full = await client(GetFullChannelRequest(channel))
+        return full.full_chat.participants_count
+
+    """
+        Lookups
+    """
+
+    def get_entity(self, username: str):
+        """ user, bot or channel; False if it does not exist """
+        return self._submit(self._call(self._get_entity, username))
+
+    def get_member_count(self, username: str) -> Union[int, None]:
+        return self._submit(self._call(self._get_member_count, username))
@@ -25,12 +25,80 @@ class Config:
     TELEGRAM_APP_ID = os.environ.get('TELEGRAM_APP_ID', None)
     TELEGRAM_APP_HASH = os.environ.get('TELEGRAM_APP_HASH', None)
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', None)
+    # max. concurrent requests of the persistent telegram client
+    TELEGRAM_CONCURRENCY = int(os.environ.get('TELEGRAM_CONCURRENCY', 4))
     SLACK_LOGGING_ENABLED = os.environ.get('SLACK_LOGGING_ENABLED', False)
     SLACK_WEBHOOK = os.environ.get('SLACK_WEBHOOK')
 
     INSTAGRAM_USERNAME = os.environ.get("INSTAGRAM_USERNAME", None)
     INSTAGRAM_PASSWORD = os.environ.get("INSTAGRAM_PASSWORD", None)
 
+    # max. seconds a social media lookup waits for a rate limit to reset
+    SOCIAL_MAX_WAIT = int(os.environ.get("SOCIAL_MAX_WAIT", 60))
+
+    # overall deadline (seconds) for concurrent external lookups of new entries
+    ENRICHMENT_TIMEOUT = float(os.environ.get("ENRICHMENT_TIMEOUT", 20))
+
+    # commit new entries immediately and run external lookups in background workers
+    ENRICHMENT_DEFERRED = os.environ.get("ENRICHMENT_DEFERRED", "false").lower() == "true"
+    ENRICHMENT_WORKERS = int(os.environ.get("ENRICHMENT_WORKERS", 2))
+    ENRICHMENT_QUEUE_PATH = os.environ.get("ENRICHMENT_QUEUE_PATH")
+
+    # bulk import: number of validation processes and rows per upsert
+    BULK_IMPORT_WORKERS = int(os.environ.get("BULK_IMPORT_WORKERS", os.cpu_count() or 1))
+    BULK_IMPORT_CHUNK_SIZE = int(os.environ.get("BULK_IMPORT_CHUNK_SIZE", 100))
+
+    # keep all unique names in memory (reloaded hourly, new entries every TTL seconds)
+    UNIQUE_NAME_INDEX = os.environ.get("UNIQUE_NAME_INDEX", "true").lower() == "true"
+    UNIQUE_NAME_INDEX_TTL = int(os.environ.get("UNIQUE_NAME_INDEX_TTL", 60))
+
+    # search bar: keep accepted entries in memory (reloaded every TTL seconds), max. suggestions
+    QUICKSEARCH_INDEX = os.environ.get("QUICKSEARCH_INDEX", "true").lower() == "true"
+    QUICKSEARCH_INDEX_TTL = int(os.environ.get("QUICKSEARCH_INDEX_TTL", 600))
+    QUICKSEARCH_LIMIT = int(os.environ.get("QUICKSEARCH_LIMIT", 20))
+
+    # external lookups: timeouts (seconds), concurrent requests per host, max. response size (bytes)
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 20))
+    HTTP_MAX_PER_HOST = int(os.environ.get("HTTP_MAX_PER_HOST", 4))
+    HTTP_MAX_RESPONSE_SIZE = int(os.environ.get("HTTP_MAX_RESPONSE_SIZE", 10 * 1024 * 1024))
+    # send all external lookups to a stand-in server instead (offline tests and benchmarks, see tests/standin.py)
+    HTTP_STANDIN = os.environ.get("HTTP_STANDIN")
+
+    # persistent cache for external lookups (geocoding, wikidata, doi, ...)
+    # TTLs per source can be set with LOOKUP_CACHE_TTL = {source: seconds}
+    LOOKUP_CACHE = os.environ.get("LOOKUP_CACHE", "true").lower() == "true"
+    LOOKUP_CACHE_PATH = os.environ.get("LOOKUP_CACHE_PATH")
+    LOOKUP_CACHE_NEGATIVE_TTL = int(os.environ.get("LOOKUP_CACHE_NEGATIVE_TTL", 60 * 60))
+
+    # geocoding: Nominatim instance, requests per second (shared by all processes)
+    # and max. seconds to wait for a result (within the deadline of the enrichment lookups)
+    NOMINATIM_API = os.environ.get("NOMINATIM_API", "https://nominatim.openstreetmap.org")
+    GEOCODING_RATE = float(os.environ.get("GEOCODING_RATE", 1))
+    GEOCODING_TIMEOUT = float(os.environ.get("GEOCODING_TIMEOUT", ENRICHMENT_TIMEOUT * 0.75))
+
+    # keep countries, multinationals and subunits in memory (reloaded every TTL seconds)
+    GAZETTEER = os.environ.get("GAZETTEER", "true").lower() == "true"
+    GAZETTEER_TTL = int(os.environ.get("GAZETTEER_TTL", 300))
+
+    # max. seconds before the choices of the new source form are rebuilt (also after changes)
+    FIELDOPTIONS_TTL = int(os.environ.get("FIELDOPTIONS_TTL", 300))
+
+    # feed discovery: stop after this many feeds, concurrent probes, bytes read per probe
+    FEEDS_MAX = int(os.environ.get("FEEDS_MAX", 3))
+    FEEDS_PROBE_WORKERS = int(os.environ.get("FEEDS_PROBE_WORKERS", 8))
+    FEEDS_PROBE_SIZE = int(os.environ.get("FEEDS_PROBE_SIZE", 16384))
+
+    # identifier lookups (DOI, arXiv, CRAN): APIs, concurrent lookups, max. identifiers per batch request
+    CROSSREF_API = os.environ.get("CROSSREF_API", "https://api.crossref.org/works/")
+    ARXIV_API = os.environ.get("ARXIV_API", "http://export.arxiv.org/api/query")
+    CRAN_API = os.environ.get("CRAN_API", "https://crandb.r-pkg.org/")
+    IDENTIFIER_LOOKUP_WORKERS = int(os.environ.get("IDENTIFIER_LOOKUP_WORKERS", 8))
+    IDENTIFIER_BATCH_MAX = int(os.environ.get("IDENTIFIER_BATCH_MAX", 200))
+
+    # max. bytes of a homepage that are read to find the end of its <head>
+    META_MAX_SIZE = int(os.environ.get("META_MAX_SIZE", 1024 * 1024))
+
 
 """ Configure Logging """
 
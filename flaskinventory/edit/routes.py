@@ -1,7 +1,7 @@
 from flask import (current_app, Blueprint, render_template, url_for,
                    flash, redirect, request, abort, jsonify)
 from flask_login import current_user, login_required
-from flaskinventory import dgraph
+from flaskinventory import dgraph, autocomplete, field_options, gazetteer
 from flaskinventory.flaskdgraph import Schema
 from flaskinventory.flaskdgraph.utils import restore_sequence, validate_uid
 
@@ -103,9 +103,12 @@ def refresh_wikidata():
         result = dgraph.upsert(
             sanitizer.upsert_query, del_nquads=sanitizer.delete_nquads, set_nquads=sanitizer.set_nquads)
         current_app.logger.debug(result)
+        sanitizer.commit_unique_names(dict(result.uids))
+        autocomplete.update([uid])
         flash(f'WikiData has been refreshed', 'success')
         return redirect(url_for('edit.edit_uid', uid=uid, **request.args))
     except Exception as e:
+        sanitizer.release_unique_names()
         flash(f'Could not refresh WikiData: {e}', 'danger')
         return redirect(url_for('edit.edit_uid', uid=uid, **request.args))
 
@@ -180,6 +183,10 @@ def entry(dgraph_type=None, unique_name=None, uid=None):
         try:
             result = dgraph.upsert(
                 sanitizer.upsert_query, del_nquads=sanitizer.delete_nquads, set_nquads=sanitizer.set_nquads)
+            gazetteer.notify(dgraph_type, sanitizer.set_nquads)
+            field_options.notify(dgraph_type, sanitizer.set_nquads)
+            sanitizer.commit_unique_names(dict(result.uids))
+            autocomplete.update([sanitizer.entry_uid])
             if request.form.get('accept'):
                 flash(f'{dgraph_type} has been edited and accepted', 'success')
                 send_acceptance_notification(uid)
@@ -188,6 +195,7 @@ def entry(dgraph_type=None, unique_name=None, uid=None):
                 flash(f'{dgraph_type} has been updated', 'success')
                 return redirect(url_for('view.view_uid', uid=uid, **request.args))
         except Exception as e:
+            sanitizer.release_unique_names()
             flash(f'{dgraph_type} could not be updated: {e}', 'danger')
             return redirect(url_for('edit.entry', dgraph_type=dgraph_type, uid=uid, **request.args))
 
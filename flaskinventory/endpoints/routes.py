@@ -6,13 +6,20 @@ Also for a potential API
 """
 
 import traceback
+import io
+import datetime
 from flask import (current_app, Blueprint, request, jsonify, url_for, abort)
 from flask_login import current_user, login_required
-from flaskinventory import dgraph
+from flaskinventory import dgraph, autocomplete, enrichment_queue, field_options, gazetteer, lookup_cache, social_clients
 from flaskinventory.flaskdgraph.utils import strip_query, validate_uid
 from flaskinventory.main.model import Source
 from flaskinventory.main.sanitizer import Sanitizer
-from flaskinventory.add.dgraph import generate_fieldoptions
+from flaskinventory.add.bulk import BulkImport, read_rows
+from flaskinventory.flaskdgraph import Schema
+from flaskinventory.flaskdgraph.dgraph_types import Scalar
+from flaskinventory.misc import get_ip
+from flaskinventory.users.constants import USER_ROLES
+from flaskinventory.users.utils import requires_access_level
 
 
 endpoint = Blueprint('endpoint', __name__)
@@ -21,6 +28,8 @@ endpoint = Blueprint('endpoint', __name__)
 @endpoint.route('/endpoint/quicksearch')
 def quicksearch():
     query = request.args.get('q')
+    if autocomplete.ready:
+        return jsonify({'data': autocomplete.search(query), 'status': True})
     # query_string = f'{{ data(func: regexp(name, /{query}/i)) @normalize {{ uid unique_name: unique_name name: name type: dgraph.type channel {{ channel: name }}}} }}'
     query_regex = f'/^{strip_query(query)}/i'
     query_string = f'''
@@ -118,20 +127,20 @@ def sourcelookup():
         current_app.logger.warning(f'could not lookup source with query "{query}". {e}')
         return jsonify({'status': False, 'error': f'e'})
 
-# cache this route
 @endpoint.route("/endpoint/new/fieldoptions")
-async def fieldoptions():
-    data = await generate_fieldoptions()
-    return jsonify(data)
+def fieldoptions():
+    return field_options.response()
 
 @endpoint.route('/endpoint/new/submit', methods=['POST'])
 def submit():
     current_app.logger.debug(f'Received JSON: \n{request.json}')
     try:
         if 'uid' in request.json.keys():
-            sanitizer = Sanitizer.edit(request.json, dgraph_type=Source)
+            sanitizer = Sanitizer.edit(request.json, dgraph_type=Source,
+                                       defer_enrichment=current_app.config.get('ENRICHMENT_DEFERRED'))
         else:
-            sanitizer = Sanitizer(request.json, dgraph_type=Source)
+            sanitizer = Sanitizer(request.json, dgraph_type=Source,
+                                  defer_enrichment=current_app.config.get('ENRICHMENT_DEFERRED'))
         current_app.logger.debug(f'Processed Entry: \n{sanitizer.entry}\n{sanitizer.related_entries}')
         current_app.logger.debug(f'Set Nquads: {sanitizer.set_nquads}')
         current_app.logger.debug(f'Delete Nquads: {sanitizer.delete_nquads}')
@@ -148,6 +157,7 @@ def submit():
         else:
             result = dgraph.upsert(None, del_nquads=sanitizer.delete_nquads, set_nquads=sanitizer.set_nquads)
     except Exception as e:
+        sanitizer.release_unique_names()
         error = {'error': f'{e}'}
         tb_str = ''.join(traceback.format_exception(
             None, e, e.__traceback__))
@@ -158,15 +168,26 @@ def submit():
         return jsonify(error)
 
     if result:
+        # the entry is committed: the following steps must not report a failure
+        newuids = dict(result.uids)
         if sanitizer.is_upsert:
             uid = str(sanitizer.entry_uid)
         else:
-            newuids = dict(result.uids)
             uid = newuids[str(sanitizer.entry_uid).replace('_:', '')]
+        try:
+            gazetteer.notify(set_nquads=sanitizer.set_nquads)
+            field_options.notify(set_nquads=sanitizer.set_nquads)
+            sanitizer.commit_unique_names(newuids)
+            autocomplete.update([uid])
+        except Exception as e:
+            current_app.logger.error(f'Could not update indexes after adding <{uid}>: {e}')
+        if len(sanitizer.enrichment_jobs) > 0:
+            enrichment_queue.enqueue_jobs(sanitizer.enrichment_jobs, newuids)
         response = {'redirect': url_for('view.view_generic', dgraph_type='Source', uid=uid)}
 
         return jsonify(response)
     else:
+        sanitizer.release_unique_names()
         current_app.logger.error(f'DGraph Error - Could not perform mutation: {sanitizer.set_nquads}')
         return jsonify({'error': 'DGraph Error - Could not perform mutation'})
 
@@ -228,6 +249,89 @@ def identifier_lookup():
     return jsonify(result)
 
 
+def _lookup_json(result):
+    """ authors are Scalars (with sequence facets) and dates datetime objects """
+    if not isinstance(result, dict):
+        return result
+    serialized = {}
+    for key, value in result.items():
+        if isinstance(value, list):
+            value = [str(v) if isinstance(v, Scalar) else v for v in value]
+        elif isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        serialized[key] = value
+    return serialized
+
+
+@endpoint.route('/endpoint/identifier/batch', methods=['GET', 'POST'])
+@login_required
+def identifier_batch():
+    """
+        Look up many DOIs, arXiv ids and CRAN packages at once (requires login).
+        Accepts a JSON body `{"doi": [...], "arxiv": [...], "cran": [...]}`
+        or repeated query parameters (`?doi=...&doi=...`).
+        Identifiers that are already in the inventory are not looked up externally.
+        Returns `{field: {identifier: {"inventory": [entries], "result": dict or false}}}`
+    """
+    from flaskinventory.add.external import lookup_identifiers
+
+    fields = ['doi', 'arxiv', 'cran']
+    max_identifiers = current_app.config.get('IDENTIFIER_BATCH_MAX', 200)
+    payload = request.get_json(silent=True) or {}
+
+    identifiers = {}
+    for field in fields:
+        values = payload.get(field) if field in payload else request.args.getlist(field)
+        if isinstance(values, str):
+            values = [values]
+        values = [str(v).strip() for v in values or [] if str(v).strip()]
+        if len(values) > 0:
+            # keep order, drop duplicates
+            identifiers[field] = list(dict.fromkeys(values))
+
+    if len(identifiers) == 0:
+        return jsonify({'status': False})
+
+    if sum(len(values) for values in identifiers.values()) > max_identifiers:
+        return jsonify({'status': False, 'error': f'At most {max_identifiers} identifiers per request'})
+
+    # one query for all identifiers that are already in the inventory
+    # every identifier is passed as a variable: `$doi0`, `$doi1`, ...
+    variables = {}
+    blocks = []
+    for field, values in identifiers.items():
+        query_vars = []
+        for i, value in enumerate(values):
+            variables[f'${field}{i}'] = value
+            query_vars.append(f'{field}{i}')
+            blocks.append(f'{field}{i} as var(func: eq({field}, ${field}{i}))')
+        blocks.append(f'''{field}(func: uid({', '.join(query_vars)}))
+                    @filter(eq(entry_review_status, "draft") or 
+                            eq(entry_review_status, "accepted") or 
+                            eq(entry_review_status, "pending")) {{
+                        uid unique_name name dgraph.type title doi arxiv cran
+                    }}''')
+    declarations = ', '.join(f'{var}: string' for var in variables)
+    query_string = f'query identifiers({declarations}) {{ ' + '\n'.join(blocks) + ' }'
+    existing = dgraph.query(query_string, variables=variables)
+
+    result = {field: {identifier: {'inventory': [], 'result': False} for identifier in values}
+              for field, values in identifiers.items()}
+    for field in identifiers:
+        for entry in existing.get(field, []):
+            if entry.get(field) in result[field]:
+                result[field][entry[field]]['inventory'].append(entry)
+
+    missing = {field: [identifier for identifier, item in items.items() if len(item['inventory']) == 0]
+               for field, items in result.items()}
+    for field, lookups in lookup_identifiers(missing).items():
+        for identifier, lookup in lookups.items():
+            result[field][identifier]['result'] = _lookup_json(lookup)
+
+    result['status'] = True
+    return jsonify(result)
+
+
 @endpoint.route('/endpoint/ownership', methods=['POST'])
 def ownership():
     current_app.logger.debug(f'Received JSON: \n{request.json}')
@@ -257,4 +361,80 @@ def ownership():
         error = {'error': f'{e}'}
         tb_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
         current_app.logger.error(tb_str)
-        return jsonify(error)
\ No newline at end of file
+        return jsonify(error)
+
+
+@endpoint.route('/endpoint/bulk_import', methods=['POST'])
+@login_required
+@requires_access_level(USER_ROLES.Admin)
+def bulk_import():
+    """
+        Import a CSV or JSONL file (form field `file`) of entries
+        with the type `dgraph_type`. Set `dry_run` to only validate the rows.
+        Returns the report of `BulkImport`
+    """
+    dgraph_type = Schema.get_type(request.form.get('dgraph_type', ''))
+    if not dgraph_type:
+        return jsonify({'error': f'Unknown dgraph type: {request.form.get("dgraph_type")}'})
+
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'No file provided'})
+
+    fmt = 'jsonl' if upload.filename.endswith(('.jsonl', '.json')) else 'csv'
+    dry_run = request.form.get('dry_run', '').lower() in ['true', 'yes', '1']
+
+    try:
+        rows = read_rows(io.TextIOWrapper(upload.stream, encoding='utf-8'), fmt=fmt)
+        report = BulkImport(rows, dgraph_type, ip=get_ip(), dry_run=dry_run).run()
+    except Exception as e:
+        error = {'error': f'{e}'}
+        tb_str = ''.join(traceback.format_exception(None, e, e.__traceback__))
+        current_app.logger.error(tb_str)
+        return jsonify(error)
+
+    current_app.logger.info(
+        f'Bulk import by {current_user.uid}: {report["imported"]} of {report["rows"]} rows imported')
+    return jsonify(report)
+
+
+@endpoint.route('/endpoint/lookup_cache')
+@login_required
+@requires_access_level(USER_ROLES.Admin)
+def lookup_cache_inspect():
+    """
+        Without arguments: number of cached lookups per source.
+        With `source` and / or `q`: list the matching entries.
+    """
+    if not request.args.get('source') and not request.args.get('q'):
+        return jsonify(lookup_cache.stats())
+
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify(lookup_cache.entries(source=request.args.get('source'),
+                                        search=request.args.get('q'),
+                                        limit=limit))
+
+
+@endpoint.route('/endpoint/lookup_cache/purge', methods=['POST'])
+@login_required
+@requires_access_level(USER_ROLES.Admin)
+def lookup_cache_purge():
+    """
+        Delete cached lookups. Filters: `source`, `key`,
+        `expired` (only expired entries), `negative` (only negative results)
+    """
+    flags = ['true', 'yes', '1']
+    deleted = lookup_cache.purge(source=request.form.get('source'),
+                                 key=request.form.get('key'),
+                                 expired=request.form.get('expired', '').lower() in flags,
+                                 negative=request.form.get('negative', '').lower() in flags)
+    current_app.logger.info(f'Lookup cache purged by {current_user.uid}: {deleted} entries')
+    return jsonify({'deleted': deleted})
+
+
+@endpoint.route('/endpoint/social_limits')
+@login_required
+@requires_access_level(USER_ROLES.Admin)
+def social_limits():
+    """ rate limits of the social media platforms as seen by this process """
+    return jsonify(social_clients.status())
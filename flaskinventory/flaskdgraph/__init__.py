@@ -1,3 +1,5 @@
 from .client import DGraph
 from .schema import Schema
-from .query import build_query_string
\ No newline at end of file
+from .query import build_query_string
+from .unique_names import UniqueNameIndex
+from .autocomplete import AutocompleteIndex
\ No newline at end of file
@@ -0,0 +1,322 @@
+"""
+    In-memory autocomplete index of all accepted entries (for the search bar).
+
+    Covers the same fields as the DQL quicksearch: terms of `name`, `other_names`
+    and `title`, prefixes of `name` and `unique_name`, exact `doi` and `arxiv`.
+    The last term of a query also matches as a prefix (for typing).
+
+    The index is loaded in a background thread (on the first search and
+    every `QUICKSEARCH_INDEX_TTL` seconds), until then searches fall back to DGraph.
+    Entries that are written by this process are updated with `update(uids)`.
+"""
+
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from itertools import islice
+
+from flask import current_app
+
+from .utils import validate_uid
+
+
+def normalize(text: str) -> str:
+    """ case folded and without diacritics """
+    text = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def terms(text: str) -> list:
+    return re.findall(r'\w+', normalize(text))
+
+
+class PrefixIndex:
+
+    """
+        Sorted (unique) keys, `prefixed(prefix)` finds all keys with the prefix (bisect).
+        New keys are sorted in with the next lookup.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._sorted = True
+
+    def _sort(self):
+        if not self._sorted:
+            self._keys.sort()
+            self._sorted = True
+
+    def add(self, key: str):
+        self._keys.append(key)
+        self._sorted = False
+
+    def remove(self, key: str):
+        self._sort()
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def prefixed(self, prefix: str, limit: int = None):
+        self._sort()
+        i = bisect.bisect_left(self._keys, prefix)
+        found = 0
+        while i < len(self._keys) and self._keys[i].startswith(prefix):
+            yield self._keys[i]
+            found += 1
+            if limit and found >= limit:
+                break
+            i += 1
+
+
+class AutocompleteIndex:
+
+    # fields of the results (same as the DQL quicksearch)
+    fields = 'uid unique_name name other_names dgraph.type title doi arxiv channel { unique_name }'
+
+    # page size when loading the index
+    page_size = 10000
+
+    # max. terms a prefix is expanded to
+    max_expansions = 100
+
+    # max. entries that are ranked per term (frequent terms)
+    max_candidates = 200
+
+    # scores
+    score_identifier = 100
+    score_exact_name = 60
+    score_name_prefix = 40
+    score_term = {'name': 10, 'title': 10, 'other_names': 6}
+    score_term_prefix = 3
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._clear()
+        self._loaded = None
+        self._loading = None
+        # no (re)load before (after a failure)
+        self._retry = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUICKSEARCH_INDEX', True)
+        app.config.setdefault('QUICKSEARCH_INDEX_TTL', 600)
+        app.config.setdefault('QUICKSEARCH_LIMIT', 20)
+
+    def _clear(self):
+        # {uid: result}
+        self._docs = {}
+        # {term: {uid: score}}
+        self._postings = {}
+        self._terms = PrefixIndex()
+        # {normalized name or unique name: set of uids}
+        self._names = {}
+        self._name_keys = PrefixIndex()
+        # {doi or arxiv id: set of uids}
+        self._identifiers = {}
+        # {uid: (terms, names, identifiers)}
+        self._keys = {}
+
+    """
+        Loading
+    """
+
+    @staticmethod
+    def to_result(node: dict) -> dict:
+        """ DGraph node to the (flat) result of the DQL quicksearch """
+        result = {'uid': node['uid'],
+                  'type': [t for t in node.get('dgraph.type', []) if t != 'Entry']}
+        for key in ['unique_name', 'name', 'other_names', 'title', 'doi', 'arxiv']:
+            if node.get(key) is not None:
+                result[key] = node[key]
+        channel = node.get('channel')
+        if isinstance(channel, list):
+            channel = channel[0] if len(channel) > 0 else None
+        if channel and channel.get('unique_name'):
+            result['channel'] = channel['unique_name']
+        return result
+
+    def load(self):
+        from flaskinventory import dgraph
+        nodes = []
+        after = ''
+        while True:
+            query_string = f'''{{ q(func: eq(entry_review_status, "accepted"), first: {self.page_size} {after}) {{ {self.fields} }} }}'''
+            data = dgraph.query(query_string)
+            nodes += data['q']
+            if len(data['q']) < self.page_size:
+                break
+            after = f", after: {data['q'][-1]['uid']}"
+        self.build(nodes)
+
+    def build(self, nodes: list):
+        """ replace the index with these (accepted) nodes """
+        # searches continue with the old index while the new one is built
+        fresh = AutocompleteIndex()
+        for node in nodes:
+            fresh._add(self.to_result(node))
+        with self._lock:
+            self._docs, self._postings, self._terms = fresh._docs, fresh._postings, fresh._terms
+            self._names, self._name_keys = fresh._names, fresh._name_keys
+            self._identifiers, self._keys = fresh._identifiers, fresh._keys
+            self._loaded = time.time()
+        self.logger.debug(f'Loaded {len(nodes)} entries for autocomplete')
+
+    def _load_in_background(self, app):
+        def target():
+            try:
+                with app.app_context():
+                    self.load()
+            except Exception as e:
+                self.logger.warning(f'Autocomplete index not available: {e}')
+                self._retry = time.time() + 60
+            finally:
+                self._loading = None
+
+        with self._lock:
+            if self._loading is not None or time.time() < self._retry:
+                return
+            self._loading = threading.Thread(target=target, name='autocomplete', daemon=True)
+            self._loading.start()
+
+    @property
+    def ready(self) -> bool:
+        """ True if the index is enabled and loaded, (re)loads it in the background """
+        if not current_app.config.get('QUICKSEARCH_INDEX'):
+            return False
+        if self._loaded is None or time.time() - self._loaded > current_app.config['QUICKSEARCH_INDEX_TTL']:
+            self._load_in_background(current_app._get_current_object())
+        return self._loaded is not None
+
+    def update(self, uids: list):
+        """ re-index entries after they were written (removes entries that are not accepted) """
+        uids = [uid for uid in (validate_uid(str(uid)) for uid in uids if uid) if uid]
+        if self._loaded is None or len(uids) == 0:
+            return
+        from flaskinventory import dgraph
+        try:
+            query_string = f'''{{ q(func: uid({", ".join(uids)})) @filter(eq(entry_review_status, "accepted")) {{ {self.fields} }} }}'''
+            nodes = dgraph.query(query_string)['q']
+        except Exception as e:
+            self.logger.warning(f'Could not update autocomplete index: {e}')
+            return
+        with self._lock:
+            for uid in uids:
+                self._remove(uid)
+            for node in nodes:
+                self._add(self.to_result(node))
+
+    """
+        Indexing
+    """
+
+    def _add(self, result: dict):
+        uid = result['uid']
+        if uid in self._docs:
+            self._remove(uid)
+        self._docs[uid] = result
+
+        term_keys = {}
+        for field in ['name', 'title', 'other_names']:
+            values = result.get(field) or []
+            if isinstance(values, str):
+                values = [values]
+            for value in values:
+                for term in terms(value):
+                    term_keys[term] = max(term_keys.get(term, 0), self.score_term[field])
+        for term, score in term_keys.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                self._terms.add(term)
+            self._postings[term][uid] = score
+
+        name_keys = set(normalize(result[key]) for key in ['name', 'unique_name'] if result.get(key))
+        for key in name_keys:
+            if key not in self._names:
+                self._names[key] = set()
+                self._name_keys.add(key)
+            self._names[key].add(uid)
+
+        identifiers = set(normalize(result[key]).strip() for key in ['doi', 'arxiv'] if result.get(key))
+        for identifier in identifiers:
+            self._identifiers.setdefault(identifier, set()).add(uid)
+
+        self._keys[uid] = (set(term_keys), name_keys, identifiers)
+
+    def _remove(self, uid: str):
+        if uid not in self._docs:
+            return
+        del self._docs[uid]
+        term_keys, name_keys, identifiers = self._keys.pop(uid)
+        for term in term_keys:
+            self._postings[term].pop(uid, None)
+            if len(self._postings[term]) == 0:
+                del self._postings[term]
+                self._terms.remove(term)
+        for key in name_keys:
+            self._names[key].discard(uid)
+            if len(self._names[key]) == 0:
+                del self._names[key]
+                self._name_keys.remove(key)
+        for identifier in identifiers:
+            self._identifiers[identifier].discard(uid)
+            if len(self._identifiers[identifier]) == 0:
+                del self._identifiers[identifier]
+
+    """
+        Search
+    """
+
+    def search(self, query: str, limit: int = None) -> list:
+        """ top `limit` results for the query, best first """
+        if limit is None:
+            limit = current_app.config.get('QUICKSEARCH_LIMIT', 20)
+        query = normalize(query or '').strip()
+        if len(query) == 0:
+            return []
+        query_terms = terms(query)
+        unique_terms = set(query_terms)
+        # the last term is probably not complete yet
+        partial = query_terms[-1] if len(query_terms) > 0 and re.search(r'\w$', query) else None
+
+        with self._lock:
+            candidates = set(self._identifiers.get(query, ()))
+            candidates.update(self._names.get(query, ()))
+            prefixed = set()
+            for key in self._name_keys.prefixed(query, limit=self.max_expansions):
+                prefixed.update(self._names[key])
+            candidates.update(prefixed)
+            for term in unique_terms:
+                candidates.update(islice(self._postings.get(term, {}), self.max_candidates))
+            if partial:
+                completed = set()
+                for term in self._terms.prefixed(partial, limit=self.max_expansions):
+                    completed.update(islice(self._postings[term], self.max_candidates - len(completed)))
+                    if len(completed) >= self.max_candidates:
+                        break
+                candidates.update(completed)
+
+            scores = {}
+            for uid in candidates:
+                doc_terms, doc_names, doc_identifiers = self._keys[uid]
+                score = sum(self._postings.get(term, {}).get(uid, 0) for term in unique_terms)
+                if query in doc_identifiers:
+                    score += self.score_identifier
+                if query in doc_names:
+                    score += self.score_exact_name
+                if uid in prefixed:
+                    score += self.score_name_prefix
+                if partial and any(term.startswith(partial) and term != partial for term in doc_terms):
+                    score += self.score_term_prefix
+                scores[uid] = score
+
+            best = heapq.nsmallest(limit, scores.items(),
+                                   key=lambda item: (-item[1], len(self._docs[item[0]].get('name') or ''), item[0]))
+            return [dict(self._docs[uid]) for uid, _ in best]
@@ -192,6 +192,40 @@ class DGraph(object):
         else:
             return data['q'][0]['dgraph.type']
 
+    def get_dgraphtypes(self, uids: list, clean: list = ['Entry', 'Resource']) -> dict:
+        """
+            Bulk version of `get_dgraphtype`: resolves the types of many uids in one request.
+            Returns a dict `{uid: dgraph_type}` with the same values `get_dgraphtype`
+            would return for each uid (uids that do not exist or belong to users are `False`)
+        """
+        # uids are inlined in the query string, so only accept proper hex values
+        uids = {uid: int(uid, 16) for uid in set(uids)}
+        result = {uid: False for uid in uids}
+        if len(uids) == 0:
+            return result
+
+        uid_list = ", ".join(hex(uid) for uid in set(uids.values()))
+        query_string = f'''{{ q(func: uid({uid_list})) @filter(has(dgraph.type)) {{ uid dgraph.type }} }}'''
+        data = self.query(query_string)
+
+        types = {}
+        for item in data['q']:
+            dgraph_type = item['dgraph.type']
+            if 'User' in dgraph_type:
+                types[int(item['uid'], 16)] = False
+                continue
+            if len(clean) > 0:
+                for c in clean:
+                    if c in dgraph_type:
+                        dgraph_type.remove(c)
+                dgraph_type = dgraph_type[0]
+            types[int(item['uid'], 16)] = dgraph_type
+
+        for uid, uid_int in uids.items():
+            result[uid] = types.get(uid_int, False)
+
+        return result
+
     """
         New Entries
     """
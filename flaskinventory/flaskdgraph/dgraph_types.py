@@ -8,6 +8,7 @@
 from typing import Union, Any
 import datetime
 import json
+import io
 from copy import deepcopy
 
 # external utils
@@ -38,6 +39,8 @@ from wtforms.validators import DataRequired, Optional
 
 class UID:
 
+    __slots__ = ('uid', 'facets')
+
     def __init__(self, uid, facets=None):
         self.uid = uid.strip()
         self.facets = facets
@@ -65,6 +68,8 @@ class UID:
 
 class NewID:
 
+    __slots__ = ('newid', 'facets', 'original_value')
+
     def __init__(self, newid, facets=None, suffix=None):
         if newid.startswith('_:'):
             self.newid = newid.strip()
@@ -103,7 +108,9 @@ class Facet:
         Facet keys are strings and values can be string, bool, int, float and dateTime. 
     """
 
-    predicate = None
+    __slots__ = ('predicate', 'key', 'type', 'queryable', '_query_label',
+                 'operators', 'render_kw', 'choices')
+
     default_operator = "eq"
     is_list_predicate = False
 
@@ -116,6 +123,7 @@ class Facet:
                  render_kw=None,
                  choices=None) -> None:
 
+        self.predicate = None
         self.key = key
         self.type = dtype
         self.queryable = queryable
@@ -247,6 +255,11 @@ class _PrimitivePredicate:
         Base class for constructing Predicate Classes
     """
 
+    __slots__ = ('predicate', '_label', 'read_only', 'hidden', 'new', 'edit',
+                 'queryable', 'query_label', 'query_description', 'permission',
+                 'operators', 'facets', 'required', 'form_description', 'tom_select',
+                 'render_kw', '_default', 'overwrite', 'predicate_alias')
+
     dgraph_predicate_type = 'string'
     is_list_predicate = False
     default_operator = "eq"
@@ -365,6 +378,15 @@ class _PrimitivePredicate:
     def query(self) -> str:
         return f'{self.predicate}'
 
+    @staticmethod
+    def get_dgraphtype(uid, dgraph_types: dict = None):
+        # relationship constraints are checked against types that were
+        # resolved in bulk beforehand (see `Sanitizer`). Only falls back
+        # to querying DGraph for uids that are unknown.
+        if dgraph_types and uid in dgraph_types:
+            return dgraph_types[uid]
+        return dgraph.get_dgraphtype(uid)
+
     def validation_hook(self, data):
         # this method is called in validation by default
         # when custom validation is required, overwriting this hook
@@ -445,6 +467,8 @@ class Predicate(_PrimitivePredicate):
 
     """
 
+    __slots__ = ('large_textfield',)
+
     def __init__(self, large_textfield=False, *args, **kwargs) -> None:
         """
             Contruct a new predicate
@@ -504,6 +528,8 @@ class Scalar:
         Utility class for 
     """
 
+    __slots__ = ('value', 'facets', 'year', 'month', 'day')
+
     def __init__(self, value, facets=None):
         if type(value) in [datetime.date, datetime.datetime]:
             self.year = value.year
@@ -550,6 +576,8 @@ class GeoScalar(Scalar):
         Currently only supports Point Locations
     """
 
+    __slots__ = ('geotype', 'coordinates', 'lon', 'lat')
+
     def __init__(self, geotype, coordinates, facets=None):
         self.geotype = geotype
         if isinstance(coordinates, (list, tuple)):
@@ -577,6 +605,8 @@ class Variable:
 
     """ Represents DGraph Query Variable """
 
+    __slots__ = ('var', 'predicate', 'val')
+
     def __init__(self, var, predicate, val=False):
         self.var = var
         self.predicate = predicate
@@ -606,6 +636,9 @@ class ReverseRelationship(_PrimitivePredicate):
         default_predicates: dict with additional predicates that should be assigned to new entries
     """
 
+    __slots__ = ('relationship_constraint', '_predicate', '_target_predicate', 'allow_new',
+                 'default_predicates', 'autoload_choices', 'choices', 'choices_tuples', 'entry_uid')
+
     dgraph_predicate_type = 'uid'
     default_operator = 'uid_in'
 
@@ -652,7 +685,7 @@ class ReverseRelationship(_PrimitivePredicate):
         else:
             return f'<Unbound DGraph Reverse Relationship>'
 
-    def validate(self, data, node, facets=None) -> Union[UID, NewID, dict]:
+    def validate(self, data, node, facets=None, dgraph_types=None) -> Union[UID, NewID, dict]:
         uid = validate_uid(data)
         if not uid:
             if not self.allow_new:
@@ -665,7 +698,7 @@ class ReverseRelationship(_PrimitivePredicate):
             return d
         d = {'uid': UID(uid, facets=facets), self._target_predicate: node}
         if self.relationship_constraint:
-            entry_type = dgraph.get_dgraphtype(uid)
+            entry_type = self.get_dgraphtype(uid, dgraph_types)
             if entry_type not in self.relationship_constraint:
                 raise InventoryValidationError(
                     f'Error in <{self.predicate}>! UID specified does not match constraint, UID is not a {self.relationship_constraint}!: uid <{uid}> <dgraph.type> <{entry_type}>')
@@ -719,10 +752,12 @@ class ReverseRelationship(_PrimitivePredicate):
 
 class ReverseListRelationship(ReverseRelationship):
 
+    __slots__ = ()
+
     is_list_predicate = True
     default_connector = "AND"
 
-    def validate(self, data, node, facets=None) -> Union[UID, NewID, dict]:
+    def validate(self, data, node, facets=None, dgraph_types=None) -> Union[UID, NewID, dict]:
         if isinstance(data, str):
             data = data.split(',')
 
@@ -730,7 +765,7 @@ class ReverseListRelationship(ReverseRelationship):
         uids = []
 
         for item in data:
-            uid = super().validate(item, node, facets=facets)
+            uid = super().validate(item, node, facets=facets, dgraph_types=dgraph_types)
             uids.append(uid)
 
         return uids
@@ -771,6 +806,9 @@ class ReverseListRelationship(ReverseRelationship):
 
 class MutualRelationship(_PrimitivePredicate):
 
+    __slots__ = ('relationship_constraint', 'allow_new', 'autoload_choices',
+                 'choices', 'choices_tuples', 'entry_uid')
+
     dgraph_predicate_type = 'uid'
     is_list_predicate = False
     default_operator = "uid_in"
@@ -806,7 +844,7 @@ class MutualRelationship(_PrimitivePredicate):
         else:
             return f'<Unbound Mutual Relationship Predicate>'
 
-    def validate(self, data, node, facets=None) -> Union[UID, NewID, dict]:
+    def validate(self, data, node, facets=None, dgraph_types=None) -> Union[UID, NewID, dict]:
         """
             Returns two values: 
             1) UID/NewID of target
@@ -825,7 +863,7 @@ class MutualRelationship(_PrimitivePredicate):
         node_data = UID(uid, facets=facets)
         data_node = {'uid': node_data, self.predicate: node}
         if self.relationship_constraint:
-            entry_type = dgraph.get_dgraphtype(uid)
+            entry_type = self.get_dgraphtype(uid, dgraph_types)
             if entry_type not in self.relationship_constraint:
                 raise InventoryValidationError(
                     f'Error in <{self.predicate}>! UID specified does not match constraint, UID is not a {self.relationship_constraint}!: uid <{uid}> <dgraph.type> <{entry_type}>')
@@ -867,18 +905,20 @@ class MutualRelationship(_PrimitivePredicate):
 
 class MutualListRelationship(MutualRelationship):
 
+    __slots__ = ()
+
     dgraph_predicate_type = '[uid]'
     is_list_predicate = True
     default_connector = "AND"
 
-    def validate(self, data, node, facets=None) -> Union[UID, NewID, dict]:
+    def validate(self, data, node, facets=None, dgraph_types=None) -> Union[UID, NewID, dict]:
         if isinstance(data, (str)):
             data = data.split(',')
 
         node_data = []
         data_node = []
         for item in data:
-            n2d, d2n = super().validate(item, node, facets)
+            n2d, d2n = super().validate(item, node, facets, dgraph_types=dgraph_types)
             node_data.append(n2d)
             data_node.append(d2n)
 
@@ -905,6 +945,8 @@ class MutualListRelationship(MutualRelationship):
 
 class String(Predicate):
 
+    __slots__ = ()
+
     dgraph_predicate_type = 'string'
     is_list_predicate = False
 
@@ -914,6 +956,8 @@ class String(Predicate):
 
 class UIDPredicate(Predicate):
 
+    __slots__ = ()
+
     dgraph_predicate_type = 'uid'
     is_list_predicate = False
     default_operator = 'uid_in'
@@ -931,6 +975,8 @@ class UIDPredicate(Predicate):
 
 class Integer(Predicate):
 
+    __slots__ = ()
+
     dgraph_predicate_type = 'int'
     is_list_predicate = False
 
@@ -956,6 +1002,8 @@ class Integer(Predicate):
 
 class ListString(String):
 
+    __slots__ = ('delimiter',)
+
     dgraph_predicate_type = '[string]'
     is_list_predicate = True
     default_connector = "AND"
@@ -975,6 +1023,8 @@ class ListString(String):
 
 class UniqueName(String):
 
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(required=True, new=False,
                          permission=USER_ROLES.Reviewer, *args, **kwargs)
@@ -995,6 +1045,8 @@ class UniqueName(String):
 
 class SingleChoice(String):
 
+    __slots__ = ('choices', 'choices_tuples', 'values', 'radio_field')
+
     def __init__(self, choices: dict = None, default='NA', radio_field=False, *args, **kwargs) -> None:
 
         super().__init__(*args, **kwargs)
@@ -1040,6 +1092,8 @@ class SingleChoice(String):
 
 class MultipleChoice(SingleChoice):
 
+    __slots__ = ()
+
     dgraph_predicate_type = '[string]'
     is_list_predicate = True
     default_connector = "AND"
@@ -1080,6 +1134,8 @@ class MultipleChoice(SingleChoice):
 
 class DateTime(Predicate):
 
+    __slots__ = ()
+
     dgraph_predicate_type = 'datetime'
     is_list_predicate = False
     default_operator = 'between'
@@ -1142,6 +1198,8 @@ class DateTime(Predicate):
 
 class Year(DateTime):
 
+    __slots__ = ()
+
     def validation_hook(self, data):
         if type(data) in [datetime.date, datetime.datetime]:
             return data
@@ -1180,6 +1238,8 @@ class Boolean(Predicate):
             E.g., "Yes, I agree"
     """
 
+    __slots__ = ()
+
     dgraph_predicate_type = 'bool'
     is_list_predicate = False
 
@@ -1227,6 +1287,8 @@ class Boolean(Predicate):
 
 class Geo(Predicate):
 
+    __slots__ = ()
+
     dgraph_predicate_type = 'geo'
     is_list_predicate = False
     geo_type = 'Point'
@@ -1253,6 +1315,9 @@ class Geo(Predicate):
 
 class SingleRelationship(Predicate):
 
+    __slots__ = ('relationship_constraint', 'allow_new', 'autoload_choices',
+                 'choices', 'choices_tuples')
+
     dgraph_predicate_type = 'uid'
     is_list_predicate = False
     default_operator = 'uid_in'
@@ -1278,7 +1343,7 @@ class SingleRelationship(Predicate):
         # hook for Tom-Select to decide whether new entries should be allowed
         self.render_kw.update({'data-ts-create': allow_new})
 
-    def validate(self, data, facets=None) -> Union[UID, NewID, dict]:
+    def validate(self, data, facets=None, dgraph_types=None) -> Union[UID, NewID, dict]:
         if data == '':
             return None
         uid = validate_uid(data)
@@ -1291,7 +1356,7 @@ class SingleRelationship(Predicate):
                 d.update({'dgraph.type': self.relationship_constraint})
             return d
         if self.relationship_constraint:
-            entry_type = dgraph.get_dgraphtype(uid)
+            entry_type = self.get_dgraphtype(uid, dgraph_types)
             if entry_type not in self.relationship_constraint:
                 raise InventoryValidationError(
                     f'Error in <{self.predicate}>! UID specified does not match constrain, UID is not a {self.relationship_constraint}!: uid <{uid}> <dgraph.type> <{entry_type}>')
@@ -1351,6 +1416,8 @@ class SingleRelationship(Predicate):
 
 class ListRelationship(SingleRelationship):
 
+    __slots__ = ()
+
     dgraph_predicate_type = '[uid]'
     is_list_predicate = True
     default_connector = "AND"
@@ -1359,13 +1426,13 @@ class ListRelationship(SingleRelationship):
         super().__init__(relationship_constraint=relationship_constraint, allow_new=allow_new,
                          autoload_choices=autoload_choices, overwrite=overwrite, *args, **kwargs)
 
-    def validate(self, data, facets=None) -> list:
+    def validate(self, data, facets=None, dgraph_types=None) -> list:
         if isinstance(data, str):
             data = data.split(',')
         data = set([item.strip() for item in data if item.strip() != ''])
         uids = []
         for item in data:
-            uid = super().validate(item, facets=facets)
+            uid = super().validate(item, facets=facets, dgraph_types=dgraph_types)
             if uid:
                 uids.append(uid)
 
@@ -1446,3 +1513,112 @@ def dict_to_nquad(d: dict) -> list:
             nquads.append(make_nquad(uid, key, val))
 
     return nquads
+
+
+class NQuadWriter:
+
+    """
+        Streaming serializer for nquad statements.
+        Writes all statements into a single buffer in one pass
+        instead of building and joining lists of strings.
+        Produces the same output as `dict_to_nquad` joined with `separator`.
+
+        Usage:
+            writer = NQuadWriter()
+            writer.write_dict(entry)
+            for related in related_entries:
+                writer.write_dict(related)
+            nquads = writer.getvalue()
+    """
+
+    def __init__(self, separator=" \n") -> None:
+        self.separator = separator
+        self._buffer = io.StringIO()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def getvalue(self) -> str:
+        return self._buffer.getvalue()
+
+    @staticmethod
+    def _predicate(p) -> str:
+        if isinstance(p, _PrimitivePredicate):
+            return p.nquad
+        p = str(p)
+        if p == '*':
+            return '*'
+        return f'<{p}>'
+
+    @staticmethod
+    def _object(o) -> str:
+        # Values that are not wrapped yet are serialized like `Scalar` would do
+        # but without instantiating a new object for every value
+        if isinstance(o, (Scalar, Variable, UID, NewID)):
+            return o.nquad
+        if type(o) in [datetime.date, datetime.datetime]:
+            o = o.isoformat()
+        elif type(o) is bool:
+            o = str(o).lower()
+        o = str(o).strip()
+        if o == '*':
+            return o
+        return json.dumps(o)
+
+    @staticmethod
+    def _facets(facets: dict) -> str:
+        serialized = []
+        for key, val in facets.items():
+            if isinstance(val, list):
+                val = val[0]
+            if isinstance(val, (datetime.date, datetime.datetime)):
+                serialized.append(f'{key}={val.isoformat()}')
+            elif isinstance(val, (int, float)):
+                serialized.append(f'{key}={val}')
+            else:
+                serialized.append(f'{key}={_enquote(val)}')
+        return ", ".join(serialized)
+
+    def write(self, s, p, o) -> None:
+        """ Write a single nquad statement. Same semantics as `make_nquad` """
+        if not isinstance(s, (UID, NewID, Variable)):
+            s = NewID(s)
+        self._write(s.nquad, self._predicate(p), o)
+
+    def _write(self, s: str, p: str, o) -> None:
+        if isinstance(o, (Scalar, UID, NewID)):
+            facets = o.facets
+            o = o.nquad
+        else:
+            facets = None
+            o = self._object(o)
+
+        # only one write per statement; first statement has no separator
+        sep = self.separator if self.count > 0 else ''
+        if facets is None:
+            self._buffer.write(f'{sep}{s} {p} {o} .')
+        else:
+            self._buffer.write(f'{sep}{s} {p} {o} ({self._facets(facets)}) .')
+        self.count += 1
+
+    def write_dict(self, d: dict) -> None:
+        """ Write all statements of a dict. Same semantics as `dict_to_nquad` """
+        if d.get('uid'):
+            uid = d['uid']
+        else:
+            uid = NewID('_:newentry')
+        if not isinstance(uid, (UID, NewID, Variable)):
+            uid = NewID(uid)
+        uid = uid.nquad
+        for key, val in d.items():
+            if val is None:
+                continue
+            if key == 'uid':
+                continue
+            predicate = self._predicate(key)
+            if isinstance(val, (list, set)):
+                for item in val:
+                    self._write(uid, predicate, item)
+            else:
+                self._write(uid, predicate, val)
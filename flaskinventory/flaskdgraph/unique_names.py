@@ -0,0 +1,183 @@
+"""
+    In-memory index of all unique names.
+
+    The index is loaded with the first lookup and refreshed with
+    the unique names of new entries every `UNIQUE_NAME_INDEX_TTL` seconds.
+    Only one thread loads at a time: before the first load the other
+    threads wait for it, afterwards they continue with the current index.
+    Names are reserved atomically (within the process) before they are
+    handed out, so two submissions never get the same unique name.
+    If the index cannot be loaded, all lookups fall back to DGraph.
+"""
+
+import datetime
+import logging
+import threading
+import time
+from typing import Union
+
+from flask import current_app
+
+
+class UniqueNameIndex:
+
+    # seconds after which the whole index is reloaded
+    # (unique names of existing entries can be edited)
+    full_reload_interval = 3600
+
+    # page size when loading the index
+    page_size = 10000
+
+    # seconds before loading is retried after a failure
+    retry_interval = 60
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger(__name__)
+        # {unique_name: uid}
+        self._names = {}
+        # {unique_name: (owner, expires)}
+        self._reserved = {}
+        self._lock = threading.RLock()
+        # held by the thread that loads or refreshes the index
+        self._loading = threading.Lock()
+        self._loaded = None
+        self._refreshed = None
+        # no (re)load before (after a failure)
+        self._retry = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('UNIQUE_NAME_INDEX', True)
+        app.config.setdefault('UNIQUE_NAME_INDEX_TTL', 60)
+        app.config.setdefault('UNIQUE_NAME_RESERVATION_TTL',
+                              self.full_reload_interval)
+
+    """
+        Loading
+    """
+
+    def load(self):
+        from flaskinventory import dgraph
+        names = {}
+        after = ''
+        while True:
+            query_string = f'''{{ q(func: has(unique_name), first: {self.page_size} {after}) {{ uid unique_name }} }}'''
+            data = dgraph.query(query_string)
+            for node in data['q']:
+                names[node['unique_name']] = node['uid']
+            if len(data['q']) < self.page_size:
+                break
+            after = f", after: {data['q'][-1]['uid']}"
+
+        with self._lock:
+            self._names = names
+            self._loaded = self._refreshed = time.time()
+        self.logger.debug(f'Loaded {len(names)} unique names')
+
+    def refresh(self):
+        """ Add the unique names of entries created since the last refresh """
+        from flaskinventory import dgraph
+        # small overlap, so that no entry is missed
+        since = datetime.datetime.fromtimestamp(
+            self._refreshed - 60, tz=datetime.timezone.utc)
+        now = time.time()
+        query_string = f'''{{ q(func: ge(creation_date, "{since.isoformat()}"))
+                                @filter(has(unique_name)) {{ uid unique_name }} }}'''
+        data = dgraph.query(query_string)
+        with self._lock:
+            for node in data['q']:
+                self._names[node['unique_name']] = node['uid']
+            self._refreshed = now
+            self._reserved = {name: reservation for name, reservation in self._reserved.items()
+                              if reservation[1] > now}
+
+    @property
+    def active(self) -> bool:
+        """ True if the index is enabled and current, tries to (re)load the index """
+        if not current_app.config.get('UNIQUE_NAME_INDEX'):
+            return False
+        if self._outdated() and time.time() >= self._retry:
+            # without an index, wait for the thread that loads it
+            if self._loading.acquire(blocking=self._loaded is None):
+                try:
+                    # it might have been loaded while waiting
+                    if self._outdated() and time.time() >= self._retry:
+                        self._update()
+                finally:
+                    self._loading.release()
+        return self._loaded is not None
+
+    def _outdated(self) -> bool:
+        now = time.time()
+        return self._loaded is None or now - self._loaded > self.full_reload_interval or \
+            now - self._refreshed > current_app.config['UNIQUE_NAME_INDEX_TTL']
+
+    def _update(self):
+        try:
+            if self._loaded is None or time.time() - self._loaded > self.full_reload_interval:
+                self.load()
+            else:
+                self.refresh()
+        except Exception as e:
+            self.logger.warning(f'Unique name index not available: {e}')
+            self._retry = time.time() + self.retry_interval
+
+    """
+        Lookups
+    """
+
+    def _is_reserved(self, unique_name: str, owner: str = None) -> bool:
+        reservation = self._reserved.get(unique_name)
+        if reservation is None:
+            return False
+        if reservation[1] < time.time():
+            return False
+        return reservation[0] != owner
+
+    def get_uid(self, unique_name: str) -> Union[str, None]:
+        """ uid of the entry with the given unique name, falls back to DGraph """
+        if not self.active:
+            from flaskinventory import dgraph
+            return dgraph.get_uid('unique_name', unique_name)
+        return self._names.get(unique_name)
+
+    def taken(self, unique_name: str, owner: str = None) -> bool:
+        """ True if the unique name exists or was reserved by someone else """
+        if not self.active:
+            from flaskinventory import dgraph
+            return bool(dgraph.get_uid('unique_name', unique_name))
+        with self._lock:
+            return unique_name in self._names or self._is_reserved(unique_name, owner)
+
+    def reserve(self, candidates: list, owner: str = None) -> Union[str, None]:
+        """
+            Reserve the first candidate that is not taken and return it.
+            Reservations by the same owner do not count as taken.
+            Returns None if all candidates are taken.
+        """
+        if not self.active:
+            from flaskinventory import dgraph
+            for candidate in candidates:
+                if not dgraph.get_uid('unique_name', candidate):
+                    return candidate
+            return None
+        expires = time.time() + current_app.config['UNIQUE_NAME_RESERVATION_TTL']
+        with self._lock:
+            for candidate in candidates:
+                if candidate in self._names or self._is_reserved(candidate, owner):
+                    continue
+                self._reserved[candidate] = (owner, expires)
+                return candidate
+        return None
+
+    def release(self, owner: str):
+        """ Give up all reservations of the owner (e.g., when a mutation failed) """
+        with self._lock:
+            self._reserved = {name: reservation for name, reservation in self._reserved.items()
+                              if reservation[0] != owner}
+
+    def add(self, unique_name: str, uid: str):
+        with self._lock:
+            self._names[unique_name] = uid
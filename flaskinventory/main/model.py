@@ -1,7 +1,7 @@
 import datetime
 from typing import Union
 from flask import current_app
-from flaskinventory import dgraph
+from flaskinventory import dgraph, unique_names, gazetteer
 from flaskinventory.errors import InventoryPermissionError, InventoryValidationError
 from flaskinventory.flaskdgraph.dgraph_types import (String, Integer, Boolean, UIDPredicate,
                                                      SingleChoice, MultipleChoice,
@@ -12,7 +12,7 @@ from flaskinventory.flaskdgraph.dgraph_types import (String, Integer, Boolean, U
                                                      ReverseRelationship, ReverseListRelationship, 
                                                      NewID, UID, Scalar, Facet)
 
-from flaskinventory.add.external import geocode, reverse_geocode, get_wikidata
+from flaskinventory.add.external import geocode, reverse_geocode, get_wikidata_many
 from flaskinventory.users.constants import USER_ROLES
 from flaskinventory.flaskdgraph import Schema
 from flaskinventory.flaskdgraph.utils import validate_uid
@@ -28,6 +28,8 @@ import secrets
 
 class GeoAutoCode(Geo):
 
+    __slots__ = ()
+
     autoinput = 'address_string'
 
     def __init__(self, *args, **kwargs) -> None:
@@ -39,6 +41,8 @@ class GeoAutoCode(Geo):
 
 class AddressAutocode(Geo):
 
+    __slots__ = ()
+
     autoinput = 'name'
 
     def __init__(self, *args, **kwargs) -> None:
@@ -64,6 +68,8 @@ class SourceCountrySelection(ListRelationship):
         Special field with constraint to only include countries with Scope of OPTED
     """
 
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs) -> None:
 
         super().__init__(relationship_constraint = ['Multinational', 'Country'], 
@@ -93,6 +99,14 @@ class SourceCountrySelection(ListRelationship):
 
 class SubunitAutocode(ListRelationship):
 
+    """
+        Subunits (e.g., states) as UIDs or names.
+        Names of subunits that are already in the inventory are matched with the
+        gazetteer (name, other_names or unique_name), new subunits are geocoded concurrently.
+    """
+
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs) -> None:
 
         super().__init__(relationship_constraint = ['Subunit'], 
@@ -122,18 +136,23 @@ class SubunitAutocode(ListRelationship):
                 self.choices.update({s['uid']: s['name'] for s in country['subunit']})
 
 
+    def _match_known_subunit(self, subunit: str) -> Union[str, None]:
+        """ uid of a subunit in the inventory with this name; None if there is none or several """
+        try:
+            uids = gazetteer.match(subunit, 'Subunit')
+        except Exception as e:
+            current_app.logger.warning(f'<{self.predicate}>: Could not load subunits: {e}')
+            return None
+        if len(uids) == 1:
+            return next(iter(uids))
+        return None
+
     def _geo_query_subunit(self, query):
         geo_result = geocode(query)
         if geo_result:
             current_app.logger.debug(f'Got a result for "{query}": {geo_result}')
-            dql_string = '''
-            query get_country($country_code: string) {
-                q(func: eq(country_code, $country_code)) @filter(type("Country")) { uid } 
-                }'''
-            dql_result = dgraph.query(dql_string, variables={'$country_code': geo_result['address']['country_code']})
-            try:
-                country_uid = dql_result['q'][0]['uid']
-            except Exception:
+            country_uid = gazetteer.country_uid(geo_result['address']['country_code'])
+            if not country_uid:
                 raise InventoryValidationError(
                     f"Error in <{self.predicate}>! While parsing {query} no matching country found in inventory: {geo_result['address']['country_code']}")
             geo_data = GeoScalar('Point', [
@@ -184,8 +203,7 @@ class SubunitAutocode(ListRelationship):
             geo_query['dgraph.type'] = ['Subunit']
             # prevent duplicates
             geo_query['unique_name'] = f"{slugify(subunit, separator='_')}_{geo_query['country_code']}"
-            duplicate_check = dgraph.get_uid(
-                'unique_name', geo_query['unique_name'])
+            duplicate_check = unique_names.get_uid(geo_query['unique_name'])
             if duplicate_check:
                 geo_query = {'uid': UID(duplicate_check)}
             else:
@@ -196,7 +214,7 @@ class SubunitAutocode(ListRelationship):
             raise InventoryValidationError(
                 f'Invalid Data! Could not resolve geographic subunit {subunit}')
 
-    def validation_hook(self, data):
+    def validation_hook(self, data, dgraph_types=None):
         uid = validate_uid(data)
         if not uid:
             if not self.allow_new:
@@ -206,27 +224,56 @@ class SubunitAutocode(ListRelationship):
             new_subunit = self._resolve_subunit(data)
             return new_subunit
         if self.relationship_constraint:
-            entry_type = dgraph.get_dgraphtype(uid)
+            entry_type = self.get_dgraphtype(uid, dgraph_types)
             if entry_type not in self.relationship_constraint:
                 raise InventoryValidationError(
                     f'Error in <{self.predicate}>! UID specified does not match constrain, UID is not a {self.relationship_constraint}!: uid <{uid}> <dgraph.type> <{entry_type}>')        
         return {'uid': UID(uid)}
 
-    def validate(self, data, facets=None) -> list:
+    def validate(self, data, facets=None, dgraph_types=None) -> list:
         if isinstance(data, str):
             data = data.split(',')
         data = set([item.strip() for item in data if item.strip() != ''])
         uids = []
+        new_subunits = []
         for item in data:
-            uid = self.validation_hook(item)
+            if not validate_uid(item) and self.allow_new:
+                known = self._match_known_subunit(item)
+                if known:
+                    uids.append({'uid': UID(known)})
+                else:
+                    new_subunits.append(item)
+                continue
+            uid = self.validation_hook(item, dgraph_types=dgraph_types)
             if uid:
                 uids.append(uid)
 
+        if len(new_subunits) > 0:
+            uids += self._resolve_subunits(new_subunits)
+
         return uids
+
+    def _resolve_subunits(self, subunits: list) -> list:
+        """ resolve new subunits concurrently (deadline: `ENRICHMENT_TIMEOUT`) """
+        from flaskinventory.add.enrichment import run_concurrently
+
+        current_app.logger.debug(f'New subunits, trying to resolve {subunits}')
+        results, errors, timed_out = run_concurrently(
+            {subunit: (self._resolve_subunit, subunit) for subunit in subunits})
+
+        if len(errors) > 0:
+            raise next(iter(errors.values()))
+        if len(timed_out) > 0:
+            raise InventoryValidationError(
+                f'Invalid Data! Could not resolve geographic subunits in time: {", ".join(timed_out)}')
+
+        return [results[subunit] for subunit in subunits]
         
 
 class OrganizationAutocode(ReverseListRelationship):
 
+    __slots__ = ('defer_enrichment',)
+
     def __init__(self, predicate_name, *args, **kwargs) -> None:
 
         super().__init__(predicate_name,
@@ -235,69 +282,116 @@ class OrganizationAutocode(ReverseListRelationship):
                             autoload_choices=False, 
                             overwrite=True, 
                             *args, **kwargs)
+        
+        # default for `validate`: new organizations are resolved by the EnrichmentQueue
+        self.defer_enrichment = False
 
-    def validation_hook(self, data, node, facets=None):
+    def _new_org(self, data, node, facets=None) -> dict:
+        org = {'uid': NewID(data, facets=facets), self._target_predicate: node, 'name': data}
+        # typed before it is written, also if it is resolved later by the EnrichmentQueue
+        if self.relationship_constraint:
+            org['dgraph.type'] = self.relationship_constraint
+        return org
+
+    def validation_hook(self, data, node, facets=None, dgraph_types=None):
         uid = validate_uid(data)
         if not uid:
             if not self.allow_new:
                 raise InventoryValidationError(
                     f'Error in <{self._predicate}>! provided value is not a UID: {data}')
-            new_org = {'uid': NewID(data, facets=facets), self._target_predicate: node, 'name': data}
-            new_org = self._resolve_org(new_org)
+            new_org = self._new_org(data, node, facets=facets)
+            if not self.defer_enrichment:
+                new_org = self._resolve_org(new_org)
             if self.default_predicates:
                 new_org.update(self.default_predicates)
             return new_org
         if self.relationship_constraint:
-            entry_type = dgraph.get_dgraphtype(uid)
+            entry_type = self.get_dgraphtype(uid, dgraph_types)
             if entry_type not in self.relationship_constraint:
                 raise InventoryValidationError(
                     f'Error in <{self._predicate}>! UID specified does not match constrain, UID is not a {self.relationship_constraint}!: uid <{uid}> <dgraph.type> <{entry_type}>')        
         return {'uid': UID(uid, facets=facets), self._target_predicate: node}
 
-    def validate(self, data, node, facets=None) -> Union[UID, NewID, dict]:
+    def validate(self, data, node, facets=None, dgraph_types=None, defer_enrichment=None) -> Union[UID, NewID, dict]:
         if isinstance(data, str):
             data = data.split(',')
+        if defer_enrichment is None:
+            defer_enrichment = self.defer_enrichment
 
         data = set([item.strip() for item in data])
         uids = []
+        new_orgs = []
 
         for item in data:
-            uid = self.validation_hook(item, node, facets=facets)
+            if self.allow_new and not validate_uid(item):
+                new_orgs.append(self._new_org(item, node, facets=facets))
+                continue
+            uid = self.validation_hook(item, node, facets=facets, dgraph_types=dgraph_types)
             uids.append(uid)
+
+        if len(new_orgs) > 0 and not defer_enrichment:
+            new_orgs = self._resolve_orgs(new_orgs)
+
+        for new_org in new_orgs:
+            if self.default_predicates:
+                new_org.update(self.default_predicates)
+            uids.append(new_org)
         
         return uids
 
-    def _resolve_org(self, org):
-
-        geo_result = geocode(org['name'])
+    @staticmethod
+    def _geocode_org(name: str) -> dict:
+        geo = {}
+        geo_result = geocode(name)
         if geo_result:
             try:
-                org['address_geo'] = GeoScalar('Point', [
+                geo['address_geo'] = GeoScalar('Point', [
                     float(geo_result.get('lon')), float(geo_result.get('lat'))])
             except:
                 pass
             try:
                 address_lookup = reverse_geocode(
                     geo_result.get('lat'), geo_result.get('lon'))
-                org['address_string'] = address_lookup['display_name']
+                geo['address_string'] = address_lookup['display_name']
             except:
                 pass
+        return geo
+
+    def _resolve_orgs(self, orgs: list) -> list:
+        """
+            Geocode the new organizations and look them up in Wikidata (all at once).
+            Lookups that do not finish before `ENRICHMENT_TIMEOUT` are left out.
+        """
+        from flaskinventory.add.enrichment import run_concurrently
+
+        names = list(dict.fromkeys(org['name'] for org in orgs))
+        lookups = {f'geocode: {name}': (self._geocode_org, name) for name in names}
+        lookups['wikidata'] = (get_wikidata_many, names)
+        results, errors, timed_out = run_concurrently(lookups)
+
+        for name, error in errors.items():
+            current_app.logger.warning(f'<{self._predicate}>: Could not resolve {name}: {error}')
+
+        wikidata = results.get('wikidata') or {}
+        for org in orgs:
+            org.update(results.get(f'geocode: {org["name"]}') or {})
+            if wikidata.get(org['name']):
+                for key, val in wikidata[org['name']].items():
+                    if key not in org.keys():
+                        org[key] = val
+            if self.relationship_constraint:
+                org['dgraph.type'] = self.relationship_constraint
+
+        return orgs
 
-        wikidata = get_wikidata(org['name'])
-
-        if wikidata:
-            for key, val in wikidata.items():
-                if key not in org.keys():
-                    org[key] = val
-        
-        if self.relationship_constraint:
-            org['dgraph.type'] = self.relationship_constraint
-            
-        return org
+    def _resolve_org(self, org):
+        return self._resolve_orgs([org])[0]
 
 
 class OrderedListString(ListString):
 
+    __slots__ = ()
+
     def validate(self, data, facets=None, **kwargs):
         data = self.validation_hook(data)
         ordered_data = []
@@ -326,6 +420,8 @@ class OrderedListString(ListString):
        
 class MultipleChoiceInt(MultipleChoice):
 
+    __slots__ = ()
+
     dgraph_predicate_type = '[int]'
 
     def validation_hook(self, data):
@@ -346,6 +442,8 @@ class MultipleChoiceInt(MultipleChoice):
 
 class GitHubAuto(String):
 
+    __slots__ = ()
+
     def validation_hook(self, data):
         if "github" in data:
             data = data.replace('https://www.', '')
@@ -394,6 +492,16 @@ class Entry(Schema):
                                        new=False,
                                        permission=USER_ROLES.Reviewer)
 
+    entry_enrichment_status = SingleChoice(choices={'pending': 'Pending',
+                                                    'done': 'Done',
+                                                    'failed': 'Failed'},
+                                           label='Enrichment Status',
+                                           description='Status of the automatic lookups (e.g., wikidata, website data) for this entry',
+                                           new=False,
+                                           edit=False,
+                                           read_only=True,
+                                           permission=USER_ROLES.Reviewer)
+
 
 class Organization(Entry):
 
@@ -1,15 +1,16 @@
 from flaskinventory.flaskdgraph import Schema
 from flaskinventory.flaskdgraph.dgraph_types import (UID, MutualRelationship, NewID, Predicate, ReverseRelationship, Scalar,
-                                                     SingleRelationship, GeoScalar, Variable, make_nquad, dict_to_nquad)
+                                                     SingleRelationship, GeoScalar, Variable, NQuadWriter)
 from flaskinventory.flaskdgraph.utils import validate_uid
 from flaskinventory.errors import InventoryValidationError, InventoryPermissionError
 from flaskinventory.auxiliary import icu_codes
 from flaskinventory.add.external import (geocode, instagram,
-                                         parse_meta, reverse_geocode, siterankdata, find_sitemaps, find_feeds,
+                                         parse_meta, reverse_geocode, siterankdata, find_sitemaps, find_feeds, SiteAnalysis,
                                          build_url, twitter, facebook, get_wikidata, telegram, vkontakte)
+from flaskinventory.add.enrichment import run_concurrently
 from flaskinventory.users.constants import USER_ROLES
 from flaskinventory.users.dgraph import User
-from flaskinventory import dgraph
+from flaskinventory import dgraph, unique_names
 from flask import current_app
 from werkzeug.datastructures import ImmutableMultiDict
 
@@ -25,9 +26,237 @@ import secrets
 import re
 
 import datetime
+from typing import Union
 from dateutil import parser as dateparser
 
 
+class Preflight:
+    """
+        Collects all reads that the Sanitizer needs for the given input
+        (existing entry, channel and country names, taken unique names)
+        and runs them as named blocks of a single DQL request.
+        Lookups that were not planned fall back to separate queries.
+    """
+
+    # maximum number of unique names fetched per prefix
+    prefix_limit = 1000
+
+    def __init__(self, data: dict, dgraph_type: str, fields: dict = None, uid: str = None):
+        self.data = data
+        self.dgraph_type = dgraph_type
+        self.fields = fields or {}
+        self.uid = validate_uid(uid) if uid else None
+
+        self.blocks = {}
+        self.variables = {}
+        self.result = {}
+
+        # unique names can be checked locally with the index
+        self.use_index = unique_names.active
+
+        # {uid: unique_name} of referenced nodes (channel, country)
+        self.nodes = {}
+        # {unique_name: uid} of all nodes that match one of the prefixes
+        self.unique_names = {}
+        # {block name: prefix} of unique name probes
+        self._prefix_blocks = {}
+        # prefixes for which all taken unique names are known
+        self.prefixes = []
+
+        self.plan()
+        self.run()
+
+    @staticmethod
+    def _uids(value) -> list:
+        if isinstance(value, str):
+            value = value.split(',')
+        if not isinstance(value, (list, tuple, set)):
+            value = [value]
+        return [validate_uid(v) for v in value if validate_uid(v)]
+
+    def _names(self) -> list:
+        # all names that could be turned into unique names
+        names = []
+        if self.data.get('name'):
+            name = str(self.data['name'])
+            names.append(name)
+            if self.dgraph_type == 'Source':
+                # names get normalized depending on the channel
+                site = name.replace('http://', '').replace('https://', '').lower()
+                names.append(site.rstrip('/'))
+                names.append(name.lower().replace('@', ''))
+
+        for key, item in self.fields.items():
+            if not isinstance(item, (SingleRelationship, ReverseRelationship, MutualRelationship)):
+                continue
+            if not getattr(item, 'allow_new', False) or not self.data.get(key):
+                continue
+            values = self.data[key]
+            if isinstance(values, str):
+                values = values.split(',')
+            names += [str(v).strip() for v in values
+                      if str(v).strip() != '' and not validate_uid(v)]
+        return names
+
+    def plan(self):
+        if self.uid:
+            fields = 'uid unique_name dgraph.type entry_review_status entry_added { uid }'
+            if self.dgraph_type == 'Source':
+                fields += ' channel { uid unique_name } country { uid unique_name }'
+            self.blocks['check'] = f'check(func: uid({self.uid})) @filter(has(dgraph.type)) {{ {fields} }}'
+
+        if self.data.get('unique_name') and not self.use_index:
+            self.variables['$unique_name'] = str(
+                self.data['unique_name']).strip().lower()
+            self.blocks['unique_name'] = 'unique_name(func: eq(unique_name, $unique_name)) { uid unique_name }'
+
+        uids = []
+        if self.dgraph_type == 'Source':
+            uids += self._uids(self.data.get('channel'))
+            uids += self._uids(self.data.get('country'))
+        if len(uids) > 0:
+            self.blocks['nodes'] = f'nodes(func: uid({", ".join(set(uids))})) @filter(has(dgraph.type)) {{ uid unique_name }}'
+
+        if self.use_index:
+            return
+
+        # slugs only contain [a-z0-9_], so they are safe to inline
+        # the trigram index requires at least three characters
+        slugs = set(slugify(name, separator="_") for name in self._names())
+        for i, slug in enumerate(sorted(slugs)):
+            if len(slug) < 3:
+                continue
+            self._prefix_blocks[f'prefix{i}'] = slug
+            self.blocks[f'prefix{i}'] = f'prefix{i}(func: regexp(unique_name, /^{slug}/), first: {self.prefix_limit}) {{ uid unique_name }}'
+
+    def run(self):
+        if len(self.blocks) == 0:
+            return
+        query_string = '{ ' + ' '.join(self.blocks.values()) + ' }'
+        if len(self.variables) > 0:
+            declaration = ', '.join(f'{var}: string' for var in self.variables)
+            query_string = f'query preflight({declaration}) {query_string}'
+            self.result = dgraph.query(query_string, variables=self.variables)
+        else:
+            self.result = dgraph.query(query_string)
+
+        for node in self.result.get('nodes', []):
+            self.nodes[node['uid']] = node.get('unique_name')
+
+        check = self.check
+        if check:
+            for predicate in ['channel', 'country']:
+                related = check.get(predicate, [])
+                if isinstance(related, dict):
+                    related = [related]
+                for node in related:
+                    self.nodes[node['uid']] = node.get('unique_name')
+
+        for key, prefix in self._prefix_blocks.items():
+            block = self.result.get(key, [])
+            # incomplete results cannot tell whether a unique name is free
+            if len(block) < self.prefix_limit:
+                self.prefixes.append(prefix)
+            for node in block:
+                self.unique_names[node['unique_name']] = node['uid']
+        for node in self.result.get('unique_name', []):
+            self.unique_names[node['unique_name']] = node['uid']
+
+    @property
+    def check(self) -> Union[dict, bool, None]:
+        """ Result of `Sanitizer._check_entry`, None if not planned """
+        if 'check' not in self.blocks:
+            return None
+        if len(self.result.get('check', [])) == 0:
+            return False
+        return self.result['check'][0]
+
+    def get_unique_name(self, uid) -> Union[str, None]:
+        uid = validate_uid(uid) or uid
+        if uid in self.nodes:
+            return self.nodes[uid]
+        return dgraph.get_unique_name(uid)
+
+    def covers(self, unique_name: str) -> bool:
+        """ True if the preflight request already knows whether the unique name is taken """
+        if self.use_index:
+            return True
+        if unique_name in self.unique_names:
+            return True
+        if unique_name == self.variables.get('$unique_name'):
+            return True
+        return any(unique_name.startswith(prefix) for prefix in self.prefixes)
+
+    def get_uid(self, unique_name: str) -> Union[str, None]:
+        """ uid of the node with the given unique name (if any) """
+        if self.use_index:
+            return unique_names.get_uid(unique_name)
+        if self.covers(unique_name):
+            return self.unique_names.get(unique_name)
+        return dgraph.get_uid('unique_name', unique_name)
+
+    def reserve(self, candidates: list, owner: str = None) -> Union[str, None]:
+        """ First candidate that is not taken (reserved in the index), None if all are taken """
+        if self.use_index:
+            return unique_names.reserve(candidates, owner=owner)
+        for candidate in candidates:
+            if self.get_uid(candidate) is None:
+                return candidate
+        return None
+
+
+class SanitizerPlan:
+    """
+        Validation plan for a Sanitizer class and a set of fields.
+        Resolves once which parse hooks exist and how each field is
+        handled, so that submissions do not need to inspect the
+        fields again.
+    """
+
+    __slots__ = ('hooks', 'fields', 'overwrite', 'constrained', 'deferrable')
+
+    def __init__(self, sanitizer_class, fields: dict):
+        # parse_* methods in the same (alphabetical) order as `dir()`
+        self.hooks = [name for name in dir(sanitizer_class)
+                      if name.startswith('parse_') and callable(getattr(sanitizer_class, name))]
+
+        # ordered list of (key, handler if data is provided, handler otherwise)
+        self.fields = []
+        for key, item in fields.items():
+            if isinstance(item, ReverseRelationship):
+                handler = 'reverse'
+            elif isinstance(item, MutualRelationship):
+                handler = 'mutual'
+            elif isinstance(item, SingleRelationship):
+                handler = 'single'
+            elif hasattr(item, 'validate'):
+                handler = 'validate'
+            else:
+                handler = None
+
+            if hasattr(item, 'autocode'):
+                fallback = 'autocode'
+            elif hasattr(item, 'default'):
+                fallback = 'default'
+            else:
+                fallback = None
+
+            self.fields.append((key, handler or fallback, fallback))
+
+        # [(key, predicate)] of fields that are overwritten in upserts
+        self.overwrite = [(key, item.predicate) for key, item in fields.items()
+                          if item.overwrite]
+
+        # relationship fields that check the dgraph.type of related nodes
+        self.constrained = [key for key, item in fields.items()
+                            if isinstance(item, (SingleRelationship, ReverseRelationship, MutualRelationship))
+                            and item.relationship_constraint]
+
+        # fields that can leave external lookups to the EnrichmentQueue
+        self.deferrable = [key for key, item in fields.items()
+                           if hasattr(item, 'defer_enrichment')]
+
+
 class Sanitizer:
     """ Base Class for validating data and generating mutation object
         Validates all predicates from dgraph type 'Entry'
@@ -37,6 +266,11 @@ class Sanitizer:
 
     upsert_query = None
 
+    # compiled validation plans, see `SanitizerPlan`
+    _plans = {}
+    # plans are cheap to compile, the cache is cleared when it grows beyond this size
+    max_plans = 256
+
     def __init__(self, data: dict, fields: dict = None, dgraph_type=Entry, entry_review_status=None, **kwargs):
 
         if isinstance(data, ImmutableMultiDict):
@@ -56,10 +290,26 @@ class Sanitizer:
             raise InventoryPermissionError
 
         self.data = data
+        # all reads required for this input in a single request
+        self.preflight = kwargs.get('preflight') or Preflight(
+            data, self.dgraph_type, fields=self.fields, uid=data.get('uid'))
 
         self.is_upsert = kwargs.get('is_upsert', False)
         self.skip_keys = kwargs.get('skip_keys', [])
+        # owner of all unique names reserved by this submission
+        self.reservation_owner = secrets.token_hex(8)
+        self.plan = self._get_plan()
+        # only set by the EnrichmentQueue
+        self.skip_keys.append('entry_enrichment_status')
         self.entry_review_status = entry_review_status
+        # commit the entry first and run external lookups in the background
+        self.defer_enrichment = kwargs.get('defer_enrichment', False)
+        # jobs for the EnrichmentQueue: dicts with uid, kind and payload
+        self.enrichment_jobs = []
+        # [(key, related entry)] of the fields that can defer external lookups
+        self.deferrable_related = []
+        # names of external lookups that did not finish in time
+        self.enrichment_timeouts = []
         self.overwrite = {}
         self.newsubunits = []
 
@@ -67,6 +317,8 @@ class Sanitizer:
         self.related_entries = []
         self.facets = {}
         self.entry_uid = None
+        # types of all uids referenced in relationship fields {uid: dgraph_type}
+        self.dgraph_types = {}
 
         self.delete_nquads = None
         self.upsert_query = None
@@ -74,17 +326,23 @@ class Sanitizer:
 
         if not self.is_upsert:
             self.entry['dgraph.type'] = Schema.resolve_inheritance(dgraph_type)
-        self._parse()
-        self.process_related()
-        if self.dgraph_type == 'Source':
-            if not self.is_upsert or self.entry_review_status == 'draft':
-                self.process_source()
-
-        if self.dgraph_type == 'ResearchPaper':
-            self.process_researchpaper()
-
-        self._delete_nquads()
-        self._set_nquads()
+        try:
+            self._parse()
+            self.process_related()
+            if self.defer_enrichment:
+                self.defer_related()
+            if self.dgraph_type == 'Source':
+                if not self.is_upsert or self.entry_review_status == 'draft':
+                    self.process_source()
+
+            if self.dgraph_type == 'ResearchPaper':
+                self.process_researchpaper()
+
+            self._delete_nquads()
+            self._set_nquads()
+        except Exception:
+            self.release_unique_names()
+            raise
 
     @staticmethod
     def _validate_inputdata(data: dict, user: User, ip: str) -> bool:
@@ -104,7 +362,17 @@ class Sanitizer:
             raise InventoryValidationError(
                 'You cannot edit an entry without a UID')
 
-        check = cls._check_entry(data['uid'])
+        if not isinstance(dgraph_type, str):
+            dgraph_type = dgraph_type.__name__
+
+        edit_fields = fields or Schema.get_predicates(dgraph_type)
+        if dgraph_type and fields is None:
+            if Schema.get_reverse_predicates(dgraph_type):
+                edit_fields.update(Schema.get_reverse_predicates(dgraph_type))
+
+        preflight = Preflight(data, dgraph_type,
+                              fields=edit_fields, uid=data['uid'])
+        check = preflight.check
         if not check:
             raise InventoryValidationError(
                 f'Entry can not be edited! UID does not exist: {data["uid"]}')
@@ -116,25 +384,19 @@ class Sanitizer:
 
         entry_review_status = check.get('entry_review_status')
 
-        edit_fields = fields or Schema.get_predicates(dgraph_type)
-        if dgraph_type and fields is None:
-            if Schema.get_reverse_predicates(dgraph_type):
-                edit_fields.update(Schema.get_reverse_predicates(dgraph_type))
-
         if entry_review_status != 'draft':
             edit_fields = {key: field for key,
                            field in edit_fields.items() if field.edit}
 
-        if not isinstance(dgraph_type, str):
-            dgraph_type = dgraph_type.__name__
-
-        return cls(data, is_upsert=True, dgraph_type=dgraph_type, entry_review_status=entry_review_status, fields=edit_fields, **kwargs)
+        return cls(data, is_upsert=True, dgraph_type=dgraph_type, entry_review_status=entry_review_status,
+                   fields=edit_fields, preflight=preflight, **kwargs)
 
     def _set_nquads(self):
-        nquads = dict_to_nquad(self.entry)
+        writer = NQuadWriter()
+        writer.write_dict(self.entry)
         for related in self.related_entries:
-            nquads += dict_to_nquad(related)
-        self.set_nquads = " \n".join(nquads)
+            writer.write_dict(related)
+        self.set_nquads = writer.getvalue()
 
     def _delete_nquads(self):
         if self.is_upsert:
@@ -159,8 +421,10 @@ class Sanitizer:
                     except KeyError:
                         pass
 
-            nquads = [" \n".join(dict_to_nquad(obj)) for obj in del_obj]
-            self.delete_nquads = " \n".join(nquads)
+            writer = NQuadWriter()
+            for obj in del_obj:
+                writer.write_dict(obj)
+            self.delete_nquads = writer.getvalue()
             if upsert_query != '':
                 self.upsert_query = upsert_query
             else:
@@ -195,7 +459,8 @@ class Sanitizer:
             else:
                 entry['dgraph.type'] = ["Entry"]
 
-            entry['unique_name'] = self.generate_unique_name(entry)
+            if not entry.get('unique_name'):
+                entry['unique_name'] = self.generate_unique_name(entry)
 
         facets = {'timestamp': datetime.datetime.now(
             datetime.timezone.utc),
@@ -211,6 +476,32 @@ class Sanitizer:
 
         return entry
 
+    @staticmethod
+    def _plan_key(item) -> tuple:
+        # all attributes of a field that `SanitizerPlan` depends on
+        return (type(item), getattr(item, 'predicate', None),
+                bool(getattr(item, 'overwrite', False)),
+                bool(getattr(item, 'relationship_constraint', None)),
+                hasattr(item, 'autocode'), hasattr(item, 'default'),
+                hasattr(item, 'defer_enrichment'))
+
+    def _get_plan(self) -> SanitizerPlan:
+        key = (type(self), self.dgraph_type, self.is_upsert,
+               tuple((k, self._plan_key(v)) for k, v in self.fields.items()))
+        try:
+            return self._plans[key]
+        except KeyError:
+            plan = SanitizerPlan(type(self), self.fields)
+            if len(self._plans) >= self.max_plans:
+                self._plans.clear()
+            self._plans[key] = plan
+            return plan
+
+    def _defer(self, entry: dict, kind: str, **payload):
+        self.enrichment_jobs.append(
+            {'uid': entry['uid'], 'kind': kind, 'payload': payload})
+        entry['entry_enrichment_status'] = 'pending'
+
     def _preprocess_facets(self):
         # helper function to sieve out facets from the input data
         # currently only supports single facets
@@ -228,6 +519,27 @@ class Sanitizer:
                 val, facet = key.split('@')
                 self.facets[val] = {facet: self.data[key]}
 
+    def _resolve_dgraphtypes(self):
+        # collect all uids that are referenced in relationship fields
+        # and resolve their types with a single query. The predicates
+        # then check their relationship constraints against the result
+        uids = []
+        for key in self.plan.constrained:
+            if key in self.skip_keys or not self.data.get(key):
+                continue
+            values = self.data[key]
+            if isinstance(values, str):
+                values = values.split(',')
+            uids += [validate_uid(v) for v in values if str(v).strip() != '']
+
+        # channels of new related sources
+        uids += [validate_uid(val) for key, val in self.data.items()
+                 if key.startswith('newsource_') and isinstance(val, str)]
+
+        uids = [uid for uid in uids if uid]
+        if len(uids) > 0:
+            self.dgraph_types = dgraph.get_dgraphtypes(uids)
+
     def _postprocess_list_facets(self):
         for _, ll in self.entry.items():
             if isinstance(ll, list):
@@ -247,34 +559,39 @@ class Sanitizer:
         self.skip_keys.append(self.fields['uid'].predicate)
 
         self._preprocess_facets()
+        self._resolve_dgraphtypes()
 
-        for item in dir(self):
-            if item.startswith('parse_'):
-                m = getattr(self, item)
-                if callable(m):
-                    m()
+        for hook in self.plan.hooks:
+            getattr(self, hook)()
 
-        for key, item in self.fields.items():
+        for key, handler, fallback in self.plan.fields:
             validated = None
             if key in self.skip_keys:
                 continue
 
-            if key in self.facets.keys():
-                facets = self.facets[key]
-            else:
-                facets = None
+            item = self.fields[key]
+            facets = self.facets.get(key)
+
+            if not self.data.get(key):
+                handler = fallback
 
-            if self.data.get(key) and isinstance(item, ReverseRelationship):
-                validated = item.validate(
-                    self.data[key], self.entry_uid, facets=facets)
-                if isinstance(validated, list):
-                    self.related_entries += validated
+            if handler == 'reverse':
+                if key in self.plan.deferrable:
+                    validated = item.validate(
+                        self.data[key], self.entry_uid, facets=facets, dgraph_types=self.dgraph_types,
+                        defer_enrichment=self.defer_enrichment)
                 else:
-                    self.related_entries.append(validated)
+                    validated = item.validate(
+                        self.data[key], self.entry_uid, facets=facets, dgraph_types=self.dgraph_types)
+                if not isinstance(validated, list):
+                    validated = [validated]
+                self.related_entries += validated
+                if key in self.plan.deferrable:
+                    self.deferrable_related += [(key, related) for related in validated]
                 continue
-            elif self.data.get(key) and isinstance(item, MutualRelationship):
+            elif handler == 'mutual':
                 node_data, data_node = item.validate(
-                    self.data[key], self.entry_uid, facets=facets)
+                    self.data[key], self.entry_uid, facets=facets, dgraph_types=self.dgraph_types)
                 self.entry[item.predicate] = node_data
                 if isinstance(data_node, list):
                     self.related_entries += data_node
@@ -282,27 +599,31 @@ class Sanitizer:
                     self.related_entries.append(data_node)
                 continue
 
-            elif self.data.get(key) and isinstance(item, SingleRelationship):
-                related_items = item.validate(self.data[key], facets=facets)
+            elif handler == 'single':
+                related_items = item.validate(
+                    self.data[key], facets=facets, dgraph_types=self.dgraph_types)
                 validated = []
                 if isinstance(related_items, list):
-                    for item in related_items:
-                        validated.append(item['uid'])
-                        if isinstance(item['uid'], NewID):
-                            self.related_entries.append(item)
+                    for related in related_items:
+                        validated.append(related['uid'])
+                        if isinstance(related['uid'], NewID):
+                            self.related_entries.append(related)
 
                 else:
                     validated = related_items['uid']
                     if isinstance(related_items['uid'], NewID):
                         self.related_entries.append(related_items)
 
-            elif self.data.get(key) and hasattr(item, 'validate'):
+            elif handler == 'validate':
                 validated = item.validate(self.data[key], facets=facets)
-            elif hasattr(item, 'autocode'):
-                if item.autoinput in self.data.keys():
+            elif handler == 'autocode':
+                if item.autoinput in self.data.keys() and self.defer_enrichment:
+                    self._defer(self.entry, 'autocode', dgraph_type=self.dgraph_type,
+                                predicate=key, value=self.data[item.autoinput])
+                elif item.autoinput in self.data.keys():
                     validated = item.autocode(
                         self.data[item.autoinput], facets=facets)
-            elif hasattr(item, 'default'):
+            elif handler == 'default':
                 validated = item.default
                 if hasattr(validated, 'facets') and facets is not None:
                     validated.update_facets(facets)
@@ -325,11 +646,10 @@ class Sanitizer:
 
         if self.is_upsert:
             self.entry = self._add_entry_meta(self.entry)
-            self.overwrite[self.entry_uid] = [item.predicate for k, item in self.fields.items(
-            ) if item.overwrite and k in self.data.keys()]
+            self.overwrite[self.entry_uid] = [predicate for k, predicate in self.plan.overwrite
+                                              if k in self.data.keys()]
         else:
             self.entry = self._add_entry_meta(self.entry, newentry=True)
-            self.entry['unique_name'] = self.generate_unique_name(self.entry)
 
         self._postprocess_list_facets()
 
@@ -341,6 +661,16 @@ class Sanitizer:
                 related['name'] = str(related['uid']).replace(
                     '_:', '').replace('_', ' ').title()
 
+    def defer_related(self):
+        # new organizations are resolved (geocoding, wikidata) in the background
+        # with the field they were added with
+        for key, related in self.deferrable_related:
+            if related.get('entry_enrichment_status'):
+                continue
+            if isinstance(related['uid'], NewID):
+                self._defer(related, 'organization', dgraph_type=self.dgraph_type,
+                            predicate=key, name=str(related['name']))
+
     def parse_entry_review_status(self):
         if self.data.get('accept'):
             if self.user.user_role < USER_ROLES.Reviewer:
@@ -367,36 +697,61 @@ class Sanitizer:
     def parse_unique_name(self):
         if self.data.get('unique_name'):
             unique_name = self.data['unique_name'].strip().lower()
-            if self.is_upsert:
-                check = dgraph.get_uid('unique_name', unique_name)
-                if check:
-                    if check != str(self.entry_uid):
-                        raise InventoryValidationError(
-                            'Unique Name already taken!')
+            check = self.preflight.get_uid(unique_name)
+            if check:
+                if not self.is_upsert or check != str(self.entry_uid):
+                    raise InventoryValidationError(
+                        'Unique Name already taken!')
+            elif self.preflight.reserve([unique_name], owner=self.reservation_owner) is None:
+                raise InventoryValidationError(
+                    'Unique Name already taken!')
             self.entry['unique_name'] = unique_name
-        elif not self.is_upsert:
-            name = slugify(self.data.get('name'), separator="_")
-
-            query_string = f''' query quicksearch($value: string)
-                                {{
-                                data1(func: eq(unique_name, $value)) {{
-                                        unique_name
-                                        uid
-                                }}
-                                
-                            }}'''
-
-            result = dgraph.query(query_string, variables={'$value': name})
-
-            if len(result['data1']) == 0:
-                self.entry['unique_name'] = name
-            else:
-                self.entry['unique_name'] = f'{name}_{secrets.token_urlsafe(4)}'
+        # new entries without a unique name get one in `_add_entry_meta`
+
+    def reserve_unique_name(self, candidates: list) -> str:
+        """ First candidate that is available, otherwise the last candidate with a random suffix """
+        unique_name = self.preflight.reserve(
+            candidates, owner=self.reservation_owner)
+        while unique_name is None:
+            unique_name = self.preflight.reserve([f'{candidates[-1]}_{secrets.token_urlsafe(4)}'],
+                                                 owner=self.reservation_owner)
+        return unique_name
+
+    def release_unique_names(self):
+        """ Give up all unique names reserved by this submission (call if the mutation failed) """
+        unique_names.release(self.reservation_owner)
+
+    def commit_unique_names(self, uids: dict = None):
+        """
+            Add the written unique names to the index and release the remaining reservations
+            (call after the mutation). `uids` maps the blank nodes to their new uids (`result.uids`)
+        """
+        uids = uids or {}
+        for entry in [self.entry] + self.related_entries:
+            if not entry.get('unique_name'):
+                continue
+            uid = str(self.entry_uid if entry is self.entry else entry.get('uid'))
+            if uid.startswith('_:'):
+                uid = uids.get(uid[2:])
+            if uid:
+                unique_names.add(entry['unique_name'], uid)
+        self.release_unique_names()
 
     def parse_wikidata(self):
+        if self.is_upsert:
+            return
+        if self.defer_enrichment:
+            self._defer(self.entry, 'wikidata', dgraph_type=self.dgraph_type,
+                        name=self.data.get('name'))
+            return
         predicates = Schema.get_predicates(self.dgraph_type)
         if not self.is_upsert:
-            wikidata = get_wikidata(self.data.get('name'))
+            try:
+                wikidata = get_wikidata(self.data.get('name'))
+            except Exception as e:
+                current_app.logger.warning(
+                    f'Could not fetch wikidata for {self.data.get("name")}! Exception: {e}')
+                wikidata = False
             if wikidata:
                 for key, val in wikidata.items():
                     if val is None:
@@ -419,10 +774,7 @@ class Sanitizer:
             unique_name = slugify(str(entry['uid']), separator="_")
             if hasattr(entry['uid'], 'original_value'):
                 entry['name'] = entry['uid'].original_value
-        if dgraph.get_uid('unique_name', unique_name):
-            unique_name += f'_{secrets.token_urlsafe(4)}'
-
-        return unique_name
+        return self.reserve_unique_name([unique_name])
 
     def process_researchpaper(self):
         """
@@ -453,14 +805,14 @@ class Sanitizer:
         """
 
         try:
-            channel = dgraph.get_unique_name(self.entry['channel'].query)
+            channel = self.preflight.get_unique_name(self.entry['channel'].query)
         except KeyError:
-            channel = dgraph.get_unique_name(self.data['channel'])
+            channel = self.preflight.get_unique_name(self.data['channel'])
 
-        if channel == 'website':
-            self.resolve_website()
-            self.fetch_siterankdata()
-            self.fetch_feeds()
+        if self.defer_enrichment:
+            self.defer_channel(channel)
+        elif channel == 'website':
+            self.fetch_website()
         elif channel == 'instagram':
             self.fetch_instagram()
         elif channel == 'twitter':
@@ -478,7 +830,8 @@ class Sanitizer:
             country_uid = self.entry['country']
 
         self.entry['unique_name'] = self.source_unique_name(
-            self.entry['name'], channel=channel, country_uid=country_uid)
+            self.entry['name'], channel=channel, country_uid=country_uid,
+            preflight=self.preflight, owner=self.reservation_owner)
 
         # inherit from main source
         for source in self.related_entries:
@@ -486,7 +839,7 @@ class Sanitizer:
                 if 'Source' in source['dgraph.type']:
                     rel_channel = self.data.get('newsource_' + source['name'])
                     if rel_channel:
-                        if dgraph.get_dgraphtype(rel_channel) == 'Channel':
+                        if Predicate.get_dgraphtype(validate_uid(rel_channel) or rel_channel, self.dgraph_types) == 'Channel':
                             source['channel'] = UID(rel_channel)
                     else:
                         raise InventoryValidationError(
@@ -508,15 +861,27 @@ class Sanitizer:
                         'party_affiliated')
 
     @staticmethod
-    def source_unique_name(name, channel=None, country=None, country_uid=None):
+    def source_unique_name(name, channel=None, country=None, country_uid=None, preflight: Preflight = None, owner: str = None):
         name = slugify(str(name), separator="_")
         channel = slugify(str(channel), separator="_")
-        if country_uid:
+        if country_uid and preflight:
+            country = preflight.get_unique_name(country_uid.query)
+        elif country_uid:
             country = dgraph.query(
                 f'''{{ q(func: uid({country_uid.query})) {{ unique_name }} }}''')
             country = country['q'][0]['unique_name']
 
         country = slugify(country, separator="_")
+
+        if preflight and preflight.covers(name):
+            # all candidates start with the name
+            unique_name = preflight.reserve(
+                [name, f'{name}_{channel}', f'{name}_{country}_{channel}'], owner=owner)
+            while unique_name is None:
+                unique_name = preflight.reserve(
+                    [f'{name}_{country}_{channel}_{secrets.token_urlsafe(4)}'], owner=owner)
+            return unique_name
+
         query_string = f'''{{
                             field1 as var(func: eq(unique_name, "{name}"))
                             field2 as var(func: eq(unique_name, "{name}_{channel}"))
@@ -550,25 +915,76 @@ class Sanitizer:
         else:
             return f'{name}_{country}_{channel}_{secrets.token_urlsafe(4)}'
 
-    def resolve_website(self):
-        # first check if website exists
+    def defer_channel(self, channel: str):
+        """
+            Only normalize the name of the source and
+            leave the external lookups to the EnrichmentQueue
+        """
+        if channel == 'website':
+            site = str(self.entry['name']).replace(
+                'http://', '').replace('https://', '').lower()
+            if site.endswith('/'):
+                site = site[:-1]
+            self.entry['name'] = Scalar(site)
+            self.entry['channel_url'] = build_url(self.data['name'])
+            self._defer(self.entry, 'website', name=site,
+                        url=str(self.data['name']))
+        elif channel in ['instagram', 'twitter', 'vkontakte', 'telegram']:
+            username = self.data['name'].replace('@', '')
+            self.entry['name'] = username.lower()
+            self.entry['channel_url'] = username
+            self._defer(self.entry, 'profile', channel=channel, name=username)
+        elif channel == 'facebook':
+            self.entry['channel_url'] = self.entry['name']
+
+    def fetch_website(self):
+        """
+            Runs all lookups for websites concurrently
+            and waits at most `ENRICHMENT_TIMEOUT` seconds.
+            Lookups that did not finish in time are skipped
+            and recorded in `enrichment_timeouts`, except for the homepage
+            itself: websites that do not respond in time are rejected
+        """
         entry_name = str(self.entry['name'])
-        try:
-            names, urls = parse_meta(entry_name)
-        except:
+
+        # clean up the display name of the website
+        site = entry_name.replace(
+            'http://', '').replace('https://', '').lower()
+
+        if site.endswith('/'):
+            site = site[:-1]
+
+        # homepage and robots.txt are only fetched once for all lookups
+        analysis = SiteAnalysis(entry_name)
+        results, errors, self.enrichment_timeouts = run_concurrently({
+            'meta': (parse_meta, analysis),
+            'siterankdata': (siterankdata, site),
+            'sitemaps': (find_sitemaps, analysis),
+            'feeds': (find_feeds, analysis)
+        })
+
+        for lookup, e in errors.items():
+            if lookup == 'meta':
+                continue
+            current_app.logger.warning(
+                f'Could not fetch {lookup} for {site}! Exception: {e}')
+
+        if 'meta' in errors:
             raise InventoryValidationError(
                 f"Could not resolve website! URL provided does not exist: {self.data.get('name')}")
 
-        if urls == False:
+        if 'meta' in self.enrichment_timeouts:
             raise InventoryValidationError(
-                f"Could not resolve website! URL provided does not exist: {self.data.get('name')}")
+                f"Could not resolve website! URL provided did not respond in time: {self.data.get('name')}")
 
-        # clean up the display name of the website
-        entry_name = entry_name.replace(
-            'http://', '').replace('https://', '').lower()
+        self.resolve_website(site, *results['meta'])
+        self.fetch_siterankdata(results.get('siterankdata'))
+        self.fetch_feeds(results.get('sitemaps', []), results.get('feeds', []))
 
-        if entry_name.endswith('/'):
-            entry_name = entry_name[:-1]
+    def resolve_website(self, entry_name: str, names: list, urls: list):
+        if urls == False:
+            raise InventoryValidationError(
+                f"Could not resolve website! URL provided does not exist: {self.data.get('name')}")
 
         # append automatically retrieved names to other_names
         if len(names) > 0:
@@ -593,30 +1009,20 @@ class Sanitizer:
         self.entry['channel_url'] = build_url(
             self.data['name'])
 
-    def fetch_siterankdata(self):
-        try:
-            daily_visitors = siterankdata(self.entry['name'])
-        except Exception as e:
-            current_app.logger.warning(
-                f'Could not fetch siterankdata for {self.entry["name"]}! Exception: {e}')
-            daily_visitors = None
-
+    def fetch_siterankdata(self, daily_visitors):
         if daily_visitors:
             self.entry['audience_size'] = Scalar(datetime.date.today(), facets={
                 'count': daily_visitors,
                 'unit': "daily visitors",
                 'data_from': f"https://siterankdata.com/{str(self.entry['name']).replace('www.', '')}"})
 
-    def fetch_feeds(self):
+    def fetch_feeds(self, sitemaps: list, feeds: list):
         self.entry['channel_feeds'] = []
-        sitemaps = find_sitemaps(self.entry['name'])
         if len(sitemaps) > 0:
             for sitemap in sitemaps:
                 self.entry['channel_feeds'].append(
                     Scalar(sitemap, facets={'kind': 'sitemap'}))
 
-        feeds = find_feeds(self.entry['name'])
-
         if len(feeds) > 0:
             for feed in feeds:
                 self.entry['channel_feeds'].append(
@@ -751,6 +1157,17 @@ class OrganizationSanitizer(Sanitizer):
             self.entry['dgraph.type'].append('Organization')
 
 
+class TypedSanitizer(Sanitizer):
+    """ Sanitizer for arbitrary dgraph types, see `make_sanitizer` """
+
+    def __init__(self, d, dtype='Entry', *args, **kwargs):
+
+        super().__init__(d, *args, **kwargs)
+
+        if not self.is_upsert:
+            self.entry['dgraph.type'].append(dtype)
+
+
 def make_sanitizer(data: dict, dgraph_type, edit=False):
 
     if not isinstance(dgraph_type, str):
@@ -760,15 +1177,6 @@ def make_sanitizer(data: dict, dgraph_type, edit=False):
     if Schema.get_reverse_predicates(dgraph_type):
         fields.update(Schema.get_reverse_predicates(dgraph_type))
 
-    class S(Sanitizer):
-
-        def __init__(self, d, dtype='Entry', *args, **kwargs):
-
-            super().__init__(d, *args, **kwargs)
-
-            if not self.is_upsert:
-                self.entry['dgraph.type'].append(dtype)
-
     if edit:
-        return S.edit(data, fields=fields, dtype=dgraph_type)
-    return S(data, fields=fields, dtype=dgraph_type)
+        return TypedSanitizer.edit(data, fields=fields, dtype=dgraph_type)
+    return TypedSanitizer(data, fields=fields, dtype=dgraph_type)
@@ -1,13 +1,22 @@
-from flaskinventory import dgraph
+from flaskinventory import dgraph, gazetteer
 
 
-# cache this function
 def get_country_choices(opted=True, multinational=False, addblank=False) -> list:
     """ Helper function to get form choices 
-        Queries for all countries and returns a list of tuples
+        Gets all countries from the gazetteer (or DGraph) and returns a list of tuples
         [(<uid>, 'Country Name'), ...]
         Filters countries by default according to OPTED scope
     """
+    if gazetteer.active:
+        c_choices = [(country['uid'], country['name'])
+                     for country in gazetteer.entries('Country', opted=True if opted else None)]
+        if multinational:
+            c_choices += [(multi['uid'], multi['name'])
+                          for multi in gazetteer.entries('Multinational')]
+        if addblank:
+            c_choices.insert(0, ('', ''))
+        return c_choices
+
     query_string = '''{ q(func: type("Country"), orderasc: name)'''
     if opted:
         query_string += ''' @filter(eq(opted_scope, true)) '''
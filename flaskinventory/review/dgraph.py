@@ -15,7 +15,7 @@ def get_overview(dgraphtype, country=None, user=None):
     else:
         query_head = f'''{{ q(func: type({dgraphtype})) @filter(eq(entry_review_status, "pending") '''
 
-    query_fields = f''' uid name unique_name dgraph.type 
+    query_fields = f''' uid name unique_name dgraph.type entry_enrichment_status
                         entry_added @facets(timestamp) {{ uid user_displayname }}
                         country {{ uid unique_name name }} 
                         channel {{ uid unique_name name }} '''
@@ -1,6 +1,7 @@
 from flask import (Blueprint, render_template, url_for,
                    flash, redirect, request, abort, current_app)
 from flask_login import login_required, current_user
+from flaskinventory import autocomplete, field_options, gazetteer
 from flaskinventory.misc.forms import get_country_choices
 from flaskinventory.review.forms import ReviewFilter
 from flaskinventory.review.dgraph import get_overview, accept_entry, reject_entry, send_acceptance_notification
@@ -48,6 +49,7 @@ def submit():
         if request.form.get('accept'):
             try:
                 accept_entry(uid, current_user)
+                autocomplete.update([uid])
                 send_acceptance_notification(uid)
                 flash('Entry has been accepted!', category='success')
                 return redirect(url_for('review.overview', **request.args))
@@ -58,6 +60,10 @@ def submit():
         elif request.form.get('reject'):
             try:
                 reject_entry(uid, current_user)
+                autocomplete.update([uid])
+                # rejected entries are deleted
+                field_options.invalidate()
+                gazetteer.invalidate()
                 flash('Entry has been rejected!', category='info')
                 return redirect(url_for('review.overview', **request.args))
             except Exception as e:
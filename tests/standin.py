@@ -0,0 +1,228 @@
+"""
+    Stand-in server for all external APIs used by `flaskinventory.add.external`
+    (Nominatim, Wikidata, siterankdata, Facebook, VK, Twitter, Crossref, arXiv,
+    CRAN and arbitrary websites), for offline tests and benchmarks.
+
+    Start it and set `HTTP_STANDIN` to its url: the `HTTPClient` then sends every
+    request for `https://host/path` to `{HTTP_STANDIN}/host/path`.
+
+    Responses are canned fixtures (tests/fixtures/standin/*.json), modelled on the
+    responses of the real APIs. Latency and failures can be injected per host.
+    Instagram (instaloader) and Telegram (MTProto) are not covered.
+
+    Usage: python tests/standin.py [--port 8099] [--latency 0.1] [--failure-rate 0.05]
+"""
+
+import argparse
+import json
+import random
+import re
+import string
+import threading
+import time
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'standin'
+
+
+def load_fixtures(path: Path = FIXTURES) -> list:
+    """
+        Routes of all fixture files, websites (host `*`) last.
+        Each fixture file has a `host` and a list of `routes`:
+        `path` (regex, named groups are template variables), optional `query` (params that must match),
+        `status`, `headers`, `content_type` and the response as `json`, `body` or `file`.
+        Responses are templates (`$host`, `$path`, query params, named groups);
+        with `repeat` the `item` template is rendered for each comma separated value of a query param
+        (available as `$items` and `$count`).
+    """
+    routes = []
+    for fixture in sorted(path.glob('*.json')):
+        with open(fixture, encoding='utf-8') as f:
+            spec = json.load(f)
+        for route in spec['routes']:
+            route = dict(route, host=spec['host'], pattern=re.compile(route['path']))
+            if 'file' in route:
+                route['body'] = (path / route['file']).read_text(encoding='utf-8')
+            routes.append(route)
+    return sorted(routes, key=lambda route: route['host'] == '*')
+
+
+class StandInServer:
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0,
+                 jitter: float = 0, host_latency: dict = None, failure_rate: float = 0,
+                 failure_status: int = 503, seed: int = None, fixtures: Path = FIXTURES):
+        """
+            :param latency: seconds before each response, plus up to `jitter` seconds
+            :param host_latency: latency for specific hosts, e.g., `{'siterankdata.com': 2}`
+            :param failure_rate: share of requests that fail with `failure_status`
+                (0: the connection is closed without a response)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.host_latency = host_latency or {}
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.routes = load_fixtures(fixtures)
+        self.random = random.Random(seed)
+        # (host, path, status, seconds)
+        self.log = []
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def reset(self):
+        with self._lock:
+            self.log = []
+
+    def stats(self) -> dict:
+        """ requests per host """
+        stats = {}
+        with self._lock:
+            for host, _, status, _ in self.log:
+                host_stats = stats.setdefault(host, {'requests': 0, 'failed': 0})
+                host_stats['requests'] += 1
+                if status != 200:
+                    host_stats['failed'] += 1
+        return stats
+
+    """
+        Responses
+    """
+
+    def match(self, host: str, path: str, params: dict):
+        for route in self.routes:
+            if route['host'] not in ('*', host):
+                continue
+            match = route['pattern'].fullmatch(path)
+            if match is None:
+                continue
+            if any(params.get(key) != value for key, value in route.get('query', {}).items()):
+                continue
+            return route, match.groupdict()
+        return None, {}
+
+    @staticmethod
+    def render(route: dict, variables: dict) -> bytes:
+        if 'json' in route:
+            # values are inserted into JSON strings
+            escaped = {key: json.dumps(str(value))[1:-1] for key, value in variables.items()}
+            return string.Template(json.dumps(route['json'])).safe_substitute(escaped).encode()
+        if 'repeat' in route:
+            values = [v for v in variables.get(route['repeat'], '').split(',') if v]
+            item = string.Template(route['item'])
+            variables = dict(variables, count=len(values),
+                             items=''.join(item.safe_substitute(variables, item=v) for v in values))
+        return string.Template(route.get('body', '')).safe_substitute(variables).encode()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                start = time.time()
+                parts = self.path.lstrip('/').split('/', 1)
+                host = parts[0].lower()
+                url = urllib.parse.urlsplit('/' + (parts[1] if len(parts) > 1 else ''))
+                params = dict(urllib.parse.parse_qsl(url.query))
+
+                delay = server.host_latency.get(host, server.latency)
+                with server._lock:
+                    delay += server.random.uniform(0, server.jitter)
+                    failed = server.random.random() < server.failure_rate
+                time.sleep(delay)
+
+                route, groups = server.match(host, url.path, params)
+                if failed and server.failure_status == 0:
+                    self.close_connection = True
+                    server._record(host, url.path, 0, start)
+                    return
+                if failed:
+                    status, headers, body = server.failure_status, {}, b'{"error": "injected failure"}'
+                    content_type = 'application/json'
+                elif route is None:
+                    status, headers, body = 404, {}, b'Not Found'
+                    content_type = 'text/plain'
+                else:
+                    variables = dict(params, host=host, path=url.path, **groups)
+                    status = route.get('status', 200)
+                    headers = route.get('headers', {})
+                    body = server.render(route, variables)
+                    content_type = route.get('content_type', 'application/json')
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except ConnectionError:
+                    # client stopped reading (e.g., head-only requests)
+                    pass
+                server._record(host, url.path, status, start)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _record(self, host: str, path: str, status: int, start: float):
+        with self._lock:
+            self.log.append((host, path, status, time.time() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in server for external APIs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0, help='Seconds before each response')
+    parser.add_argument('--jitter', type=float, default=0, help='Random extra latency (seconds)')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Share of failed requests (0-1)')
+    parser.add_argument('--failure-status', type=int, default=503,
+                        help='Status of failed requests, 0 closes the connection')
+    args = parser.parse_args()
+
+    server = StandInServer(host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+                           failure_rate=args.failure_rate, failure_status=args.failure_status)
+    print(f'Stand-in server running, set HTTP_STANDIN={server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
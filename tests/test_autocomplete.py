@@ -0,0 +1,97 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import time
+from flaskinventory import create_app, autocomplete
+from flaskinventory.flaskdgraph import AutocompleteIndex
+
+NODES = [
+    {'uid': '0x1', 'unique_name': 'derstandard_print', 'name': 'Der Standard',
+     'other_names': ['derStandard.at'], 'dgraph.type': ['Entry', 'Source'],
+     'channel': {'unique_name': 'print'}},
+    {'uid': '0x2', 'unique_name': 'derstandard_twitter', 'name': 'derStandardat',
+     'dgraph.type': ['Entry', 'Source'], 'channel': {'unique_name': 'twitter'}},
+    {'uid': '0x3', 'unique_name': 'standard_media', 'name': 'STANDARD Verlagsgesellschaft m.b.H.',
+     'dgraph.type': ['Entry', 'Organization']},
+    {'uid': '0x4', 'unique_name': 'austrian_news_corpus', 'name': 'Austrian News Corpus',
+     'title': 'The Austrian Media Corpus', 'doi': '10.1000/182', 'dgraph.type': ['Entry', 'Dataset']},
+    {'uid': '0x5', 'unique_name': 'osterreich', 'name': 'Österreich', 'dgraph.type': ['Entry', 'Source']},
+]
+
+
+class TestAutocomplete(unittest.TestCase):
+
+    """
+        Test Cases for the autocomplete index of the search bar.
+        The index is populated manually, so these tests do not require a DGraph instance.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app()
+        cls.client = cls.app.test_client()
+
+    def setUp(self):
+        self.index = AutocompleteIndex(self.app)
+        self.index.build(NODES)
+
+    def search(self, query, **kwargs):
+        with self.app.app_context():
+            return [result['uid'] for result in self.index.search(query, **kwargs)]
+
+    def test_search(self):
+        # exact name first, then terms and prefixes of name and unique name
+        self.assertEqual(self.search('der standard'), ['0x1', '0x3'])
+        self.assertEqual(self.search('derstandard'), ['0x1', '0x2'])
+        # prefix of the last term
+        self.assertEqual(self.search('verlags'), ['0x3'])
+        self.assertEqual(self.search('corp'), ['0x4'])
+        self.assertEqual(self.search('10.1000/182'), ['0x4'])
+        # case and diacritics
+        self.assertEqual(self.search('OSTERR'), ['0x5'])
+        self.assertEqual(self.search('nothing'), [])
+        self.assertEqual(self.search(''), [])
+        self.assertEqual(self.search('der standard', limit=1), ['0x1'])
+
+    def test_results(self):
+        with self.app.app_context():
+            result = self.index.search('Der Standard')[0]
+        self.assertEqual(result, {'uid': '0x1', 'unique_name': 'derstandard_print', 'name': 'Der Standard',
+                                  'other_names': ['derStandard.at'], 'type': ['Source'], 'channel': 'print'})
+
+    def test_incremental(self):
+        self.index._add(self.index.to_result({'uid': '0x1', 'unique_name': 'derstandard_print',
+                                              'name': 'Kurier', 'dgraph.type': ['Source']}))
+        self.assertEqual(self.search('kurier'), ['0x1'])
+        self.assertEqual(self.search('der standard'), ['0x3'])
+        self.index._remove('0x4')
+        self.assertEqual(self.search('10.1000/182'), [])
+        self.assertNotIn('corpus', self.index._postings)
+
+    def test_speed(self):
+        nodes = [{'uid': hex(i), 'unique_name': f'source_{i}', 'name': f'News Source {i} Zeitung',
+                  'other_names': [f'NS{i}'], 'dgraph.type': ['Source']} for i in range(16, 20016)]
+        self.index.build(NODES + nodes)
+        start = time.perf_counter()
+        for query in ['der st', 'zeit', 'news source 123', 'ns12']:
+            self.search(query)
+        self.assertLess((time.perf_counter() - start) / 4, 0.05)
+
+    def test_endpoint(self):
+        autocomplete.build(NODES)
+        try:
+            response = self.client.get('/endpoint/quicksearch', query_string={'q': 'austrian'})
+        finally:
+            autocomplete._loaded = None
+        self.assertEqual(response.json['status'], True)
+        self.assertEqual([result['uid'] for result in response.json['data']], ['0x4'])
+
+
+if __name__ == "__main__":
+    unittest.main()
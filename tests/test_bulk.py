@@ -0,0 +1,135 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import io
+import time
+from flaskinventory import create_app, unique_names
+from flaskinventory.add.bulk import BulkImport, read_rows, _resolve
+from flaskinventory.flaskdgraph.dgraph_types import UID, NewID, NQuadWriter
+
+
+class TestBulkImport(unittest.TestCase):
+
+    """
+        Test Cases for merging and writing bulk imports.
+        These tests do not require a DGraph instance.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app()
+
+    def setUp(self):
+        # unique names that are already taken (instead of DGraph)
+        self._index = (unique_names._names, unique_names._reserved,
+                       unique_names._loaded, unique_names._refreshed)
+        unique_names._names = {'falter': '0x10'}
+        unique_names._reserved = {}
+        unique_names._loaded = unique_names._refreshed = time.time()
+
+    def tearDown(self):
+        (unique_names._names, unique_names._reserved,
+         unique_names._loaded, unique_names._refreshed) = self._index
+
+    def make_result(self, row, name, org_name, org_unique_name=None):
+        # mimics the output of a Sanitizer for a new source with a new organization
+        entry_uid = NewID('_:newentry')
+        org_uid = NewID(org_name)
+        entry = {'uid': entry_uid,
+                 'dgraph.type': ['Entry', 'Source'],
+                 'name': name,
+                 'unique_name': name.lower(),
+                 'channel': UID('0x1')}
+        org = {'uid': org_uid,
+               'dgraph.type': ['Entry', 'Organization'],
+               'name': org_name,
+               'unique_name': org_unique_name or org_name.lower().replace(' ', '_'),
+               'publishes': entry_uid}
+        return {'row': row, 'entry': entry, 'related': [org],
+                'jobs': [{'uid': org_uid, 'kind': 'organization', 'payload': {}}]}
+
+    def test_read_rows(self):
+        csv_file = io.StringIO('name,channel,other_names\nDer Standard,0x1,"DST, Standard"\nFalter,0x2,\n')
+        rows = read_rows(csv_file, fmt='csv')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['other_names'], 'DST, Standard')
+        self.assertNotIn('other_names', rows[1])
+
+        jsonl_file = io.StringIO('{"name": "Der Standard", "languages": ["de"]}\n\n{"name": "Falter"}\n')
+        rows = read_rows(jsonl_file, fmt='jsonl')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['languages'], ['de'])
+
+    def test_merge(self):
+        with self.app.app_context():
+            bulk = BulkImport([], 'Source', workers=1)
+            bulk.results = [self.make_result(0, 'Standard', 'New Media'),
+                            self.make_result(1, 'Falter', 'New Media'),
+                            self.make_result(2, 'Standard', 'Other Media')]
+            bulk.merge()
+
+        self.assertEqual(bulk.report['merged'], 1)
+        self.assertEqual(len(bulk.nodes), 2)
+
+        entry_uids = [str(result['entry']['uid']) for result in bulk.results]
+        self.assertEqual(len(set(entry_uids)), 3)
+        # the same unique name cannot be used twice in a batch
+        self.assertNotEqual(bulk.results[0]['entry']['unique_name'],
+                            bulk.results[2]['entry']['unique_name'])
+
+        # both rows link to the same organization
+        links = [result['related'][0] for result in bulk.results[:2]]
+        self.assertEqual(str(links[0]['uid']), str(links[1]['uid']))
+        self.assertEqual(str(links[1]['publishes']), entry_uids[1])
+        self.assertNotIn('name', links[1])
+
+        # the organization itself is created without the links
+        org = list(bulk.nodes.values())[0]
+        self.assertNotIn('publishes', org)
+        self.assertEqual(str(org['uid']), str(links[0]['uid']))
+
+    def test_unique_names(self):
+        with self.app.app_context():
+            bulk = BulkImport([], 'Source', workers=1)
+            # two rows create the same organization, a third one
+            # a different organization with the same unique name (validated in other processes)
+            bulk.results = [self.make_result(0, 'New_Media', 'New Media'),
+                            self.make_result(1, 'Falter', 'New Media'),
+                            self.make_result(2, 'Kurier', 'New Media Group', org_unique_name='new_media')]
+            bulk.merge()
+            # reserved by this import
+            self.assertTrue(unique_names.taken('kurier'))
+
+        self.assertEqual(bulk.report['merged'], 1)
+        self.assertEqual(len(bulk.nodes), 2)
+        written = [result['entry']['unique_name'] for result in bulk.results] + \
+            [node['unique_name'] for node in bulk.nodes.values()]
+        self.assertEqual(len(written), 5)
+        self.assertEqual(len(set(written)), 5)
+        # the entry keeps its name, the organizations get a suffix
+        self.assertEqual(written[0], 'new_media')
+        # taken in the inventory
+        self.assertNotEqual(written[1], 'falter')
+        self.assertTrue(written[1].startswith('falter_'))
+
+    def test_resolve(self):
+        new_org = NewID('New Media', facets={'kind': 'owner'})
+        entry = {'uid': NewID('_:row0_newentry'), 'publishes': [new_org]}
+        resolved = _resolve(entry, {new_org.newid[2:]: '0x99'})
+        self.assertIsInstance(resolved['uid'], NewID)
+        self.assertIsInstance(resolved['publishes'][0], UID)
+        self.assertEqual(resolved['publishes'][0].facets, {'kind': 'owner'})
+
+        writer = NQuadWriter()
+        writer.write_dict(resolved)
+        self.assertIn('<0x99> (kind="owner")', writer.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
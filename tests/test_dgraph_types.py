@@ -0,0 +1,63 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import datetime
+from flaskinventory.flaskdgraph.dgraph_types import (UID, NewID, Scalar, GeoScalar, Variable,
+                                                     NQuadWriter, make_nquad, dict_to_nquad)
+
+
+class TestNQuadWriter(unittest.TestCase):
+
+    """
+        Test Cases for streaming nquad serializer.
+        These tests do not require a DGraph instance.
+    """
+
+    def setUp(self):
+        self.entry = {'uid': UID('0x123'),
+                      'dgraph.type': ['Entry', 'Source'],
+                      'name': Scalar('Der "Standard"'),
+                      'other_names': [Scalar('Standard', facets={'kind': 'short'}), 'Der Standard'],
+                      'founded': datetime.datetime(1988, 10, 19),
+                      'verified_account': True,
+                      'employees': 250,
+                      'address_geo': GeoScalar('Point', [16.37, 48.21]),
+                      'audience_size': [Scalar(datetime.date(2021, 1, 1),
+                                               facets={'count': 1000 + i,
+                                                       'unit': 'daily visitors',
+                                                       'timestamp': datetime.datetime(2021, 1, 1)})
+                                        for i in range(20)],
+                      'sources_included': [UID(hex(i)) for i in range(100)],
+                      'description': None,
+                      'entry_edit_history': UID('0x1', facets={'ip': '127.0.0.1'})}
+
+    def test_write_dict(self):
+        writer = NQuadWriter()
+        writer.write_dict(self.entry)
+        self.assertEqual(writer.getvalue(), " \n".join(
+            dict_to_nquad(self.entry)))
+        self.assertEqual(len(writer), len(dict_to_nquad(self.entry)))
+
+    def test_write(self):
+        writer = NQuadWriter()
+        writer.write(UID('0x123'), '*', Scalar('*'))
+        writer.write(Variable('v', 'uid'), 'related', UID('0x123'))
+        self.assertEqual(writer.getvalue(), " \n".join([make_nquad(UID('0x123'), '*', Scalar('*')),
+                                                        make_nquad(Variable('v', 'uid'), 'related', UID('0x123'))]))
+
+    def test_new_entry(self):
+        newid = NewID('_:newentry')
+        entry = {'uid': newid, 'name': 'Test'}
+        writer = NQuadWriter()
+        writer.write_dict(entry)
+        self.assertEqual(writer.getvalue(), f'{newid.nquad} <name> "Test" .')
+
+
+if __name__ == "__main__":
+    unittest.main()
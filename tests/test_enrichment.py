@@ -0,0 +1,101 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import os
+import tempfile
+from flaskinventory import create_app, enrichment_queue
+from flaskinventory.config import Config
+
+
+class TestEnrichmentQueue(unittest.TestCase):
+
+    """
+        Test Cases for the persistent job queue.
+        These tests do not require a DGraph instance,
+        no worker threads are started.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+
+        class TestConfig(Config):
+            ENRICHMENT_DEFERRED = False
+            ENRICHMENT_QUEUE_PATH = os.path.join(cls.tmpdir.name, 'queue.sqlite')
+            ENRICHMENT_RETRIES = 2
+            ENRICHMENT_RETRY_DELAY = 0
+
+        cls.app = create_app(config_class=TestConfig)
+        cls.queue = enrichment_queue
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        # pretend the workers are running in this process
+        self.queue._pid = os.getpid()
+        self.queue._create_tables()
+        conn = self.queue._connect()
+        conn.execute('DELETE FROM jobs')
+        conn.close()
+
+    def test_claim(self):
+        with self.app.app_context():
+            job_id = self.queue.enqueue('0x1', 'wikidata', {'name': 'Der Standard'})
+            job = self.queue.claim()
+            self.assertEqual(job['id'], job_id)
+            self.assertEqual(job['payload'], '{"name": "Der Standard"}')
+            # a running job cannot be claimed twice
+            self.assertIsNone(self.queue.claim())
+            self.assertEqual(self.queue.entry_status('0x1'), 'pending')
+            self.queue.complete(job_id)
+            self.assertEqual(self.queue.entry_status('0x1'), 'done')
+
+    def test_retry(self):
+        with self.app.app_context():
+            self.queue.enqueue('0x2', 'website', {'name': 'derstandard.at'})
+            job = self.queue.claim()
+            self.assertTrue(self.queue.fail(job['id'], 1, 'Timeout'))
+            self.assertEqual(self.queue.entry_status('0x2'), 'pending')
+            job = self.queue.claim()
+            self.assertEqual(job['attempts'], 1)
+            self.assertFalse(self.queue.fail(job['id'], 2, 'Timeout'))
+            self.assertIsNone(self.queue.claim())
+            self.assertEqual(self.queue.entry_status('0x2'), 'failed')
+            self.assertEqual(self.queue.jobs('0x2')[0]['last_error'], 'Timeout')
+
+    def test_enqueue_jobs(self):
+        jobs = [{'uid': '_:newsource', 'kind': 'profile',
+                 'payload': {'channel': 'twitter', 'name': 'derstandardat'}},
+                {'uid': '0x3', 'kind': 'wikidata', 'payload': {'name': 'Der Standard'}},
+                {'uid': '_:unknown', 'kind': 'wikidata', 'payload': {'name': 'Unknown'}}]
+        with self.app.app_context():
+            job_ids = self.queue.enqueue_jobs(jobs, {'newsource': '0x4'})
+            self.assertEqual(len(job_ids), 2)
+            self.assertEqual(self.queue.jobs('0x4')[0]['kind'], 'profile')
+            self.assertEqual(len(self.queue.jobs('0x3')), 1)
+            with self.assertRaises(ValueError):
+                self.queue.enqueue('0x3', 'unknown', {})
+            # the entry is already committed: failures are only logged
+            with self.assertLogs('flaskinventory.add.enrichment', level='ERROR'):
+                job_ids = self.queue.enqueue_jobs([{'uid': '0x3', 'kind': 'unknown', 'payload': {}}])
+            self.assertEqual(job_ids, [])
+
+    def test_no_workers(self):
+        # without deferred enrichment jobs are only stored
+        self.queue._pid = None
+        with self.app.app_context():
+            self.queue.enqueue('0x5', 'wikidata', {'name': 'Der Standard'})
+        self.assertEqual(self.queue._threads, [])
+        self.assertEqual(self.queue.entry_status('0x5'), 'pending')
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
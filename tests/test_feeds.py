@@ -0,0 +1,154 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from flaskinventory import create_app
+from flaskinventory.config import Config
+from flaskinventory.add.external import find_feeds, find_sitemaps, parse_meta, SiteAnalysis
+
+ITEM = '<item><title>News {0}</title><link>https://example.com/{0}</link></item>'
+
+RSS = ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Feed</title>'
+       + ''.join(ITEM.format(i) for i in range(200)) + '</channel></rss>')
+
+HOMEPAGE = ('<html><head><meta property="og:title" content="Example News">'
+            '<link rel="alternate" type="application/rss+xml" href="/feeds/main.xml"></head><body>'
+            + ''.join(f'<a href="/feeds/{i}.xml">Feed {i}</a>' for i in range(20))
+            + '<a href="/rss-info">About our feeds</a><a href="/sitemap.xml">Sitemap</a></body></html>')
+
+# several MB, only the head is needed
+NEWS_PAGE = ('<html><head><title>News</title>'
+             '<meta property="og:title" content="Example News"><meta property="og:url" content="https://example.com/">'
+             '<script type="application/ld+json">{"@type": "WebPage", "name": "Example News Online", '
+             '"url": "https://www.example.com/"}</script>'
+             '<link rel="alternate" type="application/rss+xml" href="/feeds/main.xml"></head><body>'
+             + '<div><a href="/news">News</a></div>' * 100000 + '</body></html>')
+
+SITEMAP = '<?xml version="1.0"?><urlset><url><loc>https://example.com/</loc></url></urlset>'
+
+
+class Website(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_GET(self):
+        Website.requests.append((self.path, self.headers.get('Range')))
+        if self.path == '/':
+            status, content_type, body = 200, 'text/html', HOMEPAGE
+        elif self.path == '/news':
+            status, content_type, body = 200, 'text/html; charset=utf-8', NEWS_PAGE
+        elif self.path.startswith('/feeds/'):
+            status, content_type, body = 200, 'application/rss+xml', RSS
+        elif self.path == '/robots.txt':
+            status, content_type, body = 200, 'text/plain', 'User-agent: *\nSitemap: https://example.com/sitemap.xml'
+        elif self.path == '/sitemap.xml':
+            status, content_type, body = 200, 'application/xml', SITEMAP
+        elif self.path == '/rss-info':
+            status, content_type, body = 200, 'text/html', '<html><body>Subscribe to our rss feed</body></html>'
+        else:
+            status, content_type, body = 404, 'text/html', 'not found'
+        body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            # client stopped reading
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFeeds(unittest.TestCase):
+
+    """
+        Test Cases for feed discovery against a local website.
+        No DGraph instance or internet access required.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Website)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.site = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+        class TestConfig(Config):
+            FEEDS_MAX = 2
+            FEEDS_PROBE_WORKERS = 2
+            FEEDS_PROBE_SIZE = 1024
+
+        cls.app = create_app(config_class=TestConfig)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        Website.requests = []
+
+    def test_find_feeds(self):
+        with self.app.app_context():
+            feeds = find_feeds(self.site)
+
+        self.assertEqual(len(feeds), 2)
+        # the alternate link is the most likely candidate
+        self.assertIn(f'http://127.0.0.1:{self.server.server_address[1]}/feeds/main.xml', feeds)
+        # stops early
+        probed = [path for path, _ in Website.requests if path.startswith('/feeds/')]
+        self.assertLess(len(probed), 10)
+        # only the beginning of each candidate is requested
+        self.assertTrue(all(byte_range == 'bytes=0-1023'
+                            for path, byte_range in Website.requests if path != '/'))
+
+    def test_max_feeds(self):
+        with self.app.app_context():
+            feeds = find_feeds(self.site, max_feeds=30)
+        # sitemaps and html pages are not feeds
+        self.assertEqual(len(feeds), 21)
+        self.assertNotIn(self.site + '/sitemap.xml', feeds)
+
+    def test_site_analysis(self):
+        with self.app.app_context():
+            analysis = SiteAnalysis(self.site + '/')
+            names, urls = parse_meta(analysis)
+            sitemaps = find_sitemaps(analysis)
+            feeds = find_feeds(analysis)
+
+        self.assertEqual(names, ['Example News'])
+        self.assertEqual(sitemaps, ['https://example.com/sitemap.xml'])
+        self.assertEqual(len(feeds), 2)
+        # homepage and robots.txt are only fetched once
+        paths = [path for path, _ in Website.requests]
+        self.assertEqual(paths.count('/'), 1)
+        self.assertEqual(paths.count('/robots.txt'), 1)
+
+    def test_head_only(self):
+        with self.app.app_context():
+            analysis = SiteAnalysis(self.site + '/news')
+            names, urls = parse_meta(analysis)
+            feeds = find_feeds(analysis, max_feeds=1)
+            head = analysis.head_response
+
+        self.assertEqual(sorted(names), ['Example News', 'Example News Online'])
+        self.assertEqual(sorted(urls), ['https://example.com/', 'https://www.example.com/'])
+        self.assertEqual(feeds, [self.site + '/feeds/main.xml'])
+        # stopped reading after the head
+        self.assertTrue(head.truncated)
+        self.assertLess(len(head.content), len(NEWS_PAGE) / 10)
+        self.assertEqual([path for path, _ in Website.requests].count('/news'), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
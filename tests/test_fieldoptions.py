@@ -0,0 +1,76 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import gzip
+import json
+from flaskinventory import create_app, field_options
+
+DATA = {'channel': [{'uid': '0x1', 'name': 'Print', 'unique_name': 'print'}],
+        'country': [{'uid': '0x2', 'name': 'Austria', 'unique_name': 'austria'}],
+        'language': [{'code': 'de', 'name': 'German'}]}
+
+
+class TestFieldOptions(unittest.TestCase):
+
+    """
+        Test Cases for serving the choices of the new source form.
+        The payload is built manually, so these tests do not require a DGraph instance.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app()
+        cls.client = cls.app.test_client()
+
+    def setUp(self):
+        with self.app.app_context():
+            field_options.build(DATA)
+
+    def tearDown(self):
+        field_options._payload = None
+
+    def test_conditional(self):
+        response = self.client.get('/endpoint/new/fieldoptions', headers={'Accept-Encoding': 'identity'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, DATA)
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+
+        response = self.client.get('/endpoint/new/fieldoptions',
+                                   headers={'Accept-Encoding': 'identity', 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_gzip(self):
+        response = self.client.get('/endpoint/new/fieldoptions', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.data)), DATA)
+
+        response = self.client.get('/endpoint/new/fieldoptions',
+                                   headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes(self):
+        etag = field_options._payload[2]
+        with self.app.app_context():
+            field_options.build(dict(DATA, country=[]))
+        self.assertNotEqual(field_options._payload[2], etag)
+
+        field_options.notify('Source', '_:new <dgraph.type> "Source" .')
+        self.assertFalse(field_options._stale)
+        field_options.notify('Source', '_:new <dgraph.type> "Subunit" .')
+        self.assertTrue(field_options._stale)
+        # without DGraph, the last payload is served
+        response = self.client.get('/endpoint/new/fieldoptions', headers={'Accept-Encoding': 'identity'})
+        self.assertEqual(response.json, dict(DATA, country=[]))
+
+
+if __name__ == "__main__":
+    unittest.main()
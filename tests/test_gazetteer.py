@@ -0,0 +1,81 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import time
+from flaskinventory import create_app
+from flaskinventory.add.gazetteer import Gazetteer
+
+
+class TestGazetteer(unittest.TestCase):
+
+    """
+        Test Cases for the gazetteer.
+        The live nodes are populated manually, so these tests do not require a DGraph instance.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app()
+
+    def setUp(self):
+        self.gazetteer = Gazetteer(self.app)
+        self.gazetteer.build(
+            Country=[{'uid': '0x1', 'name': 'Austria', 'unique_name': 'austria',
+                      'country_code': 'at', 'wikidataID': 40, 'opted_scope': True},
+                     # country code and wikidata id only in data/countries.json
+                     {'uid': '0x2', 'name': 'Germany', 'unique_name': 'germany', 'opted_scope': True},
+                     {'uid': '0x3', 'name': 'Brazil', 'unique_name': 'brazil',
+                      'country_code': 'br', 'wikidataID': 155, 'opted_scope': False}],
+            Multinational=[{'uid': '0x4', 'name': 'European Union', 'unique_name': 'european_union'}],
+            Subunit=[{'uid': '0x5', 'name': 'Bavaria', 'other_names': ['Bayern'],
+                      'unique_name': 'bavaria_de', 'country': [{'uid': '0x2'}]}])
+
+    def test_lookups(self):
+        with self.app.app_context():
+            self.assertEqual(self.gazetteer.country_uid('AT'), '0x1')
+            self.assertEqual(self.gazetteer.country_uid('de'), '0x2')
+            self.assertIsNone(self.gazetteer.country_uid('fr'))
+            self.assertEqual(self.gazetteer.wikidata_uids(['Q183', 155, 'Q142']), {'Q183': '0x2', 155: '0x3'})
+            # other names from data/countries.json
+            self.assertEqual(self.gazetteer.match('Österreich', 'Country'), {'0x1'})
+            self.assertEqual(self.gazetteer.match('bayern'), {'0x5'})
+            self.assertEqual(self.gazetteer.match('Bavaria'), {'0x5'})
+            self.assertEqual(self.gazetteer.get('0x5')['country'], '0x2')
+
+    def test_entries(self):
+        with self.app.app_context():
+            self.assertEqual([c['name'] for c in self.gazetteer.entries('Country', opted=True)],
+                             ['Austria', 'Germany'])
+            self.assertEqual([c['name'] for c in self.gazetteer.entries('Country')],
+                             ['Austria', 'Brazil', 'Germany'])
+            self.assertEqual([m['uid'] for m in self.gazetteer.entries('Multinational')], ['0x4'])
+
+    def test_notify(self):
+        self.gazetteer.notify('Source', '_:new <dgraph.type> "Source" .')
+        self.assertFalse(self.gazetteer._stale)
+        self.gazetteer.notify('Source', '_:new <dgraph.type> "Subunit" .')
+        self.assertTrue(self.gazetteer._stale)
+        # without DGraph, the last loaded index is used
+        attempts = []
+
+        def load():
+            attempts.append(time.time())
+            raise ConnectionError('DGraph not available')
+
+        self.gazetteer.load = load
+        with self.app.app_context():
+            self.assertTrue(self.gazetteer.active)
+            self.assertEqual(self.gazetteer.country_uid('at'), '0x1')
+        # loading is not retried with every lookup
+        self.assertEqual(len(attempts), 1)
+        self.assertTrue(self.gazetteer._stale)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from flaskinventory import create_app, geocoder, lookup_cache
+from flaskinventory.config import Config
+from flaskinventory.add.external import geocode, reverse_geocode
+
+
+class Nominatim(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        Nominatim.requests.append((time.time(), params))
+        time.sleep(0.05)
+        if params.get('q') == 'throttled':
+            status, body = 429, {}
+        elif url.path == '/search':
+            status, body = 200, [{'display_name': params['q'], 'lat': '48.2', 'lon': '16.4'}]
+        else:
+            status, body = 200, {'display_name': f"{params['lat']}, {params['lon']}"}
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGeocoding(unittest.TestCase):
+
+    """
+        Test Cases for the rate limited geocoding service.
+        Nominatim is replaced by a local server, no DGraph instance required.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Nominatim)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+        class TestConfig(Config):
+            LOOKUP_CACHE_PATH = os.path.join(cls.tmpdir.name, 'cache.sqlite')
+            NOMINATIM_API = f'http://127.0.0.1:{cls.server.server_address[1]}'
+            GEOCODING_RATE = 10
+            GEOCODING_THROTTLE_DELAY = 0
+
+        cls.app = create_app(config_class=TestConfig)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        Nominatim.requests = []
+        with self.app.app_context():
+            lookup_cache.purge()
+
+    def test_geocode(self):
+        with self.app.app_context():
+            self.assertEqual(geocode('Vienna')['display_name'], 'Vienna')
+            self.assertEqual(reverse_geocode(48.2, 16.4)['display_name'], '48.2, 16.4')
+            # cached
+            self.assertEqual(geocode(' vienna ')['display_name'], 'Vienna')
+        self.assertEqual(len(Nominatim.requests), 2)
+
+    def test_timeout(self):
+        # geocoding gives up before the deadline of the enrichment lookups
+        self.assertLess(self.app.config['GEOCODING_TIMEOUT'], self.app.config['ENRICHMENT_TIMEOUT'])
+
+    def test_coalesce(self):
+        def lookup(_):
+            with self.app.app_context():
+                return geocode('Graz')
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lookup, range(5)))
+
+        self.assertTrue(all(result['display_name'] == 'Graz' for result in results))
+        self.assertEqual(len(Nominatim.requests), 1)
+
+    def test_rate(self):
+        with self.app.app_context():
+            results = geocoder.geocode_many(['Linz', 'Salzburg', 'Innsbruck'])
+        self.assertEqual([r['display_name'] for r in results],
+                         ['Linz', 'Salzburg', 'Innsbruck'])
+        times = [t for t, _ in Nominatim.requests]
+        self.assertEqual(len(times), 3)
+        for earlier, later in zip(times, times[1:]):
+            self.assertGreaterEqual(later - earlier, 0.09)
+
+    def test_stale_fallback(self):
+        with self.app.app_context():
+            self.assertFalse(geocode('throttled'))
+
+            # expired result from an earlier lookup
+            lookup_cache.set('geocode', 'throttled', {'display_name': 'stale'})
+            conn = lookup_cache._connect()
+            conn.execute('UPDATE lookups SET expires = 0')
+            conn.close()
+
+            self.assertEqual(geocode('throttled')['display_name'], 'stale')
+            # the throttled request was not cached
+            self.assertIsNone(lookup_cache.get('geocode', 'throttled'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from flaskinventory import create_app
+from flaskinventory.config import Config
+from flaskinventory.add.httpclient import HTTPClient, ResponseTooLarge, HostBusy
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with Handler.lock:
+            Handler.in_flight += 1
+            Handler.max_in_flight = max(Handler.in_flight, Handler.max_in_flight)
+        try:
+            if self.path.startswith('/slow'):
+                time.sleep(0.2)
+            size = 2048 if self.path.startswith('/large') else 2
+            body = b'x' * size
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+            # chunked responses have no content length
+            if self.path.endswith('chunked'):
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                self.wfile.write(f'{len(body):x}\r\n'.encode() + body + b'\r\n0\r\n\r\n')
+            else:
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        finally:
+            with Handler.lock:
+                Handler.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPClient(unittest.TestCase):
+
+    """
+        Test Cases for the pooled HTTP client.
+        These tests do not require a DGraph instance or internet access.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        class TestConfig(Config):
+            HTTP_MAX_PER_HOST = 2
+            HTTP_HOST_WAIT = 5
+            HTTP_MAX_RESPONSE_SIZE = 1024
+
+        cls.app = create_app(config_class=TestConfig)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.client = HTTPClient(self.app)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_get(self):
+        with self.app.app_context():
+            r = self.client.get(self.base + '/ok')
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.text, 'xx')
+            # connection is reused
+            r = self.client.get(self.base + '/ok')
+            self.assertEqual(r.text, 'xx')
+
+    def test_size_limit(self):
+        with self.app.app_context():
+            with self.assertRaises(ResponseTooLarge):
+                self.client.get(self.base + '/large')
+            with self.assertRaises(ResponseTooLarge):
+                self.client.get(self.base + '/large/chunked')
+            r = self.client.get(self.base + '/large', max_size=4096)
+            self.assertEqual(len(r.content), 2048)
+
+    def test_host_limit(self):
+        Handler.max_in_flight = 0
+
+        def fetch(_):
+            with self.app.app_context():
+                return self.client.get(self.base + '/slow').status_code
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(fetch, range(6)))
+
+        self.assertEqual(results, [200] * 6)
+        self.assertLessEqual(Handler.max_in_flight, 2)
+
+    def test_host_busy(self):
+        with self.app.app_context():
+            self.app.config['HTTP_HOST_WAIT'] = 0.01
+            try:
+                slot = self.client._host_slot(self.base)
+                slot.acquire()
+                slot.acquire()
+                with self.assertRaises(HostBusy):
+                    self.client.get(self.base + '/ok')
+                slot.release()
+                slot.release()
+            finally:
+                self.app.config['HTTP_HOST_WAIT'] = 5
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import json
+import os
+import tempfile
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from flaskinventory import create_app, lookup_cache
+from flaskinventory.config import Config
+from flaskinventory.add.external import arxiv, arxiv_many, lookup_identifiers
+
+ENTRY = '''<entry><id>http://arxiv.org/abs/{0}v1</id><published>2021-01-01T00:00:00Z</published>
+<title>Paper {0}</title><summary>Abstract</summary><author><name>Jane Doe</name></author></entry>'''
+
+FEED = '''<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">
+<opensearch:totalResults>{0}</opensearch:totalResults>{1}</feed>'''
+
+
+class API(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        API.requests.append((url.path, params))
+        status, content_type = 200, 'application/json'
+        if url.path == '/arxiv':
+            # unknown ids are not in the feed
+            ids = [i for i in params['id_list'].split(',') if not i.startswith('9999')]
+            body = FEED.format(len(ids), ''.join(ENTRY.format(i) for i in ids))
+            content_type = 'application/atom+xml'
+        elif url.path.startswith('/crossref/'):
+            body = json.dumps({'status': 'ok', 'message': {'title': ['Paper ' + url.path[10:]], 'type': 'article'}})
+        elif url.path.startswith('/cran/'):
+            body = json.dumps({'Package': url.path[6:], 'Title': 'Package'})
+        else:
+            status, body = 404, '{}'
+        body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestIdentifiers(unittest.TestCase):
+
+    """
+        Test Cases for batched identifier lookups (DOI, arXiv, CRAN).
+        The APIs are replaced by a local server, no DGraph instance required.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), API)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        api = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+        class TestConfig(Config):
+            LOOKUP_CACHE_PATH = os.path.join(cls.tmpdir.name, 'cache.sqlite')
+            ARXIV_API = api + '/arxiv'
+            CROSSREF_API = api + '/crossref/'
+            CRAN_API = api + '/cran/'
+
+        cls.app = create_app(config_class=TestConfig)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        API.requests = []
+        with self.app.app_context():
+            lookup_cache.purge()
+
+    def test_arxiv_many(self):
+        ids = [f'2101.{i:05d}' for i in range(60)] + ['https://arxiv.org/abs/2101.00001', '9999.00001']
+        with self.app.app_context():
+            results = arxiv_many(ids)
+            # shares the cache with single lookups
+            single = arxiv('2101.00002')
+
+        # two requests for 61 distinct ids
+        self.assertEqual(len(API.requests), 2)
+        self.assertEqual(results['2101.00001']['title'], 'Paper 2101.00001')
+        self.assertEqual(results['https://arxiv.org/abs/2101.00001']['title'], 'Paper 2101.00001')
+        self.assertEqual(str(results['2101.00001']['authors'][0]), 'Doe, Jane')
+        self.assertFalse(results['9999.00001'])
+        self.assertEqual(single['title'], 'Paper 2101.00002')
+
+    def test_lookup_identifiers(self):
+        with self.app.app_context():
+            results = lookup_identifiers({'doi': ['10.1000/1', 'https://doi.org/10.1000/2'],
+                                          'arxiv': ['2101.00001'],
+                                          'cran': ['ggplot2']})
+
+        self.assertEqual(results['doi']['https://doi.org/10.1000/2']['title'], 'Paper 10.1000/2')
+        self.assertEqual(results['arxiv']['2101.00001']['title'], 'Paper 2101.00001')
+        self.assertEqual(results['cran']['ggplot2']['name'], 'ggplot2')
+
+
+if __name__ == "__main__":
+    unittest.main()
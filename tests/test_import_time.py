@@ -0,0 +1,67 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# create_app() including all imports (ms), generous for slow CI machines
+IMPORT_TIME_BUDGET = int(os.environ.get('IMPORT_TIME_BUDGET', 2000))
+
+# parsers and platform clients are only imported on first use
+LAZY_MODULES = ['instaloader', 'tweepy', 'telethon', 'feedparser', 'bs4', 'lxml']
+
+SCRIPT = '''
+import time
+start = time.perf_counter()
+from flaskinventory import create_app
+create_app()
+print(f"{(time.perf_counter() - start) * 1000:.1f}", flush=True)
+'''
+
+
+class TestImportTime(unittest.TestCase):
+
+    """
+        Import time of `create_app()` in a fresh interpreter (`python -X importtime`).
+        See also tools/benchmarks/bench_import.py
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        env = dict(os.environ, PYTHONPATH=str(ROOT))
+        # create_app writes log files to the working directory
+        with tempfile.TemporaryDirectory() as cwd:
+            proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT],
+                                  cwd=cwd, env=env, capture_output=True, text=True)
+        cls.proc = proc
+        cls.modules = set(re.findall(r'^import time:.*\| +(\S+)$', proc.stderr, flags=re.MULTILINE))
+
+    def test_create_app(self):
+        self.assertEqual(self.proc.returncode, 0, self.proc.stderr[-2000:])
+        self.assertIn('flaskinventory', self.modules)
+
+    def test_budget(self):
+        elapsed = float(self.proc.stdout.strip().splitlines()[-1])
+        self.assertLess(elapsed, IMPORT_TIME_BUDGET,
+                        f'create_app() took {elapsed:.0f} ms (budget: {IMPORT_TIME_BUDGET} ms), '
+                        'run tools/benchmarks/bench_import.py for details')
+
+    def test_lazy_modules(self):
+        eager = [module for module in LAZY_MODULES if module in self.modules]
+        self.assertEqual(eager, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import os
+import tempfile
+import time
+from flaskinventory import create_app, lookup_cache
+from flaskinventory.config import Config
+from flaskinventory.flaskdgraph.dgraph_types import Scalar
+
+
+class TestLookupCache(unittest.TestCase):
+
+    """
+        Test Cases for the persistent cache of external lookups.
+        These tests do not require a DGraph instance or internet access.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+
+        class TestConfig(Config):
+            LOOKUP_CACHE_PATH = os.path.join(cls.tmpdir.name, 'cache.sqlite')
+            LOOKUP_CACHE_TTL = {'test': 60}
+            LOOKUP_CACHE_NEGATIVE_TTL = 1
+
+        cls.app = create_app(config_class=TestConfig)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.calls = []
+
+        @lookup_cache.cached('test')
+        def lookup(query):
+            self.calls.append(query)
+            if query == 'nothing':
+                return False
+            return {'name': query, 'authors': [Scalar('Doe, Jane', facets={'sequence': 0})]}
+
+        self.lookup = lookup
+        with self.app.app_context():
+            lookup_cache.purge()
+
+    def test_cached(self):
+        with self.app.app_context():
+            result = self.lookup('orf')
+            result['name'] = 'changed'
+            cached = self.lookup('orf')
+            self.assertEqual(self.calls, ['orf'])
+            # callers get their own copy
+            self.assertEqual(cached['name'], 'orf')
+            self.assertEqual(cached['authors'][0].facets, {'sequence': 0})
+
+        # without app context the cache is bypassed
+        self.lookup('orf')
+        self.assertEqual(len(self.calls), 2)
+
+    def test_negative(self):
+        with self.app.app_context():
+            self.assertFalse(self.lookup('nothing'))
+            self.assertFalse(self.lookup('nothing'))
+            self.assertEqual(self.calls, ['nothing'])
+
+            self.assertEqual(lookup_cache.stats()[0]['negative'], 1)
+
+            # negative results expire sooner, but stale entries are kept
+            time.sleep(1.1)
+            key = lookup_cache.make_key('nothing')
+            self.assertIsNone(lookup_cache.get('test', key))
+            self.assertFalse(lookup_cache.get('test', key, stale=True)['value'])
+            self.lookup('nothing')
+            self.assertEqual(len(self.calls), 2)
+
+    def test_hits(self):
+        # hits are counted in memory and written in batches
+        with self.app.app_context():
+            key = lookup_cache.make_key('orf')
+            self.lookup('orf')
+            for _ in range(3):
+                self.lookup('orf')
+            conn = lookup_cache._connect()
+            try:
+                row = conn.execute('SELECT hits FROM lookups WHERE source = ? AND key = ?',
+                                   ('test', key)).fetchone()
+            finally:
+                conn.close()
+            self.assertEqual(row['hits'], 0)
+            self.assertEqual(lookup_cache.stats()[0]['hits'], 3)
+            self.assertEqual(lookup_cache.entries('test')[0]['hits'], 3)
+
+    def test_unpickling(self):
+        # values that cannot be unpickled anymore are cache misses
+        with self.app.app_context():
+            key = lookup_cache.make_key('orf')
+            for value in [b'cno_such_module\nLookup\n.', b'\x80\x04\x95']:
+                self.lookup('orf')
+                conn = lookup_cache._connect()
+                try:
+                    conn.execute('UPDATE lookups SET value = ? WHERE source = ? AND key = ?',
+                                 (value, 'test', key))
+                finally:
+                    conn.close()
+                self.assertIsNone(lookup_cache.get('test', key))
+                self.assertEqual(self.lookup('orf')['name'], 'orf')
+            self.assertEqual(self.calls, ['orf', 'orf', 'orf'])
+
+    def test_purge(self):
+        with self.app.app_context():
+            self.lookup('orf')
+            self.lookup('nothing')
+            entries = lookup_cache.entries(source='test')
+            self.assertEqual(len(entries), 2)
+
+            self.assertEqual(lookup_cache.purge(source='test', negative=True), 1)
+            self.assertEqual(lookup_cache.purge(source='test', expired=True), 0)
+            self.assertEqual(lookup_cache.purge(
+                source='test', key=lookup_cache.make_key('orf')), 1)
+            self.assertEqual(lookup_cache.entries(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
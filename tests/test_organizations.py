@@ -0,0 +1,104 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import os
+import tempfile
+from flaskinventory import create_app, lookup_cache
+from flaskinventory.config import Config
+from flaskinventory.flaskdgraph import Schema
+from flaskinventory.flaskdgraph.dgraph_types import NewID
+from tests.standin import StandInServer
+
+
+class TestOrganizations(unittest.TestCase):
+
+    """
+        Test Cases for resolving new organizations (geocoding and Wikidata).
+        All external APIs are replaced by the stand-in server, no DGraph instance required.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.server = StandInServer().start()
+
+        class TestConfig(Config):
+            HTTP_STANDIN = cls.server.url
+            LOOKUP_CACHE_PATH = os.path.join(cls.tmpdir.name, 'cache.sqlite')
+            GEOCODING_RATE = 100
+
+        cls.app = create_app(config_class=TestConfig)
+        cls.field = Schema.get_reverse_predicates('Source')['publishes_org']
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.server.reset()
+        self.server.host_latency = {}
+        self.app.config['ENRICHMENT_TIMEOUT'] = 20
+        with self.app.app_context():
+            lookup_cache.purge()
+
+    def test_new_organizations(self):
+        with self.app.app_context():
+            orgs = self.field.validate('Deutsche Bank, Commerzbank, 0x123', '_:newsource',
+                                      dgraph_types={'0x123': 'Organization'})
+
+        self.assertEqual(len(orgs), 3)
+        existing = [org for org in orgs if not isinstance(org['uid'], NewID)]
+        self.assertEqual([str(org['uid']) for org in existing], ['0x123'])
+        new_orgs = {org['name']: org for org in orgs if isinstance(org['uid'], NewID)}
+        self.assertEqual(set(new_orgs.keys()), {'Deutsche Bank', 'Commerzbank'})
+        for org in new_orgs.values():
+            self.assertEqual(org['dgraph.type'], ['Organization'])
+            self.assertEqual(org['wikidataID'], 66048)
+            self.assertIn('address_geo', org)
+
+        # two searches, the entities and the labels of the headquarters in one request each
+        wikidata = [path for host, path, _, _ in self.server.log if host == 'www.wikidata.org']
+        self.assertEqual(len(wikidata), 4)
+
+    def test_deadline(self):
+        self.server.host_latency = {'www.wikidata.org': 1}
+        self.app.config['ENRICHMENT_TIMEOUT'] = 0.5
+        with self.app.app_context():
+            orgs = self.field.validate('Deutsche Bank', '_:newsource')
+
+        self.assertEqual(len(orgs), 1)
+        self.assertEqual(orgs[0]['name'], 'Deutsche Bank')
+        self.assertIn('address_geo', orgs[0])
+        self.assertNotIn('wikidataID', orgs[0])
+
+    def test_deferred(self):
+        from flaskinventory.add.enrichment import enrich_organization
+        from flaskinventory.flaskdgraph.dgraph_types import UID, NQuadWriter
+
+        # new organizations are typed before they are written
+        with self.app.app_context():
+            orgs = self.field.validate('New Org Inc', '_:newsource', defer_enrichment=True)
+        self.assertEqual(orgs[0]['dgraph.type'], ['Organization'])
+        self.assertNotIn('address_geo', orgs[0])
+        self.assertEqual(self.server.log, [])
+
+        # and the enrichment patch keeps the type
+        with self.app.app_context():
+            patch = enrich_organization('0x5', {'dgraph_type': 'Source', 'predicate': 'publishes_org',
+                                               'name': 'Deutsche Bank'})
+        self.assertEqual(patch['dgraph.type'], ['Organization'])
+        self.assertEqual(patch['wikidataID'], 66048)
+        writer = NQuadWriter()
+        writer.write_dict({'uid': UID('0x5'), **patch})
+        self.assertIn('<0x5> <dgraph.type> "Organization"', writer.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
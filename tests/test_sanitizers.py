@@ -17,7 +17,7 @@ from flaskinventory.flaskdgraph import Schema
 from flaskinventory.flaskdgraph.dgraph_types import UID, Scalar
 from flaskinventory.misc.forms import get_country_choices
 from flaskinventory.main.model import Entry, Organization, Source
-from flaskinventory.main.sanitizer import Sanitizer, make_sanitizer
+from flaskinventory.main.sanitizer import Sanitizer, Preflight, make_sanitizer
 from flaskinventory.errors import InventoryValidationError, InventoryPermissionError
 from flaskinventory import create_app, dgraph
 from flaskinventory.users.constants import USER_ROLES
@@ -640,5 +640,28 @@ class TestSanitizers(unittest.TestCase):
             self.client.get('/logout')
 
 
+    def test_preflight(self):
+        mock_data = {'name': 'derstandard',
+                     'channel': self.channel_print,
+                     'country': self.austria_uid}
+
+        with self.app.app_context():
+            preflight = Preflight(mock_data, 'Source',
+                                  uid=self.derstandard_print)
+            self.assertEqual(preflight.check['unique_name'], 'derstandard_print')
+            self.assertEqual(preflight.get_unique_name(self.channel_print), 'print')
+            self.assertEqual(preflight.get_unique_name(self.austria_uid), 'austria')
+            self.assertEqual(preflight.get_uid('derstandard_print'), self.derstandard_print)
+            self.assertTrue(preflight.covers('derstandard_austria_print'))
+            self.assertEqual(Sanitizer.source_unique_name('derstandard', channel='print',
+                                                          country_uid=UID(self.austria_uid),
+                                                          preflight=preflight),
+                             Sanitizer.source_unique_name('derstandard', channel='print',
+                                                          country_uid=UID(self.austria_uid)))
+
+            preflight = Preflight({'name': 'Test'}, 'Entry', uid='0xfffffffff')
+            self.assertFalse(preflight.check)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,100 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import threading
+import time
+from flaskinventory import create_app, social_clients
+from flaskinventory.config import Config
+from flaskinventory.add.social import PlatformLimit
+
+
+class TestPlatformLimit(unittest.TestCase):
+
+    """
+        Test Cases for the rate limits of social media clients.
+        No DGraph instance, credentials or internet access required.
+    """
+
+    def test_wait_for_reset(self):
+        limit = PlatformLimit('test', concurrency=2, max_wait=5)
+        limit.update(remaining=1, reset=time.time() + 0.3, limit=100)
+        start = time.time()
+        with limit.acquire():
+            pass
+        self.assertGreaterEqual(time.time() - start, 0.25)
+
+    def test_reset_by_update(self):
+        limit = PlatformLimit('test', max_wait=5)
+        limit.pause(10)
+
+        def reset():
+            time.sleep(0.2)
+            limit.update(remaining=100, reset=time.time() + 900)
+
+        threading.Thread(target=reset).start()
+        start = time.time()
+        with limit.acquire():
+            pass
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(limit.status()['remaining'], 99)
+        self.assertEqual(limit.status()['throttled'], 1)
+
+    def test_max_wait(self):
+        limit = PlatformLimit('test', max_wait=0.2)
+        limit.pause(60)
+        start = time.time()
+        with limit.acquire():
+            pass
+        self.assertLess(time.time() - start, 1)
+
+    def test_min_interval(self):
+        limit = PlatformLimit('test', concurrency=3, min_interval=0.1)
+        times = []
+        for _ in range(3):
+            with limit.acquire():
+                times.append(time.time())
+        self.assertGreaterEqual(times[2] - times[0], 0.19)
+
+
+class TestSocialClients(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        class TestConfig(Config):
+            SOCIAL_CONCURRENCY = {'twitter': 2}
+            VK_RATE = 5
+            TWITTER_CONSUMER_KEY = TWITTER_CONSUMER_SECRET = 'key'
+            TWITTER_ACCESS_TOKEN = TWITTER_ACCESS_SECRET = 'token'
+
+        cls.app = create_app(config_class=TestConfig)
+
+    def test_registry(self):
+        with self.app.app_context():
+            self.assertIs(social_clients.limit('twitter'), social_clients.limit('twitter'))
+            self.assertEqual(social_clients.limit('vkontakte').min_interval, 0.2)
+            # default concurrency is kept for other platforms
+            self.assertEqual(self.app.config['SOCIAL_CONCURRENCY']['instagram'], 1)
+            self.assertIn('twitter', social_clients.status())
+            api = social_clients.twitter()
+            self.assertIs(api, social_clients.twitter())
+
+    def test_apps(self):
+        # every app gets limits from its own config
+        class OtherConfig(Config):
+            VK_RATE = 2
+
+        other = create_app(config_class=OtherConfig)
+        with other.app_context():
+            self.assertEqual(social_clients.limit('vkontakte').min_interval, 0.5)
+        with self.app.app_context():
+            self.assertEqual(social_clients.limit('vkontakte').min_interval, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
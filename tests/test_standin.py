@@ -0,0 +1,149 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import os
+import tempfile
+import time
+import threading
+import requests
+from flaskinventory import create_app, lookup_cache
+from flaskinventory.config import Config
+from flaskinventory.add import external
+from flaskinventory.main.sanitizer import Sanitizer
+from flaskinventory.errors import InventoryValidationError
+from tests.standin import StandInServer
+
+
+class TestStandIn(unittest.TestCase):
+
+    """
+        Test Cases for the external lookups against the stand-in server.
+        No DGraph instance or internet access required.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.server = StandInServer(seed=1).start()
+
+        class TestConfig(Config):
+            HTTP_STANDIN = cls.server.url
+            LOOKUP_CACHE_PATH = os.path.join(cls.tmpdir.name, 'cache.sqlite')
+            GEOCODING_RATE = 100
+            VK_TOKEN = 'token'
+            TWITTER_CONSUMER_KEY = TWITTER_CONSUMER_SECRET = 'key'
+            TWITTER_ACCESS_TOKEN = TWITTER_ACCESS_SECRET = 'token'
+
+        cls.app = create_app(config_class=TestConfig)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.server.reset()
+        self.server.failure_rate = 0
+        self.server.latency = 0
+        self.server.host_latency = {}
+        with self.app.app_context():
+            lookup_cache.purge()
+
+    def test_lookups(self):
+        with self.app.app_context():
+            self.assertEqual(external.geocode('Schwanheimer Str. 149A')['address']['country_code'], 'de')
+            self.assertIn('Frankfurt', external.reverse_geocode(50.0857, 8.6262)['display_name'])
+            self.assertEqual(external.siterankdata('www.example.com'), 254000)
+            self.assertEqual(external.facebook('derstandard')['followers'], 412500)
+            self.assertEqual(external.vkontakte('derstandard')['followers'], 35642)
+            self.assertEqual(external.twitter('tagesschau')['followers'], 4012345)
+            self.assertEqual(external.doi('10.1000/182')['journal'], 'Journal of Communication')
+            self.assertEqual(external.arxiv('2101.01234')['title'], 'A corpus of news articles (2101.01234)')
+            self.assertEqual(external.cran('quanteda')['name'], 'quanteda')
+            wikidata = external.get_wikidata('Deutsche Bank')
+            self.assertEqual(wikidata['wikidataID'], 66048)
+            self.assertEqual(wikidata['address_string'], 'Frankfurt am Main')
+
+        hosts = self.server.stats()
+        self.assertNotIn('instagram.com', hosts)
+        self.assertEqual(hosts['www.wikidata.org']['requests'], 3)
+
+    def test_website(self):
+        with self.app.app_context():
+            analysis = external.SiteAnalysis('https://www.example.com')
+            names, urls = external.parse_meta(analysis)
+            sitemaps = external.find_sitemaps(analysis)
+            feeds = external.find_feeds(analysis)
+
+        self.assertIn('www.example.com Nachrichten', names)
+        self.assertEqual(sitemaps, ['https://www.example.com/sitemap.xml',
+                                    'https://www.example.com/news-sitemap.xml'])
+        self.assertEqual(feeds, ['https://www.example.com/rss', 'https://www.example.com/feeds/politics.xml'])
+
+    def test_website_concurrent(self):
+        # the head is not blocked by the download of robots.txt
+        self.server.host_latency = {'www.example.com': 0.5}
+        with self.app.app_context():
+            analysis = external.SiteAnalysis('https://www.example.com')
+            app = self.app
+
+            def robots():
+                with app.app_context():
+                    return analysis.robots
+
+            thread = threading.Thread(target=robots)
+            start = time.time()
+            thread.start()
+            time.sleep(0.1)
+            self.assertTrue(analysis.head_response)
+            head = time.time() - start
+            thread.join()
+        self.assertLess(head, 0.9)
+        self.assertTrue(analysis.robots)
+
+    def test_failures(self):
+        self.server.failure_rate = 1
+        with self.app.app_context():
+            self.assertFalse(external.siterankdata('www.example.com'))
+            self.assertFalse(external.cran('quanteda'))
+            # failed searches are raised and not cached as "not found"
+            with self.assertRaises(requests.exceptions.RequestException):
+                external.lookup_wikidata_id('Deutsche Bank')
+            self.assertIsNone(lookup_cache.get(external.lookup_wikidata_id.source,
+                                               external.lookup_wikidata_id.key('Deutsche Bank')))
+        self.assertEqual(self.server.stats()['siterankdata.com']['failed'], 1)
+
+    def test_latency(self):
+        self.server.host_latency = {'crandb.r-pkg.org': 0.3}
+        start = time.time()
+        with self.app.app_context():
+            external.cran('quanteda')
+            external.doi('10.1000/182')
+        self.assertGreaterEqual(time.time() - start, 0.3)
+        self.assertLess(time.time() - start, 2)
+
+    def test_website_timeout(self):
+        # websites that do not respond before the deadline are rejected
+        self.server.host_latency = {'www.example.com': 1}
+        timeout = self.app.config['ENRICHMENT_TIMEOUT']
+        self.app.config['ENRICHMENT_TIMEOUT'] = 0.3
+        sanitizer = Sanitizer.__new__(Sanitizer)
+        sanitizer.data = {'name': 'https://www.example.com'}
+        sanitizer.entry = {'name': 'https://www.example.com'}
+        try:
+            with self.app.app_context():
+                with self.assertRaises(InventoryValidationError):
+                    sanitizer.fetch_website()
+        finally:
+            self.app.config['ENRICHMENT_TIMEOUT'] = timeout
+        self.assertIn('meta', sanitizer.enrichment_timeouts)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import os
+import tempfile
+import time
+from flaskinventory import create_app, lookup_cache, unique_names, gazetteer
+from flaskinventory.config import Config
+from flaskinventory.flaskdgraph import Schema
+from flaskinventory.flaskdgraph.dgraph_types import UID, NewID
+from tests.standin import StandInServer
+
+
+class TestSubunits(unittest.TestCase):
+
+    """
+        Test Cases for resolving subunits by name.
+        Nominatim is replaced by the stand-in server, the gazetteer and unique names
+        are populated manually, no DGraph instance required.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.server = StandInServer().start()
+
+        class TestConfig(Config):
+            HTTP_STANDIN = cls.server.url
+            LOOKUP_CACHE_PATH = os.path.join(cls.tmpdir.name, 'cache.sqlite')
+            GEOCODING_RATE = 100
+
+        cls.app = create_app(config_class=TestConfig)
+        cls.field = Schema.get_predicates('Source')['geographic_scope_subunit']
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.server.reset()
+        with self.app.app_context():
+            lookup_cache.purge()
+        gazetteer.build(Country=[{'uid': '0x10', 'name': 'Germany', 'unique_name': 'germany', 'country_code': 'de'}],
+                        Subunit=[{'uid': '0x20', 'name': 'Bavaria', 'other_names': ['Bayern'], 'unique_name': 'bavaria_de'},
+                                 {'uid': '0x30', 'name': 'Limburg', 'unique_name': 'limburg_be'},
+                                 {'uid': '0x31', 'name': 'Limburg', 'unique_name': 'limburg_nl'}])
+        unique_names._names = {'hessen_de': '0x40'}
+        unique_names._loaded = unique_names._refreshed = time.time()
+
+    def tearDown(self):
+        gazetteer._loaded = None
+        unique_names._names = {}
+        unique_names._loaded = unique_names._refreshed = None
+
+    def test_known_subunits(self):
+        with self.app.app_context():
+            uids = self.field.validate('Bayern, Bavaria')
+        self.assertEqual([str(uid['uid']) for uid in uids], ['0x20', '0x20'])
+        # no geocoding
+        self.assertEqual(self.server.log, [])
+
+    def test_new_subunits(self):
+        start = time.time()
+        with self.app.app_context():
+            uids = self.field.validate(['Sachsen', 'Thüringen', 'Hessen', 'Bayern', 'Limburg'])
+        elapsed = time.time() - start
+
+        self.assertEqual(len(uids), 5)
+        new = [uid for uid in uids if isinstance(uid.get('uid'), NewID)]
+        self.assertCountEqual([uid['name'] for uid in new], ['Sachsen', 'Thüringen', 'Limburg'])
+        self.assertTrue(all(str(uid['country']) == '0x10' for uid in new))
+        # duplicate check with the unique name
+        self.assertIn('0x40', [str(uid['uid']) for uid in uids if isinstance(uid['uid'], UID)])
+        # 4 lookups (Limburg is ambiguous)
+        self.assertEqual(len(self.server.log), 4)
+        self.assertLess(elapsed, 5)
+
+        # geocoding results are cached
+        with self.app.app_context():
+            uids = self.field.validate(['Sachsen', 'Limburg'])
+        self.assertEqual(len(uids), 2)
+        self.assertEqual(len(self.server.log), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# Ugly hack to allow absolute import from the root folder
+# whatever its name is. Please forgive the heresy.
+if __name__ == "__main__":
+    from sys import path
+    from os.path import dirname
+
+    path.append(dirname(path[0]))
+
+import unittest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flaskinventory import create_app
+from flaskinventory.flaskdgraph import UniqueNameIndex
+
+
+class TestUniqueNameIndex(unittest.TestCase):
+
+    """
+        Test Cases for reservations in the unique name index.
+        The index is populated manually, so these tests do not require a DGraph instance.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app()
+
+    def setUp(self):
+        self.index = UniqueNameIndex(self.app)
+        self.index._names = {'derstandard': '0x1', 'derstandard_print': '0x2'}
+        self.index._loaded = self.index._refreshed = time.time()
+
+    def test_lookup(self):
+        with self.app.app_context():
+            self.assertEqual(self.index.get_uid('derstandard'), '0x1')
+            self.assertIsNone(self.index.get_uid('falter'))
+            self.assertTrue(self.index.taken('derstandard_print'))
+            self.assertFalse(self.index.taken('falter'))
+
+    def test_reserve(self):
+        with self.app.app_context():
+            candidates = ['derstandard', 'derstandard_print', 'derstandard_austria_print']
+            self.assertEqual(self.index.reserve(candidates, owner='a'), 'derstandard_austria_print')
+            # same owner can reserve again
+            self.assertEqual(self.index.reserve(candidates, owner='a'), 'derstandard_austria_print')
+            self.assertIsNone(self.index.reserve(candidates, owner='b'))
+            self.assertTrue(self.index.taken('derstandard_austria_print', owner='b'))
+            self.assertFalse(self.index.taken('derstandard_austria_print', owner='a'))
+
+            self.index.release('a')
+            self.assertEqual(self.index.reserve(candidates, owner='b'), 'derstandard_austria_print')
+
+    def test_commit(self):
+        with self.app.app_context():
+            self.assertEqual(self.index.reserve(['falter'], owner='a'), 'falter')
+            # the name was written: it stays taken after the reservation is released
+            self.index.add('falter', '0x3')
+            self.index.release('a')
+            self.assertEqual(self.index.get_uid('falter'), '0x3')
+            self.assertIsNone(self.index.reserve(['falter'], owner='b'))
+            # failed submission: the name is available again
+            self.assertEqual(self.index.reserve(['kurier'], owner='a'), 'kurier')
+            self.index.release('a')
+            self.assertEqual(self.index.reserve(['kurier'], owner='b'), 'kurier')
+
+    def test_concurrent_reservations(self):
+        def reserve(owner):
+            with self.app.app_context():
+                return self.index.reserve(['falter', 'falter_print'], owner=owner)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(reserve, range(8)))
+
+        self.assertCountEqual([r for r in results if r], ['falter', 'falter_print'])
+        self.assertEqual(results.count(None), 6)
+
+    def test_single_load(self):
+        index = UniqueNameIndex(self.app)
+        loads = []
+
+        def load():
+            loads.append(time.time())
+            time.sleep(0.2)
+            index._names = {'falter': '0x3'}
+            index._loaded = index._refreshed = time.time()
+
+        index.load = load
+
+        def lookup(_):
+            with self.app.app_context():
+                return index.get_uid('falter')
+
+        # the other threads wait for the first load
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lookup, range(8)))
+
+        self.assertEqual(results, ['0x3'] * 8)
+        self.assertEqual(len(loads), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
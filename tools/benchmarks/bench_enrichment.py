@@ -0,0 +1,141 @@
+"""
+    Benchmark: external lookups (enrichment) of new entries
+    Runs complete `Sanitizer` submissions (Sources for website, Twitter, Facebook
+    and VK, a new Organization) with all external APIs replaced by the stand-in
+    server (tests/standin.py), so latency, failures and caching are reproducible.
+
+    Requires a live DGraph with the sample data (same setup as the test suite:
+    `reviewer@opted.eu` has to exist). Nothing is written to DGraph.
+
+    Usage: python tools/benchmarks/bench_enrichment.py [--config test_config.json] [--repeat 5]
+                [--latency 0.2] [--jitter 0.1] [--slow-host siterankdata.com=3]
+                [--failure-rate 0.05] [--cache cold|warm|off]
+"""
+
+import sys
+from pathlib import Path
+import argparse
+import statistics
+import tempfile
+import time
+
+# allow absolute import from the root folder (before other packages named `tests`)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from tests.standin import StandInServer
+
+
+def submissions(dgraph) -> dict:
+    """ {label: (dgraph_type, data)} """
+    germany = dgraph.get_uid('unique_name', 'germany')
+    channel = {name: dgraph.get_uid('unique_name', name)
+               for name in ['website', 'twitter', 'facebook', 'vkontakte']}
+    source = {"other_names": "Tagesschau,Tagesthemen",
+              "publication_kind": "tv show",
+              "special_interest": "yes",
+              "topical_focus": "politics",
+              "publication_cycle": "multiple times per week",
+              "publication_cycle_weekday": ["1", "2", "3", "4", "5"],
+              "geographic_scope": "national",
+              "country": germany,
+              "languages": "de",
+              "payment_model": "free",
+              "contains_ads": "no",
+              "publishes_org": "ARD",
+              "party_affiliated": "no"}
+    return {
+        'website': ('Source', dict(source, channel=channel['website'], channel_unique_name='website',
+                                   name='https://www.tagesschau.de/', website_allows_comments='no',
+                                   related=['https://twitter.com/tagesschau'],
+                                   **{'newsource_https://twitter.com/tagesschau': channel['twitter']})),
+        'twitter': ('Source', dict(source, channel=channel['twitter'], name='tagesschau')),
+        'facebook': ('Source', dict(source, channel=channel['facebook'], name='tagesschau')),
+        'vkontakte': ('Source', dict(source, channel=channel['vkontakte'], name='tagesschau')),
+        'organization': ('Organization', {'name': 'Deutsche Bank',
+                                          'other_names': 'DB',
+                                          'ownership_kind': 'private ownership',
+                                          'country': germany,
+                                          'address_string': 'Taunusanlage 12, 60325 Frankfurt am Main',
+                                          'party_affiliated': 'no'}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark enrichment of new entries against the stand-in server')
+    parser.add_argument('--config', type=str, default=None, help='Flask config json (default: environment)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.1, help='Seconds before each response')
+    parser.add_argument('--jitter', type=float, default=0, help='Random extra latency (seconds)')
+    parser.add_argument('--slow-host', action='append', default=[], metavar='HOST=SECONDS',
+                        help='Latency for a specific host, can be repeated')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Share of failed requests (0-1)')
+    parser.add_argument('--failure-status', type=int, default=503,
+                        help='Status of failed requests, 0 closes the connection')
+    parser.add_argument('--cache', choices=['cold', 'warm', 'off'], default='cold',
+                        help='cold: empty lookup cache for each run, warm: keep it between runs')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    from flaskinventory import create_app, dgraph, lookup_cache
+    from flaskinventory.main.sanitizer import Sanitizer
+
+    host_latency = {host: float(seconds) for host, seconds in
+                    (slow.split('=', 1) for slow in args.slow_host)}
+    server = StandInServer(latency=args.latency, jitter=args.jitter, host_latency=host_latency,
+                           failure_rate=args.failure_rate, failure_status=args.failure_status,
+                           seed=args.seed).start()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    app = create_app(config_json=args.config) if args.config else create_app()
+    app.config.update(HTTP_STANDIN=server.url,
+                      LOOKUP_CACHE=args.cache != 'off',
+                      LOOKUP_CACHE_PATH=str(Path(tmpdir.name) / 'lookup_cache.sqlite'),
+                      ENRICHMENT_DEFERRED=False,
+                      VK_TOKEN=app.config.get('VK_TOKEN') or 'standin',
+                      TWITTER_CONSUMER_KEY=app.config.get('TWITTER_CONSUMER_KEY') or 'standin',
+                      TWITTER_CONSUMER_SECRET=app.config.get('TWITTER_CONSUMER_SECRET') or 'standin',
+                      TWITTER_ACCESS_TOKEN=app.config.get('TWITTER_ACCESS_TOKEN') or 'standin',
+                      TWITTER_ACCESS_SECRET=app.config.get('TWITTER_ACCESS_SECRET') or 'standin')
+    client = app.test_client()
+
+    timings = {}
+    errors = {}
+    try:
+        with client:
+            client.post('/login', data={'email': 'reviewer@opted.eu', 'password': 'reviewer123'})
+            with app.app_context():
+                entries = submissions(dgraph)
+                for run in range(args.repeat):
+                    if args.cache == 'cold':
+                        lookup_cache.purge()
+                    for label, (dgraph_type, data) in entries.items():
+                        start = time.perf_counter()
+                        try:
+                            Sanitizer(dict(data), dgraph_type=dgraph_type)
+                        except Exception as e:
+                            errors.setdefault(label, []).append(repr(e))
+                        timings.setdefault(label, []).append(time.perf_counter() - start)
+            client.get('/logout')
+    finally:
+        server.stop()
+        tmpdir.cleanup()
+
+    print(f'latency {args.latency} s (+{args.jitter} s jitter), failure rate {args.failure_rate}, '
+          f'cache {args.cache}, {args.repeat} runs')
+    print(f'{"submission":>14} {"median":>9} {"min":>9} {"max":>9}  errors')
+    for label, seconds in timings.items():
+        print(f'{label:>14} {statistics.median(seconds):8.3f}s {min(seconds):8.3f}s {max(seconds):8.3f}s  '
+              f'{len(errors.get(label, []))}')
+    total = [sum(run) for run in zip(*timings.values())]
+    print(f'{"all":>14} {statistics.median(total):8.3f}s {min(total):8.3f}s {max(total):8.3f}s')
+
+    print('\nRequests per host:')
+    for host, stats in sorted(server.stats().items(), key=lambda item: -item[1]['requests']):
+        print(f'{stats["requests"]:6d} ({stats["failed"]} failed)  {host}')
+
+    for label, messages in errors.items():
+        print(f'\n{label}: {messages[0]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+    Benchmark: import time of the app
+    Runs `python -X importtime` on `from flaskinventory import create_app; create_app()`
+    in fresh interpreters and reports the import time of `flaskinventory`,
+    the time of `create_app()` and the slowest imported modules.
+    Also checks that parsers and platform clients (see `LAZY_MODULES`)
+    are not imported before they are used.
+
+    Usage: python tools/benchmarks/bench_import.py [--repeat 5] [--top 15] [--budget 1500]
+"""
+
+import sys
+from pathlib import Path
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import tempfile
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# modules that must only be imported on first use
+LAZY_MODULES = ['instaloader', 'tweepy', 'telethon', 'feedparser', 'bs4', 'lxml']
+
+SCRIPT = '''
+import time
+start = time.perf_counter()
+from flaskinventory import create_app
+create_app()
+print(f"create_app: {(time.perf_counter() - start) * 1000:.1f}", flush=True)
+'''
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure() -> dict:
+    """ run one fresh interpreter, returns `{'total': ms, 'imports': {module: (self ms, cumulative ms)}}` """
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    # create_app writes log files to the working directory
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT],
+                              cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+    imports = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            imports[match[4]] = (int(match[1]) / 1000, int(match[2]) / 1000)
+
+    total = float(proc.stdout.strip().splitlines()[-1].split(': ')[1])
+    return {'total': total, 'imports': imports}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of create_app()')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Show the slowest modules (self time)')
+    parser.add_argument('--budget', type=float, help='Exit with an error if the median exceeds this (ms)')
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    totals = [run['total'] for run in runs]
+    package = [run['imports'].get('flaskinventory', (0, 0))[1] for run in runs]
+
+    print(f'create_app() incl. imports: median {statistics.median(totals):.1f} ms, '
+          f'min {min(totals):.1f} ms, max {max(totals):.1f} ms')
+    print(f'import flaskinventory: median {statistics.median(package):.1f} ms')
+
+    last = runs[-1]['imports']
+    print('\nSlowest modules (self time, last run):')
+    for module, (self_ms, cumulative_ms) in sorted(last.items(), key=lambda m: m[1][0], reverse=True)[:args.top]:
+        print(f'{self_ms:8.1f} ms {cumulative_ms:8.1f} ms  {module}')
+
+    eager = [module for module in LAZY_MODULES if module in last]
+    if eager:
+        print(f'\nImported eagerly: {", ".join(eager)}')
+
+    if eager or (args.budget and statistics.median(totals) > args.budget):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+    Benchmark: memory footprint of a Source submission
+    Reports RSS of the worker process and allocation counts (tracemalloc)
+    for the object-heavy parts of a Source submission:
+    registry reads (deepcopy of predicates), field validation and nquad serialization.
+
+    Offline mode (default) validates all fields that do not require a database lookup.
+    With `--config` a complete `Sanitizer` run is performed against a live DGraph
+    (same setup as the test suite: `contributor@opted.eu` has to exist).
+
+    Usage: python tools/benchmarks/bench_memory.py [--submissions 100] [--config test_config.json]
+"""
+
+import sys
+from pathlib import Path
+import argparse
+import gc
+import os
+import resource
+import tracemalloc
+
+# allow absolute import from the root folder
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from flaskinventory.flaskdgraph import Schema
+from flaskinventory.flaskdgraph.dgraph_types import (UID, NewID, Scalar, NQuadWriter, SingleRelationship,
+                                                     ReverseRelationship, MutualRelationship)
+import flaskinventory.main.model  # registers all dgraph types
+
+
+SOURCE_DATA = {
+    'name': 'Der Standard',
+    'other_names': 'derStandard, Standard, DST',
+    'founded': 1988,
+    'publication_kind': 'newspaper',
+    'special_interest': 'no',
+    'publication_cycle': 'daily',
+    'publication_cycle_weekday': '1,2,3,4,5,6',
+    'geographic_scope': 'national',
+    'languages': 'de',
+    'payment_model': 'partly free',
+    'contains_ads': 'yes',
+    'channel_epaper': 'yes',
+    'party_affiliated': 'no',
+    'defunct': 'false',
+    'entry_notes': 'Some notes about the entry',
+}
+
+
+def current_rss() -> int:
+    """ Current resident set size in bytes (falls back to peak RSS) """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def traced_size(func, n=10000) -> float:
+    """ Average traced bytes per object created by `func` """
+    tracemalloc.start()
+    objects = [func(i) for i in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size / n
+
+
+def offline_submission(data: dict) -> str:
+    fields = Schema.get_predicates('Source')
+    fields.update(Schema.get_reverse_predicates('Source'))
+    entry = {'uid': NewID('_:newentry'), 'dgraph.type': Schema.resolve_inheritance('Source')}
+    for key, field in fields.items():
+        if isinstance(field, (SingleRelationship, ReverseRelationship, MutualRelationship)):
+            continue
+        if data.get(key):
+            entry[key] = field.validate(data[key])
+        elif field.default is not None:
+            entry[key] = field.default
+    writer = NQuadWriter()
+    writer.write_dict(entry)
+    return writer.getvalue()
+
+
+def online_submission_factory(config):
+    from flaskinventory import create_app, dgraph
+    from flaskinventory.main.sanitizer import Sanitizer
+    app = create_app(config_json=config)
+    client = app.test_client()
+
+    def submission(data):
+        with client:
+            client.post('/login', data={'email': 'contributor@opted.eu',
+                                        'password': 'contributor123'})
+            with app.app_context():
+                data = dict(data)
+                data['channel'] = dgraph.get_uid('unique_name', 'print')
+                data['country'] = dgraph.get_uid('unique_name', 'austria')
+                return Sanitizer(data, dgraph_type='Source').set_nquads
+
+    return submission
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark memory of Source submissions')
+    parser.add_argument('--submissions', type=int, default=100)
+    parser.add_argument('--config', type=str, default=None,
+                        help='Flask config json; runs complete Sanitizer against DGraph')
+    args = parser.parse_args()
+
+    if args.config:
+        submission = online_submission_factory(args.config)
+    else:
+        submission = offline_submission
+
+    # warm up caches and imports
+    submission(SOURCE_DATA)
+    gc.collect()
+
+    rss_before = current_rss()
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    for _ in range(args.submissions):
+        submission(SOURCE_DATA)
+    snapshot_after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # allocation counts of everything allocated during one submission
+    tracemalloc.start()
+    submission(SOURCE_DATA)
+    one_submission = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in one_submission.statistics('filename'))
+    size = sum(stat.size for stat in one_submission.statistics('filename'))
+    leaked = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename'))
+
+    print(f'mode:                  {"sanitizer" if args.config else "offline"}')
+    print(f'submissions:           {args.submissions}')
+    print(f'worker RSS:            {current_rss() / 1024 ** 2:8.1f} MiB '
+          f'(+{(current_rss() - rss_before) / 1024:.1f} KiB during run)')
+    print(f'peak traced memory:    {peak / 1024:8.1f} KiB')
+    print(f'retained after run:    {leaked / 1024:8.1f} KiB')
+    print(f'per submission:        {blocks} live blocks, {size / 1024:.1f} KiB')
+    print(f'UID object:            {traced_size(lambda i: UID(hex(i))):8.1f} bytes')
+    print(f'Scalar object:         {traced_size(lambda i: Scalar(i)):8.1f} bytes')
+    print(f'Source registry copy:  {traced_size(lambda i: Schema.get_predicates("Source"), n=20) / 1024:8.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
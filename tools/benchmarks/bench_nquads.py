@@ -0,0 +1,79 @@
+"""
+    Benchmark: nquad serialization
+    Compares `dict_to_nquad` + `str.join` with the streaming `NQuadWriter`
+    for large entries (long audience_size histories, hundreds of sources_included).
+
+    Usage: python tools/benchmarks/bench_nquads.py [--repeat 200]
+"""
+
+import sys
+from pathlib import Path
+import argparse
+import datetime
+import timeit
+import tracemalloc
+
+# allow absolute import from the root folder
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from flaskinventory.flaskdgraph.dgraph_types import (UID, NewID, Scalar,
+                                                     NQuadWriter, dict_to_nquad)
+
+
+def make_entries(n_audience=200, n_sources=500, n_related=20):
+    entry = {'uid': NewID('_:newentry'),
+             'dgraph.type': ['Entry', 'Dataset'],
+             'name': Scalar('Large Dataset'),
+             'other_names': [Scalar(f'Alias {i}') for i in range(20)],
+             'audience_size': [Scalar(datetime.date(2000, 1, 1) + datetime.timedelta(days=i),
+                                      facets={'count': 1000 + i,
+                                              'unit': 'daily visitors',
+                                              'data_from': 'https://siterankdata.com/example.com'})
+                               for i in range(n_audience)],
+             'sources_included': [UID(hex(i)) for i in range(1, n_sources + 1)],
+             'entry_added': UID('0x1', facets={'timestamp': datetime.datetime.now(datetime.timezone.utc),
+                                               'ip': '127.0.0.1'})}
+    related = [{'uid': UID(hex(i)), 'sources_included': entry['uid'], 'name': f'Related {i}'}
+               for i in range(1, n_related + 1)]
+    return entry, related
+
+
+def legacy(entry, related):
+    nquads = dict_to_nquad(entry)
+    for r in related:
+        nquads += dict_to_nquad(r)
+    return " \n".join(nquads)
+
+
+def streaming(entry, related):
+    writer = NQuadWriter()
+    writer.write_dict(entry)
+    for r in related:
+        writer.write_dict(r)
+    return writer.getvalue()
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark nquad serialization')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    entry, related = make_entries()
+    assert legacy(entry, related) == streaming(entry, related), 'Serializers produce different output!'
+
+    for label, func in [('dict_to_nquad', legacy), ('NQuadWriter', streaming)]:
+        seconds = timeit.timeit(lambda: func(entry, related), number=args.repeat)
+        print(f'{label:>15}: {seconds / args.repeat * 1000:8.3f} ms per entry, '
+              f'peak memory {peak_memory(func, entry, related) / 1024:8.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
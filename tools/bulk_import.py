@@ -0,0 +1,76 @@
+"""
+    Bulk import of entries from a CSV or JSONL file.
+    Rows are validated with the same rules as the web forms (`Sanitizer`)
+    in parallel processes and written with chunked upserts.
+
+    CSV files need a header with the predicate names (e.g. `name,channel,country`),
+    list values are separated by comma. JSONL files have one object per line.
+
+    Usage: python tools/bulk_import.py sources.csv --type Source --user admin@opted.eu
+                [--config config.json] [--workers 8] [--chunk-size 100]
+                [--dry-run] [--report report.json]
+"""
+
+import sys
+from pathlib import Path
+import argparse
+import json
+
+# allow absolute import from the root folder
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from flask_login import login_user
+from flaskinventory import create_app
+from flaskinventory.add.bulk import BulkImport, read_rows
+from flaskinventory.flaskdgraph import Schema
+from flaskinventory.users.dgraph import User
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import entries from CSV or JSONL files')
+    parser.add_argument('file', type=str, help='CSV or JSONL file')
+    parser.add_argument('--type', type=str, required=True, help='DGraph type of the entries, e.g. Source')
+    parser.add_argument('--user', type=str, required=True, help='E-Mail of the user who adds the entries')
+    parser.add_argument('--config', type=str, help='Config file (json)')
+    parser.add_argument('--format', type=str, choices=['csv', 'jsonl'], help='Default: guessed from file name')
+    parser.add_argument('--workers', type=int, help='Number of validation processes')
+    parser.add_argument('--chunk-size', type=int, help='Rows per upsert')
+    parser.add_argument('--dry-run', action='store_true', help='Only validate the rows')
+    parser.add_argument('--report', type=str, help='Write the report to this file (json)')
+    args = parser.parse_args()
+
+    if args.config:
+        app = create_app(config_json=args.config)
+    else:
+        app = create_app()
+
+    fmt = args.format or ('jsonl' if args.file.endswith(('.jsonl', '.json')) else 'csv')
+
+    with open(args.file, encoding='utf-8', newline='') as f:
+        rows = read_rows(f, fmt=fmt)
+
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        dgraph_type = Schema.get_type(args.type)
+        if not dgraph_type:
+            sys.exit(f'Unknown dgraph type: {args.type}')
+
+        user = User(email=args.user)
+        if user.id is None:
+            sys.exit(f'User not found: {args.user}')
+        login_user(user)
+
+        report = BulkImport(rows, dgraph_type, workers=args.workers,
+                            chunk_size=args.chunk_size, dry_run=args.dry_run).run()
+
+    print(f'{report["imported"]} of {report["rows"]} rows imported, '
+          f'{report["merged"]} related entries merged, {len(report["errors"])} errors')
+    for error in report['errors']:
+        print(f'Row {error["row"]}: {error["error"]}')
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
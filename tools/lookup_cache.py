@@ -0,0 +1,54 @@
+"""
+    Inspect and purge the persistent cache of external lookups.
+
+    Usage: python tools/lookup_cache.py stats [--config config.json]
+           python tools/lookup_cache.py list [--source doi] [--search 10.1000] [--limit 100]
+           python tools/lookup_cache.py purge [--source geocode] [--key vienna] [--expired] [--negative]
+"""
+
+import sys
+from pathlib import Path
+import argparse
+from datetime import datetime
+
+# allow absolute import from the root folder
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from flaskinventory import create_app, lookup_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and purge the lookup cache')
+    parser.add_argument('command', choices=['stats', 'list', 'purge'])
+    parser.add_argument('--config', type=str, help='Config file (json)')
+    parser.add_argument('--source', type=str, help='e.g. geocode, fetch_wikidata, doi')
+    parser.add_argument('--key', type=str, help='purge: exact cache key')
+    parser.add_argument('--search', type=str, help='list: part of the cache key')
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--expired', action='store_true', help='purge: only expired entries')
+    parser.add_argument('--negative', action='store_true', help='purge: only negative results')
+    args = parser.parse_args()
+
+    if args.config:
+        app = create_app(config_json=args.config)
+    else:
+        app = create_app()
+
+    with app.app_context():
+        if args.command == 'stats':
+            for row in lookup_cache.stats():
+                print(f'{row["source"]}: {row["entries"]} entries, {row["expired"]} expired, '
+                      f'{row["negative"]} negative, {row["hits"]} hits')
+        elif args.command == 'list':
+            for row in lookup_cache.entries(source=args.source, search=args.search, limit=args.limit):
+                expires = datetime.fromtimestamp(row['expires']).isoformat(timespec='seconds')
+                negative = ' (negative)' if row['negative'] else ''
+                print(f'{row["source"]}\t{row["key"]}\texpires {expires}{negative}')
+        elif args.command == 'purge':
+            deleted = lookup_cache.purge(source=args.source, key=args.key,
+                                         expired=args.expired, negative=args.negative)
+            print(f'{deleted} entries deleted')
+
+
+if __name__ == '__main__':
+    main()